@@ -0,0 +1,240 @@
+"""
+推理后端
+
+CPU 上可以使用预先导出的 ONNX(或 OpenVINO IR)模型，由 ONNX Runtime / OpenVINO 推理；
+GPU/MPS 使用 PyTorch. 导出是单独的离线步骤，结果保存在权重文件旁边；加载时不会导出，
+导出结果不存在、早于权重文件或加载失败时使用 PyTorch. 导出的模型仍由 ultralytics 加载，
+predict 的用法与结果不变，调用方通过 models.use_model() 使用，不需要关心后端.
+
+python -m ai.common.backends export [权重] [后端]     导出模型(需要安装导出所需的依赖)
+python -m ai.common.backends benchmark <视频> [帧数]  比较各后端的延迟、吞吐量以及与 PyTorch 结果的一致性
+"""
+import fcntl
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+from common.settings import BACKEND_OPTIONS, INFERENCE_BACKENDS, INFERENCE_OPTIONS, MODEL_NAMES
+from ai.common.postprocess import pairwise_iou
+
+_export_lock = threading.Lock()
+
+
+def resolve_backend(device, backend=None):
+    """返回实际使用的后端，只有 CPU 才使用导出的模型"""
+    if backend is not None:
+        return backend
+    if device != "cpu":
+        return INFERENCE_BACKENDS.TORCH
+    return BACKEND_OPTIONS.CPU_BACKEND
+
+
+def exported_path(weights, backend):
+    """导出结果的路径，与 ultralytics export 的默认输出位置一致"""
+    stem = os.path.splitext(weights)[0]
+    if backend == INFERENCE_BACKENDS.ONNX:
+        return f"{stem}.onnx"
+    if backend == INFERENCE_BACKENDS.OPENVINO:
+        return f"{stem}_openvino_model"
+    return weights
+
+
+def _is_fresh(target, weights):
+    try:
+        return os.path.getmtime(target) >= os.path.getmtime(weights)
+    except OSError:
+        return False
+
+
+@contextmanager
+def _file_lock(file_name):
+    # 多个进程(并行扫描的工作进程)同时加载时，只有一个进程导出，其余等待
+    with open(file_name, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def export_model(weights, backend):
+    """
+    导出模型，已有不早于权重文件的导出结果时直接使用
+
+    返回:
+    str: 导出结果的路径，backend 为 TORCH 时返回 weights
+    """
+    if backend == INFERENCE_BACKENDS.TORCH:
+        return weights
+    target = exported_path(weights, backend)
+    with _export_lock, _file_lock(f"{target}.lock"):
+        if _is_fresh(target, weights):
+            return target
+        from ultralytics import YOLO
+
+        start = time.perf_counter()
+        exported = YOLO(weights, verbose=False).export(
+            format=backend,
+            imgsz=BACKEND_OPTIONS.EXPORT_IMGSZ,
+            dynamic=True,
+            verbose=False,
+        )
+        print(f"导出模型 {weights} -> {exported}: {time.perf_counter() - start:.2f} 秒")
+        return str(exported)
+
+
+def tune_onnx_session(model, threads):
+    """
+    按 threads 重新创建 ONNX Runtime 会话
+
+    ultralytics 创建会话时不设置线程数，多个模型副本会争抢所有核.
+    会话在第一次 predict 时创建，因此需要在预热之后调用.
+    """
+    import onnxruntime
+
+    backend = getattr(model.predictor, "model", None) if model.predictor else None
+    session = getattr(backend, "session", None)
+    if session is None:
+        return
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    backend.session = onnxruntime.InferenceSession(
+        model.ckpt_path, options, providers=session.get_providers()
+    )
+
+
+def load_backend_model(weights, device, backend=None):
+    """
+    按后端加载模型，没有可用的导出结果或加载失败时回退到 PyTorch
+
+    不在这里导出：导出 yolo11x 需要较长时间，ultralytics 还可能在运行时安装缺少的依赖，
+    不应该发生在页面启动或用户请求的过程中. 先用 export 命令导出.
+
+    返回:
+    tuple: (模型, 实际使用的后端)
+    """
+    from ultralytics import YOLO
+
+    if weights.endswith(".onnx"):
+        # 已经导出(或量化)的模型直接加载
+        return YOLO(weights, task="detect", verbose=False), INFERENCE_BACKENDS.ONNX
+    backend = resolve_backend(device, backend)
+    if backend != INFERENCE_BACKENDS.TORCH:
+        target = exported_path(weights, backend)
+        if not _is_fresh(target, weights):
+            print(f"没有 {weights} 的 {backend} 导出结果(或已过期)，使用 PyTorch")
+        else:
+            try:
+                return YOLO(target, task="detect", verbose=False), backend
+            except Exception as e:
+                print(f"使用 {backend} 后端加载 {weights} 失败，回退到 PyTorch: {e}")
+    return YOLO(weights, verbose=False), INFERENCE_BACKENDS.TORCH
+
+
+def intra_op_threads(threads=None):
+    if BACKEND_OPTIONS.INTRA_OP_THREADS > 0:
+        return BACKEND_OPTIONS.INTRA_OP_THREADS
+    if threads:
+        return threads
+    import torch
+
+    return torch.get_num_threads()
+
+
+def agreement(reference, candidate, iou_threshold=0.5):
+    """
+    candidate 与 reference 检测结果的一致性
+
+    参数:
+    reference, candidate (list): 每帧一个 FrameDetections
+
+    返回:
+    float: reference 中能在 candidate 找到同类别且 IoU >= iou_threshold 的检测框比例
+    """
+    total = matched = 0
+    for ref, cand in zip(reference, candidate):
+        total += len(ref)
+        if not len(ref) or not len(cand):
+            continue
+        iou = pairwise_iou(ref.xyxy, cand.xyxy)
+        iou[ref.cls[:, None] != cand.cls[None, :]] = 0
+        matched += int((iou.max(axis=1) >= iou_threshold).sum())
+    return matched / total if total else 1.0
+
+
+def benchmark_backends(frames, weights=MODEL_NAMES.YOLO_11X, backends=None):
+    """
+    比较各后端在 CPU 上的性能
+
+    参数:
+    frames (list): 用于测试的帧
+
+    返回:
+    dict: 后端 -> {"latency_ms", "fps", "agreement"}，延迟为单帧推理的中位数，
+          吞吐量按 INFERENCE_OPTIONS.BATCH_SIZE 批量推理计算，一致性以 PyTorch 结果为基准
+    """
+    from ai.common.inference import predict_batch
+    from ai.common.models import load_model
+
+    backends = backends or [
+        INFERENCE_BACKENDS.TORCH,
+        INFERENCE_BACKENDS.ONNX,
+        INFERENCE_BACKENDS.OPENVINO,
+    ]
+    report = {}
+    reference = None
+    for backend in backends:
+        try:
+            export_model(weights, backend)
+        except Exception as e:
+            print(f"导出 {backend} 失败，跳过: {e}")
+            continue
+        model, used, _, _ = load_model(weights, "cpu", backend=backend)
+        if used != backend:
+            continue
+        latencies = []
+        for frame in frames[: min(len(frames), 16)]:
+            start = time.perf_counter()
+            predict_batch(model, [frame], "cpu")
+            latencies.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        detections = predict_batch(model, frames, "cpu")
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = detections
+        report[backend] = {
+            "latency_ms": float(np.median(latencies)) * 1000,
+            "fps": len(frames) / elapsed if elapsed > 0 else 0,
+            "agreement": agreement(reference, detections),
+        }
+        print(
+            f"{backend:>8}: 延迟 {report[backend]['latency_ms']:.1f} ms, "
+            f"吞吐量 {report[backend]['fps']:.2f} 帧/秒 (batch={INFERENCE_OPTIONS.BATCH_SIZE}), "
+            f"一致性 {report[backend]['agreement']:.1%}"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "export"
+    if command == "export":
+        weights = sys.argv[2] if len(sys.argv) > 2 else MODEL_NAMES.YOLO_11X
+        backend = sys.argv[3] if len(sys.argv) > 3 else INFERENCE_BACKENDS.ONNX
+        print(export_model(weights, backend))
+    elif command == "benchmark":
+        from ai.common.frames import sample_frames
+
+        video_file = sys.argv[2] if len(sys.argv) > 2 else "/var/tmp/smart-vision/video/sample.mp4"
+        sample_count = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+        frames = []
+        for _, _, frame in sample_frames(video_file, 1.0):
+            frames.append(frame)
+            if len(frames) >= sample_count:
+                break
+        benchmark_backends(frames)
+    else:
+        print(f"未知命令: {command}, 可用: export, benchmark")
@@ -0,0 +1,52 @@
+class BestShotSelector:
+    """
+    流式选择每段连续画面中置信度最高的一帧
+
+    同一个视频中相邻两次命中的时间间隔不超过 max_gap 秒时视为同一段(episode).
+    只保留当前段的最佳帧，段结束时立即交给 on_episode 处理(如写入图片)，
+    内存占用与视频长度无关.
+    """
+
+    def __init__(self, on_episode, max_gap):
+        """
+        参数:
+        on_episode: on_episode(item) 处理一段的最佳帧，返回值保存在 shots 中；返回 None 时丢弃这一段(如无法保存图片)
+        max_gap (float): 同一段内相邻两次命中的最大间隔(秒)
+        """
+        self.on_episode = on_episode
+        self.max_gap = max_gap
+        self.shots = []
+        self._best = None
+        self._source = None
+        self._last_time = None
+
+    def add(self, item, source, timestamp):
+        """
+        加入一帧命中的画面
+
+        参数:
+        item (dict): 帧信息，需要包含 max_confidence
+        source: 所属的视频，不同视频的画面不会分到同一段
+        timestamp (float): 帧在视频中的时间(秒)
+        """
+        if self._best is not None and (
+            source != self._source or timestamp - self._last_time > self.max_gap
+        ):
+            self._emit()
+        if self._best is None or item["max_confidence"] > self._best["max_confidence"]:
+            self._best = item
+        self._source = source
+        self._last_time = timestamp
+
+    def flush(self):
+        """结束当前段，返回所有段的处理结果"""
+        if self._best is not None:
+            self._emit()
+        return self.shots
+
+    def _emit(self):
+        best = self._best
+        self._best = None
+        result = self.on_episode(best)
+        if result is not None:
+            self.shots.append(result)
@@ -0,0 +1,133 @@
+from contextlib import contextmanager
+from common.settings import CASCADE_OPTIONS, INFERENCE_OPTIONS
+from ai.common.inference import adaptive_batches, predict_batch, BatchSizer
+from ai.common.models import use_model
+
+
+class DetectorCascade:
+    """
+    两级检测
+
+    小模型(yolo11n)以较低的置信度检测每个采样帧，is_flagged 判断结果是否需要确认.
+    需要确认的帧，以及状态变化(is_flagged 的结果改变，即目标出现或消失)前后
+    context 个采样点，交给大模型(yolo11x)重新检测；其余帧使用小模型的结果.
+    """
+
+    def __init__(
+        self,
+        screen_model,
+        confirm_model,
+        device,
+        is_flagged,
+        escalate_on=True,
+        screen_confidence=CASCADE_OPTIONS.SCREEN_CONFIDENCE,
+        context=CASCADE_OPTIONS.CONTEXT_SAMPLES,
+    ):
+        """
+        参数:
+        is_flagged: is_flagged(detections) 根据小模型的结果(FrameDetections)返回 bool
+        escalate_on (bool): is_flagged 返回该值时交给大模型. 查找目标时为 True(确认命中)，
+                            判断目标丢失时为 False(确认消失)
+        """
+        self.screen_model = screen_model
+        self.confirm_model = confirm_model
+        self.device = device
+        self.is_flagged = is_flagged
+        self.escalate_on = escalate_on
+        self.screen_confidence = screen_confidence
+        self.context = context
+        self.screened = 0
+        self.flagged = 0
+        self.escalated = 0
+        self._last_flag = None
+        self._context_left = 0
+
+    def _plan(self, flags):
+        """返回每一帧是否交给大模型"""
+        escalate = [flag == self.escalate_on for flag in flags]
+        self.flagged += sum(escalate)
+        for i, flag in enumerate(flags):
+            if self._last_flag is not None and flag != self._last_flag:
+                # 状态变化之前的采样点(只能回溯到本批次内)与之后的 context 个采样点
+                for j in range(max(0, i - self.context), i):
+                    escalate[j] = True
+                self._context_left = self.context + 1
+            if self._context_left > 0:
+                escalate[i] = True
+                self._context_left -= 1
+            self._last_flag = flag
+        return escalate
+
+    def detect(self, frames, batch_size=INFERENCE_OPTIONS.BATCH_SIZE, gate=None, **predict_kwargs):
+        """
+        与 inference.detect_frames 相同的输入与输出
+
+        返回:
+        generator: (frame_index, timestamp, frame, detections) 元组，顺序与输入一致
+        """
+        screen_sizer = BatchSizer(batch_size)
+        confirm_sizer = BatchSizer(batch_size)
+        last_result = None
+        # 按小模型当前的批大小分组，内存不足减半后下一组立即生效
+        for batch in adaptive_batches(frames, screen_sizer):
+            inferred = [gate is None or gate.should_infer(item[-1]) for item in batch]
+            images = [item[-1] for item, infer in zip(batch, inferred) if infer]
+            screened = predict_batch(
+                self.screen_model,
+                images,
+                self.device,
+                screen_sizer,
+                conf=self.screen_confidence,
+                **predict_kwargs,
+            )
+            escalate = self._plan([self.is_flagged(result) for result in screened])
+            confirmed = iter(
+                predict_batch(
+                    self.confirm_model,
+                    [image for image, flag in zip(images, escalate) if flag],
+                    self.device,
+                    confirm_sizer,
+                    **predict_kwargs,
+                )
+            )
+            self.screened += len(images)
+            self.escalated += sum(escalate)
+            results = iter(
+                next(confirmed) if flag else result for result, flag in zip(screened, escalate)
+            )
+            for item, infer in zip(batch, inferred):
+                if infer:
+                    last_result = next(results)
+                yield (*item, last_result)
+
+    def stats(self):
+        """各级的帧数: 小模型检测、被标记、交给大模型(含状态变化附近的帧)"""
+        return {
+            "screened": self.screened,
+            "flagged": self.flagged,
+            "escalated": self.escalated,
+            "escalation_ratio": self.escalated / self.screened if self.screened else 0.0,
+        }
+
+    def report(self, name):
+        stats = self.stats()
+        print(
+            f"两级检测: 小模型 {stats['screened']} 帧, 标记 {stats['flagged']} 帧, "
+            f"大模型 {stats['escalated']} 帧({stats['escalation_ratio']:.0%}), {name}"
+        )
+
+
+@contextmanager
+def cascade_detector(enabled, confirm_model, device, is_flagged, escalate_on=True):
+    """
+    enabled 为 True 时借用小模型并返回 DetectorCascade，否则返回 None
+
+    用法:
+    with cascade_detector(cascade, model, device, is_flagged) as detector:
+        results = detector.detect(frames) if detector else detect_frames(model, frames, device)
+    """
+    if not enabled:
+        yield None
+        return
+    with use_model(CASCADE_OPTIONS.SCREEN_WEIGHTS) as screen_model:
+        yield DetectorCascade(screen_model, confirm_model, device, is_flagged, escalate_on)
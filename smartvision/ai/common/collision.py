@@ -2,36 +2,63 @@ import numpy as np
 import os
 import cv2
 import time
-from ultralytics import YOLO
 from collections import defaultdict
+from functools import partial
 from common.utils import get_str_time, get_available_device
+from ai.common.frames import iter_samples, read_video_properties, seek_frame, ffmpeg_output_size
+from ai.common.pipeline import Prefetcher
+from ai.common.inference import detect_frames, predict_batch
+from ai.common.models import use_model
+from ai.common.quantization import task_weights
+from ai.common.cascade import cascade_detector
+from ai.common.image_sink import get_image_sink, wait_written
+from ai.common import detection_cache
+from common.single_flight import SingleFlight
+from common.settings import (
+    INFERENCE_OPTIONS,
+    DECODE_OPTIONS,
+    QUANTIZATION_OPTIONS,
+    CASCADE_OPTIONS,
+)
+from common.capabilities import preferred_fourcc
+
+# Concurrent proximity analyses of the same video, target and parameters run once
+_analyses = SingleFlight()
 
 
 class VehicleDetectionSystem:
-    def __init__(self, model_path="yolov8n.pt", output_dir="output"):
+    def __init__(
+        self,
+        model_path="yolov8n.pt",
+        output_dir="output",
+        precision=QUANTIZATION_OPTIONS.COLLISION,
+    ):
         """Initialize the vehicle detection system with a YOLO model."""
-        self.model = YOLO(model_path, verbose=False)
+        # The model is borrowed from the shared pool per call, never loaded per instance.
+        # With INT8 precision on CPU this is the quantized model next to the weights.
+        self.model_path = task_weights(model_path, precision)
         self.output_dir = output_dir
         self.device = get_available_device()
         os.makedirs(self.output_dir, exist_ok=True)
 
     def get_frame(self, video_file_name, start_time):
-        # Open the video file
-        cap = cv2.VideoCapture(video_file_name)
-        if not cap.isOpened():
+        # Get video properties from the sidecar index
+        properties = read_video_properties(video_file_name)
+        if properties is None:
             raise ValueError(f"Could not open video file: {video_file_name}")
-
-        # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = properties["fps"]
+        total_frames = properties["total_frames"]
 
         # Calculate the frame number for the start time
         start_frame = int(start_time * fps)
         if start_frame >= total_frames:
             raise ValueError(f"Start time {start_time} is beyond the video duration")
 
-        # Set the frame position
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        # Open the video file and jump to the nearest keyframe before the start frame
+        cap = cv2.VideoCapture(video_file_name)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file: {video_file_name}")
+        seek_frame(cap, start_frame, properties)
 
         # Read the frame
         ret, frame = cap.read()
@@ -57,25 +84,23 @@ class VehicleDetectionSystem:
         """
         frame = self.get_frame(video_file_name=video_file_name, start_time=start_time)
         # Detect vehicles using YOLO
-        results = self.model.predict(
-            source=frame, device=self.device, classes=[2], verbose=False
-        )  # Common vehicle class indices in COCO
+        with use_model(self.model_path) as model:
+            detections = predict_batch(
+                model, [frame], self.device, classes=[2]
+            )[0]  # Common vehicle class indices in COCO
 
         vehicles = []
         detections_with_area = []
 
         # Calculate area for each detection
-        for i, detection in enumerate(results[0].boxes.data):
-            x1, y1, x2, y2, conf, cls = detection
-            x1, y1, x2, y2 = map(int, [x1, y1, x2, y2])
+        for i, xyxy in enumerate(detections.xyxy):
+            x1, y1, x2, y2 = map(int, xyxy)
             box = [x1, y1, x2, y2]
 
             # Calculate box area
             area = (x2 - x1) * (y2 - y1)
 
-            detections_with_area.append(
-                {"index": i, "box": box, "area": area, "detection": detection}
-            )
+            detections_with_area.append({"index": i, "box": box, "area": area})
 
         # Sort detections by area (largest to smallest)
         detections_with_area.sort(key=lambda x: x["area"], reverse=True)
@@ -192,13 +217,21 @@ class VehicleDetectionSystem:
 
         # Save the annotated image
         image_filename = f"{self.output_dir}/annotated_frame.jpg"
-        cv2.imwrite(image_filename, annotated_frame)
+        # Encoded by the shared image sink; wait so the UI can show it right away
+        wait_written([get_image_sink().submit(image_filename, annotated_frame)])
 
         # Release resources
 
         return image_filename, vehicles
 
-    def nearest_distance_detection(self, video_file_name, target_vehicle, start_time):
+    def nearest_distance_detection(
+        self,
+        video_file_name,
+        target_vehicle,
+        start_time,
+        batch_size=INFERENCE_OPTIONS.BATCH_SIZE,
+        cascade=CASCADE_OPTIONS.ENABLED,
+    ):
         """
         Find the top 3 vehicles that come closest to the target vehicle and generate 10-second clips.
 
@@ -206,33 +239,74 @@ class VehicleDetectionSystem:
             video_file_name (str): Path to the video file
             target_vehicle (dict): Dict with vehicle_id and box of the target vehicle
             start_time (float): Time in seconds from which to start the detection
+            batch_size (int): Number of sampled frames sent to the model per call
+            cascade (bool): Screen every sample with the nano model and only run the
+                main model on frames where a vehicle comes near the target (see CASCADE_OPTIONS)
 
         Returns:
             list: List of dictionaries containing distance, seconds, and footage file name for top 3 closest vehicles
         """
-        # Open the video file
-        cap = cv2.VideoCapture(video_file_name)
-        if not cap.isOpened():
-            raise ValueError(f"Could not open video file: {video_file_name}")
-
         # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        properties = read_video_properties(video_file_name)
+        if properties is None:
+            raise ValueError(f"Could not open video file: {video_file_name}")
+        fps = properties["fps"]
+        total_frames = properties["total_frames"]
 
         # Calculate the frame number for the start time
         start_frame = int(start_time * fps)
         if start_frame >= total_frames:
-            cap.release()
             raise ValueError(f"Start time {start_time} is beyond the video duration")
 
-        # Set the frame position
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-
         # Extract target vehicle box
         target_box = target_vehicle["box"]
 
+        # Sessions analysing the same video content with the same target and parameters
+        # share one detection pass; each session still writes its own clips
+        key = detection_cache.cache_key(
+            video_file_name,
+            self.model_path,
+            1.0,
+            task="collision",
+            target_box=[float(value) for value in target_box],
+            start_time=float(start_time),
+            cascade=cascade,
+        )
+        find = partial(
+            self._closest_vehicles, video_file_name, target_box, start_time, batch_size, cascade
+        )
+        top_vehicles = _analyses.do(key, find) if key is not None else find()
+
+        # Generate 10-second clips for each of the top 3 vehicles
+        results = []
+
+        for i, (distance, time_point, box) in enumerate(top_vehicles):
+            # Calculate start and end times for the 10-second clip (5 seconds before and 5 seconds after)
+            clip_start_time = max(0, time_point - 5)
+            clip_end_time = min(total_frames / fps, time_point + 5)
+
+            # Create the clip
+            clip_filename = self._create_clip(
+                video_file_name, clip_start_time, clip_end_time, target_box, box, i + 1
+            )
+
+            results.append(
+                {
+                    "distance": distance,
+                    "seconds": time_point,
+                    "footage_file_name": clip_filename,
+                }
+            )
+
+        return results
+
+    def _closest_vehicles(self, video_file_name, target_box, start_time, batch_size, cascade):
+        """
+        Detect vehicles from start_time on and return the 3 that come closest to the target.
+
+        Returns:
+            list: (distance, seconds, box) of each vehicle's closest approach, nearest first
+        """
         # Calculate the target vehicle's center
         target_center_x = (target_box[0] + target_box[2]) / 2
         target_center_y = (target_box[1] + target_box[3]) / 2
@@ -240,51 +314,64 @@ class VehicleDetectionSystem:
 
         # Store distance data for each detected vehicle over time
         vehicle_distances = defaultdict(list)
-        frame_index = start_frame
 
-        # Process one frame per second
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
+        # In cascade mode, frames with a vehicle within this distance are confirmed by the main model
+        proximity = CASCADE_OPTIONS.PROXIMITY_RATIO * np.hypot(
+            target_box[2] - target_box[0], target_box[3] - target_box[1]
+        )
 
-            # Current time in the video
-            current_time = frame_index / fps
+        def is_near(detections):
+            centers = (detections.xyxy[:, :2] + detections.xyxy[:, 2:]) / 2
+            distances = np.hypot(centers[:, 0] - target_center_x, centers[:, 1] - target_center_y)
+            return bool((distances < proximity).any())
 
-            # Detect vehicles
-            results = self.model.predict(
-                source=frame, device=self.device, verbose=False, classes=[2, 3, 5, 7]
-            )  # Common vehicle class indices in COCO
+        # Process one frame per second
+        with use_model(self.model_path) as model, Prefetcher(
+            # Distances are measured in original-resolution pixels, so never downscale
+            iter_samples(
+                video_file_name,
+                seconds_interval=1.0,
+                start_time=start_time,
+                mode=DECODE_OPTIONS.SAMPLING_MODE,
+                max_side=None,
+            )
+        ) as frames, cascade_detector(cascade, model, self.device, is_near) as detector:
+            # Detect vehicles in batches
+            # Common vehicle class indices in COCO
+            vehicle_classes = [2, 3, 5, 7]
+            if detector:
+                results = detector.detect(frames, batch_size, classes=vehicle_classes)
+            else:
+                results = detect_frames(
+                    model, frames, self.device, batch_size, classes=vehicle_classes
+                )
+            for _, current_time, _, detections in results:
 
-            # Process each detection
-            for detection in results[0].boxes.data:
-                x1, y1, x2, y2, conf, cls = detection
-                x1, y1, x2, y2 = map(int, [x1, y1, x2, y2])
+                # Process each detection
+                for xyxy, cls in zip(detections.xyxy, detections.cls):
+                    x1, y1, x2, y2 = map(int, xyxy)
 
-                # Calculate the center of the detected vehicle
-                center_x = (x1 + x2) / 2
-                center_y = (y1 + y2) / 2
+                    # Calculate the center of the detected vehicle
+                    center_x = (x1 + x2) / 2
+                    center_y = (y1 + y2) / 2
 
-                # Compute Euclidean distance to target vehicle
-                distance = np.sqrt(
-                    (center_x - target_center_x) ** 2
-                    + (center_y - target_center_y) ** 2
-                )
+                    # Compute Euclidean distance to target vehicle
+                    distance = np.sqrt(
+                        (center_x - target_center_x) ** 2
+                        + (center_y - target_center_y) ** 2
+                    )
 
-                # Create a unique ID for this vehicle based on its position (simple approach)
-                # In a real system, you'd want to use tracking
-                vehicle_key = f"{int(center_x/10)}_{int(center_y/10)}_{int(cls)}"
+                    # Create a unique ID for this vehicle based on its position (simple approach)
+                    # In a real system, you'd want to use tracking
+                    vehicle_key = f"{int(center_x/10)}_{int(center_y/10)}_{int(cls)}"
 
-                # Store the distance and time
-                vehicle_distances[vehicle_key].append(
-                    (distance, current_time, (x1, y1, x2, y2))
-                )
+                    # Store the distance and time
+                    vehicle_distances[vehicle_key].append(
+                        (distance, current_time, (x1, y1, x2, y2))
+                    )
 
-            # Skip to the next second
-            frame_index += fps
-            if frame_index >= total_frames:
-                break
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        if detector:
+            detector.report(video_file_name)
 
         # Find minimum distance for each vehicle
         min_distances = {}
@@ -294,33 +381,8 @@ class VehicleDetectionSystem:
                 min_distances[vehicle_key] = min_distance_data
 
         # Sort vehicles by minimum distance and get top 3
-        top_vehicles = sorted(min_distances.items(), key=lambda x: x[1][0])[:3]
-
-        # Generate 10-second clips for each of the top 3 vehicles
-        results = []
-
-        for i, (vehicle_key, (distance, time_point, box)) in enumerate(top_vehicles):
-            # Calculate start and end times for the 10-second clip (5 seconds before and 5 seconds after)
-            clip_start_time = max(0, time_point - 5)
-            clip_end_time = min(total_frames / fps, time_point + 5)
-
-            # Create the clip
-            clip_filename = self._create_clip(
-                video_file_name, clip_start_time, clip_end_time, target_box, box, i + 1
-            )
-
-            results.append(
-                {
-                    "distance": distance,
-                    "seconds": time_point,
-                    "footage_file_name": clip_filename,
-                }
-            )
-
-        # Release resources
-        cap.release()
-
-        return results
+        top_vehicles = sorted(min_distances.values(), key=lambda x: x[0])[:3]
+        return top_vehicles
 
     def _create_clip(
         self, video_file_name, start_time, end_time, target_box, vehicle_box, index
@@ -339,27 +401,30 @@ class VehicleDetectionSystem:
         Returns:
             str: Path to the created clip
         """
+        # Get video properties from the sidecar index
+        properties = read_video_properties(video_file_name)
+        if properties is None:
+            raise ValueError(f"Could not open video file: {video_file_name}")
+        fps = properties["fps"]
+        # cv2 returns frames rotated to the display orientation, so size the writer the same way
+        width, height = ffmpeg_output_size(properties, None)
+
         # Open the video file
         cap = cv2.VideoCapture(video_file_name)
         if not cap.isOpened():
             raise ValueError(f"Could not open video file: {video_file_name}")
 
-        # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
         # Create VideoWriter object
         timestamp = int(time.time())
         output_filename = f"{self.output_dir}/vehicle_{index}_proximity_{timestamp}.mp4"
-        # fourcc = cv2.VideoWriter_fourcc(*"mp4v")  # or use 'XVID'
-        fourcc = cv2.VideoWriter_fourcc(*"avc1")
+        # avc1 when available, otherwise mp4v (probed once per process)
+        fourcc = cv2.VideoWriter_fourcc(*preferred_fourcc())
         out = cv2.VideoWriter(output_filename, fourcc, fps, (width, height))
 
         # Set starting frame
         start_frame = int(start_time * fps)
         end_frame = int(end_time * fps)
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        seek_frame(cap, start_frame, properties)
 
         # Process frames
         for _ in range(start_frame, end_frame):
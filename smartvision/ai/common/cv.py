@@ -1,7 +1,10 @@
 import cv2
 import os
-from ultralytics import YOLO
 from common.utils import list_video_files
+from common.settings import DECODE_OPTIONS
+from common.capabilities import preferred_fourcc
+from ai.common.image_sink import get_image_sink, wait_written
+from ai.common.frames import iter_samples, read_video_properties, seek_frame, ffmpeg_output_size
 
 
 def cv_clip_video(file_name, start_time, end_time, output_path):
@@ -20,7 +23,8 @@ def cv_clip_video(file_name, start_time, end_time, output_path):
     Notes:
         - This function uses OpenCV for video processing. GPU usage depends on the
           OpenCV build configuration and system hardware support for decoding/encoding.
-        - The output video is encoded using H.264 (via 'avc1' FourCC). Ensure necessary codecs are installed.
+        - The output video is encoded using H.264 (via 'avc1' FourCC) when the capability
+          probe finds it, otherwise with 'mp4v'.
         - If end_time exceeds the video duration, the clip will extend to the end
           of the video.
         - If start_time exceeds the video duration, the function returns False.
@@ -34,15 +38,17 @@ def cv_clip_video(file_name, start_time, end_time, output_path):
 
     # Open the video file
     cap = cv2.VideoCapture(file_name)
-    if not cap.isOpened():
+    properties = read_video_properties(file_name)
+    if properties is None or not cap.isOpened():
         print(f"Error: Could not open video file: {file_name}")
+        cap.release()
         return False
 
-    # Get video properties
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    # Get video properties from the sidecar index instead of probing the capture
+    fps = properties["fps"]
+    total_frames = properties["total_frames"]
+    # cv2 returns frames rotated to the display orientation, so size the writer the same way
+    frame_width, frame_height = ffmpeg_output_size(properties, None)
 
     # Handle cases where FPS or total_frames might be invalid
     if fps <= 0 or total_frames <= 0:
@@ -95,22 +101,21 @@ def cv_clip_video(file_name, start_time, end_time, output_path):
     )  # Create output directory if it doesn't exist
 
     # Define the codec and create VideoWriter object
-    # Use 'avc1' for H.264 encoding in an MP4 container.
-    # Alternatives might be 'H264', 'h264', 'X264' depending on system codecs.
-    fourcc = cv2.VideoWriter_fourcc(*"avc1")
+    # The codec comes from the per-process capability probe: 'avc1' (H.264) when
+    # available, falling back to 'mp4v'.
+    fourcc_name = preferred_fourcc()
+    fourcc = cv2.VideoWriter_fourcc(*fourcc_name)
     out = cv2.VideoWriter(output_file, fourcc, fps, (frame_width, frame_height))
 
     if not out.isOpened():
         print(
-            f"Error: Could not open VideoWriter for output file: {output_file}. Check if H.264 ('avc1') codec is supported/installed."
+            f"Error: Could not open VideoWriter for output file: {output_file}. Check if the '{fourcc_name}' codec is supported/installed."
         )
         cap.release()
-        # Try falling back to mp4v if avc1 fails? Or just report error. Reporting is safer.
         return False
 
-    # Set the starting frame position
-    # Note: Setting frame position might not be perfectly accurate for all video formats.
-    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    # Jump to the nearest keyframe before start_frame and grab forward to it
+    seek_frame(cap, start_frame, properties)
 
     current_frame_index = start_frame
     frames_written = 0
@@ -161,6 +166,9 @@ def cv_clip_video(file_name, start_time, end_time, output_path):
 def cv_video_info(video_path):
     """
     Get video information such as duration, frame rate, and total frames.
+
+    The values come from the per-video sidecar index, which is built here
+    the first time each uploaded file is seen.
     """
 
     if not os.path.exists(video_path):
@@ -172,23 +180,20 @@ def cv_video_info(video_path):
 
     for file in files:
         file_name = os.path.join(video_path, file)
-        video = cv2.VideoCapture(file_name)
-        if not video.isOpened():
+        # Builds the sidecar index on first use, later stages read it instead of probing
+        properties = read_video_properties(file_name)
+        if properties is None:
             raise ValueError(f"Could not open video file: {video_path}")
 
-        fps = video.get(cv2.CAP_PROP_FPS)
-        total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = total_frames / fps
-        resolution = f"{video.get(cv2.CAP_PROP_FRAME_WIDTH)}, {video.get(cv2.CAP_PROP_FRAME_HEIGHT)}"
-
-        video.release()
-
         item = {
             "file": file,
-            "fps": fps,
-            "total_frames": total_frames,
-            "duration": int(duration),
-            "resolution": resolution,
+            "fps": properties["fps"],
+            "total_frames": properties["total_frames"],
+            "duration": int(properties["duration"]),
+            "resolution": f"{properties['width']}, {properties['height']}",
+            "codec": properties.get("codec"),
+            "rotation": properties.get("rotation", 0),
+            "content_hash": properties.get("content_hash"),
         }
         videos.append(item)
     return videos
@@ -203,9 +208,11 @@ def cv_extract_frames(
     duration, # 提取的持续时间
     frames_per_second, # 每秒提取的帧数
     max=0, # 最多提取的图像数量
+    sampling_mode=DECODE_OPTIONS.SAMPLING_MODE, # 采样模式, 见 SAMPLING_MODES
+    on_frame=None, # 内存模式: on_frame(image_path, current_time, frame) 接收每一帧, 不写入磁盘
 ):
     # Create the output directory if it doesn't exist
-    if not os.path.exists(output_dir):
+    if on_frame is None and not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
     files = [
@@ -219,28 +226,22 @@ def cv_extract_frames(
         return
 
     total_images = []
+    writes = []
 
     files = sorted(files)
     index = 1
     for file_name in files:
         video_info = {}
-        # print(output_dir, index)
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-
         full_video_path = os.path.join(video_path, file_name)
-        # Open the video file
-        video = cv2.VideoCapture(full_video_path)
-
         # Get the video's frame rate and total number of frames
-        fps = video.get(cv2.CAP_PROP_FPS)
+        properties = read_video_properties(full_video_path)
+        fps = properties["fps"] if properties else 0
         if fps == 0:
             print("fps is zero.")
             continue
 
-        # Get the video's frame rate and total number of frames
-        total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
-        video_duration = total_frames / fps
+        total_frames = properties["total_frames"]
+        video_duration = properties["duration"]
         video_info["duration"] = video_duration
 
         # Validate start_time
@@ -252,71 +253,67 @@ def cv_extract_frames(
         if duration > 0:
             end_time = min(start_time + duration, video_duration)
 
-        # Calculate the start and end frame numbers
         start_frame = int(start_time * fps)
-        end_frame = int(end_time * fps)
-
-        # Set the current frame to the start frame
-        video.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
 
-        # Initialize the frame count and image counter
-        frame_count = 0
+        # Initialize the image counter
         image_index = 1
         total = int(total_frames / 30 * frames_per_second)
-        frame_interval = (
-            fps / frames_per_second if frames_per_second > 0 else float("inf")
+        # frames_per_second <= 0 时只提取第一帧
+        seconds_interval = (
+            1 / frames_per_second if frames_per_second > 0 else video_duration + 1
         )
-        next_frame_to_extract = 0
 
         video_summary = []
-        # Loop through the frames
-        while frame_count <= (end_frame - start_frame):
-            # Read the next frame
-            ret, frame = video.read()
-
-            # If the frame was not read successfully, break out of the loop
-            if not ret:
+        # Loop through the sampled frames
+        # 提取的图片都要保存，ffmpeg 模式下也输出原始分辨率
+        for frame_index, current_time, frame in iter_samples(
+            full_video_path,
+            seconds_interval,
+            start_time,
+            end_time,
+            sampling_mode,
+            max_side=None,
+        ):
+            frame_count = frame_index - start_frame
+
+            # Save the frame as an image
+            hours = int(current_time // 3600)
+            minutes = int((current_time % 3600) // 60)
+            seconds = int(current_time % 60)
+
+            # Generate the image filename
+            frame_number_in_second = int(frame_count % fps * frames_per_second) + 1
+            image_filename = "{:02d}-{:02d}-{:02d}-{:02d}-{:02d}-{:05d}.jpg".format(
+                index, hours, minutes, seconds, frame_number_in_second, image_index
+            )
+            image_path = os.path.join(output_dir, image_filename)
+
+            if on_frame:
+                # Hand the decoded frame to the caller (e.g. a detector) without the
+                # JPEG encode/decode round trip. ffmpeg frames are views into a reused
+                # buffer, so pass a copy.
+                on_frame(image_path, current_time, frame if frame.base is None else frame.copy())
+            else:
+                # Save the image in the background; the sink copies buffer views
+                writes.append(get_image_sink().submit(image_path, frame))
+
+            if max > 0 and image_index == max:
                 break
 
-            # Calculate the time of the current frame
-            current_time = start_time + frame_count / fps
-
-            # Check if it's time to extract a frame
-            if frame_count >= next_frame_to_extract:
-                # Save the frame as an image
-                hours = int(current_time // 3600)
-                minutes = int((current_time % 3600) // 60)
-                seconds = int(current_time % 60)
-
-                # Generate the image filename
-                frame_number_in_second = int(frame_count % fps * frames_per_second) + 1
-                image_filename = "{:02d}-{:02d}-{:02d}-{:02d}-{:02d}-{:05d}.jpg".format(
-                    index, hours, minutes, seconds, frame_number_in_second, image_index
-                )
-                image_path = os.path.join(output_dir, image_filename)
-
-                # Save the image
-                cv2.imwrite(image_path, frame)
-
-                if max > 0 and image_index == max:
-                    break
-
-                total_images.append(image_index)
-                # Update the next frame to extract
-                next_frame_to_extract += frame_interval
+            total_images.append(image_index)
 
-                if on_extracting:
-                    on_extracting(placeholder, image_index, total)
+            if on_extracting:
+                on_extracting(placeholder, image_index, total)
 
-                image_index += 1
-                # Increment the frame count
-            frame_count += 1
+            image_index += 1
         video_info["image_count"] = image_index
-        # Release the video file
-        video.release()
         video_summary.append(video_info)
         index += 1
 
+    # Barrier: the images are on disk before the caller lists the output directory
+    if writes:
+        wait_written(writes)
+        get_image_sink().report(video_path)
     return video_summary
 
 
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+from common.settings import LOCAL_DIRS, DETECTION_CACHE_OPTIONS
+from ai.common.detections import DetectionRecords
+from ai.common.video_index import hash_file
+from ai.common.frames import read_video_properties
+
+CACHE_SUFFIX = ".npz"
+
+
+def cache_dir():
+    return os.path.join(LOCAL_DIRS.TMP_DIR, DETECTION_CACHE_OPTIONS.DIR_NAME)
+
+
+def weights_fingerprint(weights):
+    """模型权重文件的标识，文件被替换(大小或修改时间变化)后缓存自动失效"""
+    try:
+        stat = os.stat(weights)
+    except OSError:
+        return weights
+    return f"{os.path.abspath(weights)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def cache_key(file_name, weights, seconds_interval, **sampling):
+    """
+    生成缓存键
+
+    参数:
+    file_name (str): 视频文件路径，按文件内容哈希区分
+    weights (str): 模型权重文件路径
+    seconds_interval (float): 采样间隔(秒)
+    sampling: 其他影响检测结果的采样参数，如 sampling_mode, motion_threshold
+
+    返回:
+    str: 缓存键，视频无法读取时返回None
+    """
+    properties = read_video_properties(file_name)
+    if properties is None:
+        return None
+    content_hash = properties.get("content_hash") or hash_file(file_name)
+    plan = {
+        "video": content_hash,
+        "weights": weights_fingerprint(weights),
+        "seconds_interval": seconds_interval,
+        **sampling,
+    }
+    return hashlib.sha256(json.dumps(plan, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _cache_file(key):
+    return os.path.join(cache_dir(), f"{key}{CACHE_SUFFIX}")
+
+
+def load(key):
+    """读取缓存的检测结果，不存在时返回None"""
+    if key is None:
+        return None
+    file_name = _cache_file(key)
+    try:
+        records = DetectionRecords.load(file_name)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        print(f"读取检测缓存失败: {file_name}, {e}")
+        return None
+    try:
+        # 更新修改时间，作为最近使用时间
+        os.utime(file_name)
+    except OSError:
+        pass
+    return records
+
+
+def store(key, records):
+    """写入检测结果，并按 DETECTION_CACHE_OPTIONS.MAX_BYTES 淘汰最久未使用的缓存"""
+    if key is None:
+        return
+    os.makedirs(cache_dir(), exist_ok=True)
+    file_name = _cache_file(key)
+    temp_file = f"{file_name}.{os.getpid()}.tmp"
+    try:
+        records.save(temp_file)
+        os.replace(temp_file, file_name)
+    except OSError as e:
+        print(f"写入检测缓存失败: {file_name}, {e}")
+        return
+    evict(DETECTION_CACHE_OPTIONS.MAX_BYTES)
+
+
+def evict(max_bytes):
+    """删除最久未使用的缓存，直到总大小不超过 max_bytes"""
+    entries = []
+    for entry in os.scandir(cache_dir()):
+        if entry.name.endswith(CACHE_SUFFIX):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError as e:
+            print(f"删除检测缓存失败: {path}, {e}")
@@ -0,0 +1,219 @@
+import json
+import numpy as np
+
+
+class FrameDetections:
+    """
+    单帧的检测结果
+
+    predict 之后立即由 ultralytics Results 转换得到，不再持有 torch 张量.
+    cls 为 uint8 类别编号，conf 为 float16 置信度，xyxy 为 int16 像素坐标.
+    """
+
+    __slots__ = ("cls", "conf", "xyxy", "names", "shape")
+
+    def __init__(self, cls, conf, xyxy, names, shape):
+        self.cls = cls
+        self.conf = conf
+        self.xyxy = xyxy
+        self.names = names
+        self.shape = shape
+
+    @classmethod
+    def from_result(cls, result):
+        # data 的每一行为 x1, y1, x2, y2, [track_id,] conf, cls，一次性拷贝到内存
+        data = result.boxes.data.cpu().numpy()
+        return cls(
+            data[:, -1].astype(np.uint8),
+            data[:, -2].astype(np.float16),
+            np.rint(data[:, :4]).astype(np.int16),
+            result.names,
+            tuple(result.orig_shape),
+        )
+
+    def __len__(self):
+        return len(self.cls)
+
+    def label(self, i):
+        return self.names[int(self.cls[i])]
+
+    def select(self, labels=None, min_confidence=0.0):
+        """
+        按类别名称和置信度筛选检测框
+
+        返回:
+        ndarray: 布尔掩码，labels 为 None 时不限类别
+        """
+        mask = self.conf >= min_confidence
+        if labels is not None:
+            mask &= np.isin(self.cls, _class_ids(self.names, labels))
+        return mask
+
+
+def _class_ids(names, labels):
+    if isinstance(labels, str):
+        labels = [labels]
+    return [i for i, name in names.items() if name in labels]
+
+
+class DetectionRecords:
+    """
+    按列存放的原始检测结果
+
+    每个采样帧一行(frame_index, timestamp)，所有检测框按帧顺序连续存放在
+    cls/conf/xyxy 中，offsets[i]:offsets[i + 1] 为第 i 帧的检测框.
+    坐标是检测时所用帧(宽度为 frame_width)上的像素坐标.
+    列的类型与 FrameDetections 一致，帧序号为 int32.
+    """
+
+    def __init__(
+        self,
+        frame_index=None,
+        timestamp=None,
+        offsets=None,
+        cls=None,
+        conf=None,
+        xyxy=None,
+        names=None,
+        frame_width=0,
+    ):
+        self.frame_index = np.asarray(frame_index if frame_index is not None else [], dtype=np.int32)
+        self.timestamp = np.asarray(timestamp if timestamp is not None else [], dtype=np.float64)
+        self.offsets = np.asarray(offsets if offsets is not None else [0], dtype=np.int64)
+        self.cls = np.asarray(cls if cls is not None else [], dtype=np.uint8)
+        self.conf = np.asarray(conf if conf is not None else [], dtype=np.float16)
+        self.xyxy = np.asarray(xyxy if xyxy is not None else np.empty((0, 4)), dtype=np.int16)
+        self.names = dict(names or {})
+        self.frame_width = int(frame_width)
+        self._pending = []
+
+    def __len__(self):
+        self.compact()
+        return len(self.frame_index)
+
+    def append(self, frame_index, timestamp, detections):
+        """追加一帧的检测结果(FrameDetections)"""
+        self._pending.append(
+            (frame_index, timestamp, detections.cls, detections.conf, detections.xyxy)
+        )
+        self.names = detections.names
+        self.frame_width = detections.shape[1]
+
+    def compact(self):
+        """把逐帧追加的结果合并到列数组中"""
+        if not self._pending:
+            return self
+        frame_index, timestamp, cls, conf, xyxy = zip(*self._pending)
+        counts = np.array([len(c) for c in cls], dtype=np.int64)
+        self.frame_index = np.concatenate([self.frame_index, np.array(frame_index, dtype=np.int32)])
+        self.timestamp = np.concatenate([self.timestamp, np.array(timestamp, dtype=np.float64)])
+        self.offsets = np.concatenate([self.offsets, self.offsets[-1] + np.cumsum(counts)])
+        self.cls = np.concatenate([self.cls, *cls])
+        self.conf = np.concatenate([self.conf, *conf])
+        self.xyxy = np.concatenate([self.xyxy, *xyxy])
+        self._pending = []
+        return self
+
+    def __getstate__(self):
+        # 跨进程传递前先合并，只传输数组
+        self.compact()
+        return self.__dict__
+
+    @classmethod
+    def concat(cls, records_list):
+        """按顺序拼接多个片段的检测结果"""
+        records_list = [records.compact() for records in records_list]
+        if not records_list:
+            return cls()
+        offsets = [np.zeros(1, dtype=np.int64)]
+        base = 0
+        for records in records_list:
+            offsets.append(records.offsets[1:] + base)
+            base += records.offsets[-1]
+        return cls(
+            frame_index=np.concatenate([r.frame_index for r in records_list]),
+            timestamp=np.concatenate([r.timestamp for r in records_list]),
+            offsets=np.concatenate(offsets),
+            cls=np.concatenate([r.cls for r in records_list]),
+            conf=np.concatenate([r.conf for r in records_list]),
+            xyxy=np.concatenate([r.xyxy for r in records_list]),
+            names=next((r.names for r in records_list if r.names), {}),
+            frame_width=max(r.frame_width for r in records_list),
+        )
+
+    def box_timestamps(self):
+        """每个检测框所在帧的时间"""
+        self.compact()
+        return np.repeat(self.timestamp, np.diff(self.offsets))
+
+    def select(self, labels=None, min_confidence=0.0, start_time=None, end_time=None):
+        """
+        按类别名称、置信度和时间范围筛选检测框
+
+        返回:
+        ndarray: 与 cls/conf/xyxy 对应的布尔掩码
+        """
+        self.compact()
+        mask = self.conf >= min_confidence
+        if labels is not None:
+            mask &= np.isin(self.cls, _class_ids(self.names, labels))
+        if start_time is not None or end_time is not None:
+            timestamps = self.box_timestamps()
+            if start_time is not None:
+                mask &= timestamps >= start_time
+            if end_time is not None:
+                mask &= timestamps <= end_time
+        return mask
+
+    def matches(self, label, min_confidence, start_time=None, end_time=None):
+        """
+        查找包含指定标签的帧
+
+        返回:
+        generator: (frame_index, timestamp, conf, xyxy)，conf/xyxy 只包含该帧中匹配的检测框
+        """
+        mask = self.select(label, min_confidence, start_time, end_time)
+        if not mask.any():
+            return
+        # 每帧匹配的检测框数量
+        cumulative = np.concatenate([[0], np.cumsum(mask)])
+        counts = cumulative[self.offsets[1:]] - cumulative[self.offsets[:-1]]
+        for row in np.flatnonzero(counts):
+            start, end = self.offsets[row], self.offsets[row + 1]
+            selected = mask[start:end]
+            yield (
+                int(self.frame_index[row]),
+                float(self.timestamp[row]),
+                self.conf[start:end][selected],
+                self.xyxy[start:end][selected],
+            )
+
+    def save(self, file_name):
+        self.compact()
+        with open(file_name, "wb") as f:
+            np.savez(
+                f,
+                frame_index=self.frame_index,
+                timestamp=self.timestamp,
+                offsets=self.offsets,
+                cls=self.cls,
+                conf=self.conf,
+                xyxy=self.xyxy,
+                names=np.array(json.dumps(self.names)),
+                frame_width=np.array(self.frame_width),
+            )
+
+    @classmethod
+    def load(cls, file_name):
+        with np.load(file_name, allow_pickle=False) as data:
+            names = {int(k): v for k, v in json.loads(str(data["names"])).items()}
+            return cls(
+                frame_index=data["frame_index"],
+                timestamp=data["timestamp"],
+                offsets=data["offsets"],
+                cls=data["cls"],
+                conf=data["conf"],
+                xyxy=data["xyxy"],
+                names=names,
+                frame_width=int(data["frame_width"]),
+            )
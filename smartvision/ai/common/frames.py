@@ -0,0 +1,624 @@
+import bisect
+import resource
+import subprocess
+import sys
+import time
+from fractions import Fraction
+import cv2
+import numpy as np
+from common.settings import SAMPLING_MODES, FFMPEG_OPTIONS, DECODE_OPTIONS
+from ai.common.video_index import load_video_index, keyframe_before, max_gop_frames
+from common.capabilities import ffmpeg_hwaccel
+
+# 两个采样点之间的帧数超过该值时，顺序 grab 比重新 seek 更慢，改为直接 seek.
+# 监控摄像头常见的 GOP 长度在 1~10 秒之间，这里取 250 帧(25fps 下 10 秒).
+DEFAULT_GOP_FRAMES = 250
+
+
+def read_video_properties(file_name):
+    """
+    读取视频的基本属性，优先使用视频旁的索引文件，不再每次打开视频探测
+
+    参数:
+    file_name (str): 视频文件路径
+
+    返回:
+    dict: fps, total_frames, width, height, duration 以及索引中的其他字段；无法打开时返回None
+    """
+    index = load_video_index(file_name)
+    if index is not None:
+        return index
+
+    # 容器无法解析时退回到 OpenCV 探测
+    cap = cv2.VideoCapture(file_name)
+    if not cap.isOpened():
+        return None
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    properties = {
+        "fps": fps,
+        "total_frames": total_frames,
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "duration": total_frames / fps if fps > 0 else 0,
+        "keyframes": [],
+    }
+    cap.release()
+    return properties
+
+
+def seek_frame(cap, frame_index, properties):
+    """
+    把 cap 定位到 frame_index 之前最近的关键帧，再用 grab() 前进到 frame_index 之前一帧，
+    之后的 read()/grab() 得到的就是 frame_index. 没有关键帧索引时直接 seek.
+
+    返回:
+    int: 最后一次 grab 的帧序号
+    """
+    fps = properties["fps"]
+    keyframe = keyframe_before(properties, frame_index / fps) if properties.get("keyframes") else None
+    if keyframe is None:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        return frame_index - 1
+
+    position = int(round(keyframe[0] * fps))
+    cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+    position -= 1
+    while position < frame_index - 1:
+        if not cap.grab():
+            break
+        position += 1
+    return position
+
+
+def sample_frames(
+    file_name,
+    seconds_interval=1.0,
+    start_time=0.0,
+    end_time=None,
+    gop_frames=None,
+):
+    """
+    按固定时间间隔从视频中采样帧
+
+    顺序使用 grab() 向前移动，只对需要的帧调用 retrieve() 解码输出，
+    避免每次 cap.set(CAP_PROP_POS_MSEC) 导致解码器回退到上一个关键帧重新解码.
+    只有当两个采样点之间的距离超过一个 GOP 时才退回到 seek.
+
+    参数:
+    file_name (str): 视频文件路径
+    seconds_interval (float): 采样间隔(秒)
+    start_time (float): 开始时间(秒)
+    end_time (float): 结束时间(秒)，None 表示到视频结尾
+    gop_frames (int): 超过该帧数的间隔使用 seek 代替 grab，None 表示按索引中的最长 GOP 计算
+
+    返回:
+    generator: (frame_index, timestamp, frame) 元组，timestamp 单位为秒
+    """
+    properties = read_video_properties(file_name)
+    cap = cv2.VideoCapture(file_name)
+    try:
+        if properties is None or not cap.isOpened():
+            print(f"无法打开视频文件: {file_name}")
+            return
+
+        fps = properties["fps"]
+        if fps <= 0:
+            print(f"无效的视频帧率: {fps}, 文件: {file_name}")
+            return
+        if gop_frames is None:
+            gop_frames = max_gop_frames(properties) or DEFAULT_GOP_FRAMES
+
+        total_frames = properties["total_frames"]
+        end_frame = total_frames - 1 if total_frames > 0 else None
+        if end_time is not None:
+            last = int(end_time * fps)
+            end_frame = last if end_frame is None else min(end_frame, last)
+
+        sample_index = 0
+        position = -1  # 最后一次 grab 的帧序号
+        while True:
+            target_frame = int(round((start_time + sample_index * seconds_interval) * fps))
+            if end_frame is not None and target_frame > end_frame:
+                break
+            if target_frame <= position:
+                # 采样间隔小于一帧
+                sample_index += 1
+                continue
+
+            if target_frame - position > gop_frames:
+                position = seek_frame(cap, target_frame, properties)
+
+            ok = True
+            while position < target_frame:
+                ok = cap.grab()
+                if not ok:
+                    break
+                position += 1
+            if not ok:
+                break
+
+            ret, frame = cap.retrieve()
+            if not ret:
+                break
+
+            yield position, position / fps, frame
+            sample_index += 1
+    finally:
+        cap.release()
+
+
+def sample_keyframes(
+    file_name,
+    seconds_interval=1.0,
+    start_time=0.0,
+    end_time=None,
+    report=None,
+):
+    """
+    以关键帧为主的粗粒度采样
+
+    关键帧时间表来自视频的索引文件(解复用时根据数据包的关键帧标记建立).
+    每个采样点优先使用半个采样间隔内最近的关键帧，只解码这些关键帧；
+    GOP 比采样间隔长、附近没有关键帧时，从前一个关键帧开始解码到所需的非关键帧为止.
+
+    参数:
+    file_name (str): 视频文件路径
+    seconds_interval (float): 采样间隔(秒)
+    start_time (float): 开始时间(秒)
+    end_time (float): 结束时间(秒)，None 表示到视频结尾
+    report (dict): 可选，用于返回采样统计信息
+
+    返回:
+    generator: (frame_index, timestamp, frame) 元组，timestamp 为帧的真实显示时间(秒)
+    """
+    import av
+
+    index = load_video_index(file_name)
+    if index is None or not index["keyframes"]:
+        print(f"没有找到关键帧索引: {file_name}")
+        return
+
+    try:
+        container = av.open(file_name)
+    except (av.error.FFmpegError, OSError) as e:
+        print(f"无法打开视频文件: {file_name}, {e}")
+        return
+
+    try:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        time_base = stream.time_base
+        fps = index["fps"]
+        if fps <= 0:
+            print(f"无效的视频帧率: {fps}, 文件: {file_name}")
+            return
+
+        first_pts = index["start_pts"]
+        rotation = index.get("rotation", 0)
+
+        def to_seconds(pts):
+            return float((pts - first_pts) * time_base)
+
+        key_times = [k[0] for k in index["keyframes"]]
+        key_pts = [k[1] for k in index["keyframes"]]
+        duration = index["duration"]
+        if end_time is None or end_time > duration:
+            end_time = duration
+
+        # 为每个采样点分配关键帧，或记录需要解码的非关键帧
+        tolerance = seconds_interval / 2
+        used_keys = set()
+        non_key_targets = {}
+        target = start_time
+        while target <= end_time:
+            i = max(0, bisect.bisect_right(key_times, target) - 1)
+            if abs(key_times[i] - target) <= tolerance:
+                used_keys.add(i)
+            elif i + 1 < len(key_times) and key_times[i + 1] - target <= tolerance:
+                used_keys.add(i + 1)
+            else:
+                non_key_targets.setdefault(i, []).append(target)
+            target += seconds_interval
+
+        samples = 0
+        non_key_frames = 0
+        for i in sorted(used_keys | set(non_key_targets)):
+            targets = non_key_targets.get(i, [])
+            # 只需要关键帧时让解码器跳过所有非关键帧
+            stream.codec_context.skip_frame = "DEFAULT" if targets else "NONKEY"
+            container.seek(key_pts[i], stream=stream, backward=True)
+            for frame in container.decode(stream):
+                if frame.pts is None:
+                    continue
+                timestamp = to_seconds(frame.pts)
+                if i in used_keys and frame.key_frame:
+                    used_keys.discard(i)
+                    samples += 1
+                    yield (
+                        int(round(timestamp * fps)),
+                        timestamp,
+                        rotate_to_display(frame.to_ndarray(format="bgr24"), rotation),
+                    )
+                    if not targets:
+                        break
+                    continue
+                if targets and timestamp >= targets[0] - 0.5 / fps:
+                    while targets and timestamp >= targets[0] - 0.5 / fps:
+                        targets.pop(0)
+                    samples += 1
+                    non_key_frames += 1
+                    yield (
+                        int(round(timestamp * fps)),
+                        timestamp,
+                        rotate_to_display(frame.to_ndarray(format="bgr24"), rotation),
+                    )
+                if not targets and i not in used_keys:
+                    break
+
+        covered = max(end_time - start_time, seconds_interval)
+        stats = {
+            "samples": samples,
+            "key_frames": samples - non_key_frames,
+            "non_key_frames": non_key_frames,
+            "requested_density": 1 / seconds_interval,
+            "effective_density": samples / covered,
+        }
+        if report is not None:
+            report.update(stats)
+        print(
+            f"关键帧采样: {samples} 帧(关键帧 {stats['key_frames']}, 非关键帧 {non_key_frames}), "
+            f"有效采样密度 {stats['effective_density']:.3f} 帧/秒, 请求 {stats['requested_density']:.3f} 帧/秒"
+        )
+    finally:
+        container.close()
+
+
+def sample_pyav_frames(
+    file_name,
+    seconds_interval=1.0,
+    start_time=0.0,
+    end_time=None,
+    thread_type=DECODE_OPTIONS.PYAV_THREAD_TYPE,
+    thread_count=DECODE_OPTIONS.PYAV_THREAD_COUNT,
+    skip_nonref=DECODE_OPTIONS.PYAV_SKIP_NONREF,
+):
+    """
+    使用 PyAV 顺序解码并按时间间隔采样
+
+    解码器使用帧级/slice 级多线程，只有被采样的帧才转换成 BGR 数组.
+    每个采样点取 PTS 不早于该时间点的第一帧，timestamp 为帧的真实显示时间.
+
+    参数:
+    file_name (str): 视频文件路径
+    seconds_interval (float): 采样间隔(秒)
+    start_time (float): 开始时间(秒)
+    end_time (float): 结束时间(秒)，None 表示到视频结尾
+    thread_type (str): 解码线程类型，见 DECODE_OPTIONS.PYAV_THREAD_TYPE
+    thread_count (int): 解码线程数，0 表示自动
+    skip_nonref (bool): 跳过非参考帧，采样点会落到之后最近的参考帧上
+
+    返回:
+    generator: (frame_index, timestamp, frame) 元组
+    """
+    import av
+
+    properties = read_video_properties(file_name)
+    if properties is None:
+        print(f"无法打开视频文件: {file_name}")
+        return
+    fps = properties["fps"]
+    if fps <= 0:
+        print(f"无效的视频帧率: {fps}, 文件: {file_name}")
+        return
+
+    try:
+        container = av.open(file_name)
+    except (av.error.FFmpegError, OSError) as e:
+        print(f"无法打开视频文件: {file_name}, {e}")
+        return
+
+    try:
+        stream = container.streams.video[0]
+        stream.thread_type = thread_type
+        stream.thread_count = thread_count
+        if skip_nonref:
+            stream.codec_context.skip_frame = "NONREF"
+        time_base = stream.time_base
+        rotation = properties.get("rotation", 0)
+        first_pts = properties.get("start_pts")
+        if first_pts is None:
+            first_pts = stream.start_time or 0
+
+        if start_time > 0:
+            keyframe = keyframe_before(properties, start_time) if properties.get("keyframes") else None
+            if keyframe is not None:
+                container.seek(keyframe[1], stream=stream, backward=True)
+            else:
+                container.seek(int(first_pts + start_time / time_base), stream=stream, backward=True)
+
+        # 允许采样帧比采样点早半帧，与按帧序号取整的其他采样方式保持一致
+        half_frame = 0.5 / fps
+        target = start_time
+        for frame in container.decode(stream):
+            if frame.pts is None:
+                continue
+            timestamp = float((frame.pts - first_pts) * time_base)
+            if end_time is not None and timestamp > end_time + half_frame:
+                break
+            if timestamp < target - half_frame:
+                continue
+            yield (
+                int(round(timestamp * fps)),
+                timestamp,
+                rotate_to_display(frame.to_ndarray(format="bgr24"), rotation),
+            )
+            while target - half_frame <= timestamp:
+                target += seconds_interval
+    except av.error.FFmpegError as e:
+        print(f"解码失败: {file_name}, {e}")
+    finally:
+        container.close()
+
+
+def rotate_to_display(image, rotation):
+    """
+    按索引中的 rotation(顺时针角度)把解码得到的图像旋转到显示方向
+
+    OpenCV 与 ffmpeg 命令行会自动旋转，PyAV 解码的帧需要在这里旋转，各采样方式输出的帧方向与尺寸一致.
+    """
+    rotation = rotation % 360
+    if rotation == 90:
+        return cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
+    if rotation == 180:
+        return cv2.rotate(image, cv2.ROTATE_180)
+    if rotation == 270:
+        return cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return image
+
+
+def ffmpeg_output_size(properties, max_side=FFMPEG_OPTIONS.MAX_SIDE):
+    """
+    计算 ffmpeg 输出帧的宽高
+
+    ffmpeg 会按视频的旋转信息自动旋转画面，宽高按显示方向计算；
+    长边超过 max_side 时等比缩小，宽高取偶数.
+
+    返回:
+    tuple: (width, height)
+    """
+    width, height = properties["width"], properties["height"]
+    if properties.get("rotation", 0) % 180:
+        width, height = height, width
+    if max_side and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+        width = max(2, int(round(width * scale / 2)) * 2)
+        height = max(2, int(round(height * scale / 2)) * 2)
+    return width, height
+
+
+def sample_ffmpeg_frames(
+    file_name,
+    seconds_interval=1.0,
+    start_time=0.0,
+    end_time=None,
+    max_side=FFMPEG_OPTIONS.MAX_SIDE,
+):
+    """
+    由 ffmpeg 子进程解码，按采样间隔输出缩小后的 BGR 帧
+
+    ffmpeg 使用 -vf fps=...,scale=... 在解码端完成抽帧和缩放，通过管道输出 rawvideo，
+    直接读入预分配的 numpy 缓冲区. 返回的帧是缓冲区的视图，需要长期保存时应 copy().
+
+    参数:
+    file_name (str): 视频文件路径
+    seconds_interval (float): 采样间隔(秒)
+    start_time (float): 开始时间(秒)
+    end_time (float): 结束时间(秒)，None 表示到视频结尾
+    max_side (int): 输出帧长边的最大尺寸，None 表示保持原始分辨率
+
+    返回:
+    generator: (frame_index, timestamp, frame) 元组，frame_index 为原视频中对应的帧序号
+    """
+    properties = read_video_properties(file_name)
+    if properties is None:
+        print(f"无法打开视频文件: {file_name}")
+        return
+    fps = properties["fps"]
+    if fps <= 0:
+        print(f"无效的视频帧率: {fps}, 文件: {file_name}")
+        return
+
+    width, height = ffmpeg_output_size(properties, max_side)
+    rate = Fraction(seconds_interval).limit_denominator(1000)
+    filters = [f"fps={rate.denominator}/{rate.numerator}"]
+    if (width, height) != ffmpeg_output_size(properties, None):
+        filters.append(f"scale={width}:{height}")
+
+    command = [
+        FFMPEG_OPTIONS.BINARY,
+        "-nostdin",
+        "-hide_banner",
+        "-loglevel", "error",
+    ]
+    hwaccel = ffmpeg_hwaccel()
+    if hwaccel:
+        command += ["-hwaccel", hwaccel]
+    command += [
+        "-ss", f"{start_time:.3f}",
+        "-i", file_name,
+    ]
+    if end_time is not None:
+        # 多留半个采样间隔，使 end_time 处的采样点也能输出
+        command += ["-t", f"{end_time - start_time + seconds_interval / 2:.3f}"]
+    command += [
+        "-an", "-sn",
+        "-vf", ",".join(filters),
+        "-f", "rawvideo",
+        "-pix_fmt", "bgr24",
+        "pipe:1",
+    ]
+
+    try:
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+    except OSError as e:
+        print(f"无法启动 ffmpeg: {e}")
+        return
+
+    frame_size = width * height * 3
+    buffers = None
+    slot = FFMPEG_OPTIONS.BUFFER_FRAMES
+    sample_index = 0
+    try:
+        while True:
+            timestamp = start_time + sample_index * seconds_interval
+            if end_time is not None and timestamp > end_time:
+                break
+            if slot >= FFMPEG_OPTIONS.BUFFER_FRAMES:
+                # 已输出的帧可能仍被使用，分配新的一组缓冲区而不是覆盖旧的
+                buffers = np.empty(
+                    (FFMPEG_OPTIONS.BUFFER_FRAMES, height, width, 3), dtype=np.uint8
+                )
+                slot = 0
+            frame = buffers[slot]
+            view = memoryview(frame).cast("B")
+            filled = 0
+            while filled < frame_size:
+                count = process.stdout.readinto(view[filled:])
+                if not count:
+                    break
+                filled += count
+            if filled < frame_size:
+                break
+
+            slot += 1
+            sample_index += 1
+            yield int(round(timestamp * fps)), timestamp, frame
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        returncode = process.wait()
+        if returncode > 0:
+            print(f"ffmpeg 解码失败(返回码 {returncode}), 文件: {file_name}")
+
+
+def read_full_frame(file_name, frame_index):
+    """读取原始分辨率的一帧，无法读取时返回None"""
+    properties = read_video_properties(file_name)
+    if properties is None:
+        return None
+    cap = cv2.VideoCapture(file_name)
+    try:
+        seek_frame(cap, frame_index, properties)
+        ret, frame = cap.read()
+        return frame if ret else None
+    finally:
+        cap.release()
+
+
+def iter_samples(
+    file_name,
+    seconds_interval=1.0,
+    start_time=0.0,
+    end_time=None,
+    mode=DECODE_OPTIONS.SAMPLING_MODE,
+    report=None,
+    max_side=FFMPEG_OPTIONS.MAX_SIDE,
+):
+    """
+    按采样模式选择采样器，返回 (frame_index, timestamp, frame) 的迭代器
+
+    max_side 只对 ffmpeg 模式有效，其他模式输出原始分辨率的帧.
+    """
+    if mode == SAMPLING_MODES.KEYFRAME:
+        return sample_keyframes(file_name, seconds_interval, start_time, end_time, report)
+    if mode == SAMPLING_MODES.GRAB:
+        return sample_frames(file_name, seconds_interval, start_time, end_time)
+    if mode == SAMPLING_MODES.FFMPEG:
+        return sample_ffmpeg_frames(file_name, seconds_interval, start_time, end_time, max_side)
+    if mode == SAMPLING_MODES.PYAV:
+        return sample_pyav_frames(file_name, seconds_interval, start_time, end_time)
+    raise ValueError(f"Unknown sampling mode: {mode}")
+
+
+def _seek_sample_frames(file_name, seconds_interval=1.0):
+    """原有的逐次 seek 采样方式，仅用于性能对比"""
+    cap = cv2.VideoCapture(file_name)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    current_target_msec = 0
+    while cap.isOpened():
+        cap.set(cv2.CAP_PROP_POS_MSEC, current_target_msec)
+        ret, frame = cap.read()
+        if not ret:
+            break
+        current_target_msec += seconds_interval * 1000
+        frame_index = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+        yield frame_index, frame_index / fps, frame
+    cap.release()
+
+
+def _cpu_seconds():
+    """当前进程及已结束子进程(ffmpeg)占用的 CPU 时间"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def benchmark_sampling(file_names, seconds_interval=1.0, modes=None):
+    """
+    用不同的解码后端采样同一组视频，对比吞吐量与 CPU 占用
+
+    参数:
+    file_names (list): 视频文件路径，也可以是单个路径
+    seconds_interval (float): 采样间隔(秒)
+    modes (list): 要对比的采样模式，None 表示 seek 与全部 SAMPLING_MODES
+
+    返回:
+    dict: 每种方式的采样帧数、耗时、每秒采样帧数与 CPU 占用(100% 为一个核)
+    """
+    if isinstance(file_names, str):
+        file_names = [file_names]
+    if modes is None:
+        modes = [
+            "seek",
+            SAMPLING_MODES.GRAB,
+            SAMPLING_MODES.KEYFRAME,
+            SAMPLING_MODES.FFMPEG,
+            SAMPLING_MODES.PYAV,
+        ]
+
+    report = {}
+    for mode in modes:
+        start = time.perf_counter()
+        cpu_start = _cpu_seconds()
+        count = 0
+        for file_name in file_names:
+            if mode == "seek":
+                samples = _seek_sample_frames(file_name, seconds_interval)
+            else:
+                samples = iter_samples(file_name, seconds_interval, mode=mode)
+            for _ in samples:
+                count += 1
+        elapsed = time.perf_counter() - start
+        cpu = _cpu_seconds() - cpu_start
+        report[mode] = {
+            "frames": count,
+            "seconds": elapsed,
+            "fps": count / elapsed if elapsed > 0 else 0,
+            "cpu_percent": cpu / elapsed * 100 if elapsed > 0 else 0,
+        }
+        print(
+            f"{mode}: {count} 帧, 耗时 {elapsed:.2f} 秒, {report[mode]['fps']:.1f} 帧/秒, "
+            f"CPU {report[mode]['cpu_percent']:.0f}%"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    # python -m ai.common.frames <采样间隔> <视频文件>...
+    interval = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    video_files = sys.argv[2:] or ["/var/tmp/smart-vision/video/sample.mp4"]
+    benchmark_sampling(video_files, interval)
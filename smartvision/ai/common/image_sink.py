@@ -0,0 +1,240 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, wait
+import cv2
+from common.settings import IMAGE_SINK_OPTIONS
+
+_STOP = object()
+
+
+class ImageSink:
+    """
+    异步写图片
+
+    submit 把 (路径, 图像, 质量) 放入有界队列后立即返回，由一组编码线程完成编码与写盘，
+    扫描循环不再等待 JPEG 编码与磁盘 I/O. 队列满时 submit 阻塞(背压)，内存占用有界.
+    文件先写入临时文件再改名，界面不会读到写了一半的图片.
+
+    submit 返回 Future，wait_written(futures) 等待这些文件写完；flush() 等待所有已提交的文件.
+    """
+
+    def __init__(
+        self,
+        workers=IMAGE_SINK_OPTIONS.WORKERS,
+        queue_size=IMAGE_SINK_OPTIONS.QUEUE_SIZE,
+        jpeg_encoder=IMAGE_SINK_OPTIONS.JPEG_ENCODER,
+        fsync_batch=IMAGE_SINK_OPTIONS.FSYNC_BATCH,
+    ):
+        self.workers = workers if workers and workers > 0 else max(1, min(4, os.cpu_count() or 1))
+        self.fsync_batch = fsync_batch
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        # 已改名但尚未 fsync 的文件
+        self._unsynced = []
+        self._stats = {
+            "files": 0,
+            "bytes": 0,
+            "failed": 0,
+            # 各线程编码、写盘耗时之和
+            "encode_seconds": 0.0,
+            "write_seconds": 0.0,
+            # 有图片等待或正在写入的墙钟时间(从提交到全部写完)，空闲时间不计入
+            "busy_seconds": 0.0,
+        }
+        self._busy_since = None
+        self._turbojpeg = _load_turbojpeg() if jpeg_encoder == "turbojpeg" else None
+        self._threads = [
+            threading.Thread(target=self._run, name=f"image-sink-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, path, image, quality=None):
+        """
+        提交一张图片
+
+        参数:
+        path (str): 输出路径，按扩展名选择格式(.jpg/.jpeg/.png/.webp)
+        image (ndarray): BGR 图像，提交后调用方不应再修改它；共享缓冲区的视图会被复制
+        quality (int): 编码质量，None 表示使用 IMAGE_SINK_OPTIONS 中的默认值
+
+        返回:
+        Future: 写完后结果为 path，失败时为异常
+        """
+        future = Future()
+        if image.base is not None:
+            image = image.copy()
+        with self._lock:
+            if self._pending == 0:
+                self._busy_since = time.perf_counter()
+            self._pending += 1
+        self._queue.put((path, image, quality, future))
+        return future
+
+    def _encode(self, path, image, quality):
+        extension = os.path.splitext(path)[1].lower()
+        if extension in (".jpg", ".jpeg"):
+            quality = IMAGE_SINK_OPTIONS.JPEG_QUALITY if quality is None else quality
+            if self._turbojpeg is not None:
+                return self._turbojpeg.encode(image, quality=quality)
+            params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        elif extension == ".webp":
+            quality = IMAGE_SINK_OPTIONS.WEBP_QUALITY if quality is None else quality
+            params = [cv2.IMWRITE_WEBP_QUALITY, quality]
+        else:
+            params = []
+        ok, data = cv2.imencode(extension, image, params)
+        if not ok:
+            raise ValueError(f"无法编码图片: {path}")
+        return data.tobytes()
+
+    def _write(self, path, data):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_file = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_file, "wb") as f:
+            f.write(data)
+        os.replace(temp_file, path)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                return
+            path, image, quality, future = job
+            try:
+                start = time.perf_counter()
+                data = self._encode(path, image, quality)
+                encoded = time.perf_counter()
+                self._write(path, data)
+                written = time.perf_counter()
+                with self._lock:
+                    self._stats["files"] += 1
+                    self._stats["bytes"] += len(data)
+                    self._stats["encode_seconds"] += encoded - start
+                    self._stats["write_seconds"] += written - encoded
+                    synced = []
+                    if self.fsync_batch > 0:
+                        self._unsynced.append(path)
+                        if len(self._unsynced) >= self.fsync_batch:
+                            synced, self._unsynced = self._unsynced, []
+                _fsync_files(synced)
+                future.set_result(path)
+            except Exception as e:
+                print(f"写入图片失败: {path}, {e}")
+                with self._lock:
+                    self._stats["failed"] += 1
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+                    if self._pending == 0:
+                        self._stats["busy_seconds"] += time.perf_counter() - self._busy_since
+                        self._busy_since = None
+                        self._idle.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        等待所有已提交的图片写完
+
+        返回:
+        bool: 超时返回 False
+        """
+        with self._lock:
+            done = self._idle.wait_for(lambda: self._pending == 0, timeout)
+            synced = []
+            if done:
+                synced, self._unsynced = self._unsynced, []
+        _fsync_files(synced)
+        return done
+
+    def stats(self):
+        """
+        已写入的文件数、字节数、失败数以及吞吐量
+
+        吞吐量按墙钟时间(busy_seconds，包括仍在进行中的部分)计算，是所有编码线程合计的吞吐量；
+        encode_seconds/write_seconds 是各线程耗时之和，用于判断瓶颈在编码还是写盘.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = self._pending
+            if self._busy_since is not None:
+                stats["busy_seconds"] += time.perf_counter() - self._busy_since
+        busy_seconds = stats["busy_seconds"]
+        stats["files_per_second"] = stats["files"] / busy_seconds if busy_seconds else 0.0
+        stats["mb_per_second"] = stats["bytes"] / 1e6 / busy_seconds if busy_seconds else 0.0
+        return stats
+
+    def report(self, name):
+        stats = self.stats()
+        print(
+            f"图片写入: {stats['files']} 个文件, {stats['bytes'] / 1e6:.1f} MB, "
+            f"失败 {stats['failed']}, 吞吐量 {stats['files_per_second']:.1f} 张/秒 "
+            f"({stats['mb_per_second']:.1f} MB/秒), 编码耗时合计 {stats['encode_seconds']:.2f} 秒, {name}"
+        )
+
+    def close(self):
+        self.flush()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+
+def _fsync_files(paths):
+    """
+    fsync 这些文件以及它们所在的目录(保证改名落盘)
+
+    只同步本 ImageSink 写入的文件，不像 os.sync() 那样刷新整个主机的脏页.
+    失败(如文件已被界面或清理任务删除)只打印，不影响已写入的文件.
+    """
+    directories = {os.path.dirname(path) or "." for path in paths}
+    for path in [*paths, *sorted(directories)]:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            print(f"fsync 失败: {path}, {e}")
+
+
+def _load_turbojpeg():
+    try:
+        from turbojpeg import TurboJPEG
+
+        return TurboJPEG()
+    except (ImportError, OSError) as e:
+        print(f"turbojpeg 不可用，使用 opencv 编码 JPEG: {e}")
+        return None
+
+
+def wait_written(futures, timeout=None):
+    """
+    等待 submit 返回的 Future 都完成
+
+    返回:
+    int: 写入失败(或超时未完成)的文件数
+    """
+    done, not_done = wait(futures, timeout)
+    return len(not_done) + sum(1 for future in done if future.exception() is not None)
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_image_sink():
+    """返回进程内共享的 ImageSink"""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = ImageSink()
+        return _sink
@@ -0,0 +1,61 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from common.settings import IMAGE_DIR_OPTIONS
+
+# JPEG 在 DCT 域缩小解码(libjpeg scale)，只解码需要的系数，比解码后再缩放快得多
+_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def decode_workers(workers=IMAGE_DIR_OPTIONS.DECODE_WORKERS):
+    if workers and workers > 0:
+        return workers
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+def read_image(file_name, reduce=1):
+    """
+    读取图片
+
+    参数:
+    reduce (int): 1、2、4 或 8，按该比例缩小解码
+
+    返回:
+    ndarray: BGR 图像，读取失败时返回 None
+    """
+    if reduce not in _REDUCED_FLAGS:
+        raise ValueError(f"Unsupported reduce factor: {reduce}")
+    return cv2.imread(file_name, _REDUCED_FLAGS[reduce])
+
+
+def iter_images(file_names, reduce=1, workers=None, lookahead=None):
+    """
+    在线程池中并行解码图片，按输入顺序返回
+
+    cv2.imread 解码时释放 GIL，多个线程可以同时解码. 同时提交的图片数不超过 lookahead，
+    目录中有几千张图片时内存占用也是有界的.
+
+    返回:
+    generator: (file_name, image)，读取失败时 image 为 None
+    """
+    workers = decode_workers(workers)
+    lookahead = max(1, lookahead or workers * 2)
+    names = iter(file_names)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-decode") as pool:
+        pending = deque()
+        for file_name in names:
+            pending.append((file_name, pool.submit(read_image, file_name, reduce)))
+            if len(pending) >= lookahead:
+                break
+        while pending:
+            file_name, future = pending.popleft()
+            next_name = next(names, None)
+            if next_name is not None:
+                pending.append((next_name, pool.submit(read_image, next_name, reduce)))
+            yield file_name, future.result()
@@ -0,0 +1,179 @@
+import sys
+import time
+from common.settings import INFERENCE_OPTIONS
+from ai.common.detections import FrameDetections
+
+
+def adaptive_batches(iterable, sizer):
+    """把 iterable 按 sizer 当前的批大小分组，批大小调整后下一组立即生效，最后一组可能不足"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= sizer.size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _is_out_of_memory(error):
+    if isinstance(error, MemoryError):
+        return True
+    return isinstance(error, RuntimeError) and "out of memory" in str(error).lower()
+
+
+class BatchSizer:
+    """
+    自适应批大小
+
+    从配置的批大小开始，推理出现内存不足时减半重试，直到批大小为 1.
+    减小后连续 grow_after 次推理成功则加倍，最多恢复到初始的批大小；
+    再次内存不足时重新减半并重新计数. grow_after 为 0 时不再恢复.
+    """
+
+    def __init__(
+        self,
+        batch_size=INFERENCE_OPTIONS.BATCH_SIZE,
+        grow_after=INFERENCE_OPTIONS.BATCH_GROW_AFTER,
+    ):
+        self.max_size = max(1, int(batch_size))
+        self.size = self.max_size
+        self.grow_after = grow_after
+        self._successes = 0
+
+    def shrink(self):
+        self._successes = 0
+        if self.size <= 1:
+            return False
+        self.size = max(1, self.size // 2)
+        print(f"推理内存不足，批大小调整为 {self.size}")
+        return True
+
+    def succeeded(self):
+        """一次推理成功，批大小减小过且连续成功次数足够时加倍"""
+        if self.size >= self.max_size or self.grow_after <= 0:
+            return
+        self._successes += 1
+        if self._successes >= self.grow_after:
+            self._successes = 0
+            self.size = min(self.max_size, self.size * 2)
+            print(f"推理连续成功 {self.grow_after} 次，批大小恢复为 {self.size}")
+
+
+def predict_batch(model, frames, device, sizer=None, **predict_kwargs):
+    """
+    批量检测
+
+    参数:
+    model: YOLO 模型
+    frames (list): 帧(ndarray)或图片路径列表
+    device (str): 推理设备
+    sizer (BatchSizer): 批大小控制，None 表示使用默认配置
+    predict_kwargs: 透传给 model.predict 的参数，如 classes
+
+    返回:
+    list: 与 frames 顺序一致的检测结果，每帧一个 FrameDetections
+    """
+    if sizer is None:
+        sizer = BatchSizer()
+
+    results = []
+    start = 0
+    while start < len(frames):
+        chunk = frames[start : start + sizer.size]
+        try:
+            chunk_results = model.predict(
+                chunk, device=device, verbose=False, **predict_kwargs
+            )
+        except (RuntimeError, MemoryError) as e:
+            if _is_out_of_memory(e) and sizer.shrink():
+                continue
+            raise
+        sizer.succeeded()
+        # 立即转换成 numpy，不让 torch 张量留在推理调用之外
+        results.extend(FrameDetections.from_result(result) for result in chunk_results)
+        start += len(chunk)
+    return results
+
+
+def detect_frames(
+    model,
+    frames,
+    device,
+    batch_size=INFERENCE_OPTIONS.BATCH_SIZE,
+    gate=None,
+    **predict_kwargs,
+):
+    """
+    对采样器输出的帧分批检测，并把结果对应回每一帧
+
+    参数:
+    frames: (frame_index, timestamp, frame) 的迭代器
+    batch_size (int): 初始批大小，内存不足时减半，之后逐步恢复，见 BatchSizer
+    gate (MotionGate): 可选，画面没有变化的帧不送入模型，复用上一次推理的结果
+
+    返回:
+    generator: (frame_index, timestamp, frame, detections) 元组，顺序与输入一致
+    """
+    sizer = BatchSizer(batch_size)
+    last_result = None
+    # 每一组按当前的批大小分组，减半后不再按原来的大小分组再在 predict_batch 中拆分
+    for batch in adaptive_batches(frames, sizer):
+        # MotionGate 总是推理第一帧，因此 last_result 在被复用前一定已有值
+        inferred = [gate is None or gate.should_infer(item[-1]) for item in batch]
+        results = iter(
+            predict_batch(
+                model,
+                [item[-1] for item, infer in zip(batch, inferred) if infer],
+                device,
+                sizer,
+                **predict_kwargs,
+            )
+        )
+        for item, infer in zip(batch, inferred):
+            if infer:
+                last_result = next(results)
+            yield (*item, last_result)
+
+
+def benchmark_batch_sizes(model, frames, device, batch_sizes=(1, 4, 8, 16), rounds=2):
+    """
+    测试不同批大小下的推理吞吐量
+
+    参数:
+    frames (list): 用于测试的帧
+    rounds (int): 每个批大小重复的次数，取最好的一次
+
+    返回:
+    dict: 批大小 -> 每秒处理帧数
+    """
+    # 预热，避免首次推理的初始化开销影响结果
+    model.predict(frames[0], device=device, verbose=False)
+
+    report = {}
+    for batch_size in batch_sizes:
+        best = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            predict_batch(model, frames, device, BatchSizer(batch_size))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        report[batch_size] = len(frames) / best if best > 0 else 0
+        print(f"batch={batch_size:>2}: {report[batch_size]:.2f} 帧/秒")
+    return report
+
+
+if __name__ == "__main__":
+    from ultralytics import YOLO
+    from common.settings import MODEL_NAMES
+    from ai.common.frames import sample_frames
+
+    video_file = sys.argv[1] if len(sys.argv) > 1 else "/var/tmp/smart-vision/video/sample.mp4"
+    sample_count = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    frames = []
+    for _, _, frame in sample_frames(video_file, 1.0):
+        frames.append(frame)
+        if len(frames) >= sample_count:
+            break
+    model = YOLO(MODEL_NAMES.YOLO_11X, verbose=False)
+    benchmark_batch_sizes(model, frames, "cpu")
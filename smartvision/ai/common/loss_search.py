@@ -0,0 +1,153 @@
+import math
+from common.settings import LOSS_SEARCH_OPTIONS
+
+
+def linear_search(is_present, start_time, end_time, tolerance_seconds, seconds_interval=1.0):
+    """
+    按采样间隔逐个时间点检测，与 _detect_object_loss_time 的语义一致
+
+    参数:
+    is_present: is_present(timestamp) -> bool，该时间点物体是否存在
+    start_time (float): 开始时间(秒)
+    end_time (float): 最后一个可读取的时间点(秒)
+    tolerance_seconds (float): 物体必须连续消失超过这个时间才被视为丢失
+
+    返回:
+    float: 物体丢失的时间点（秒），如果物体未丢失则返回None
+    """
+    missing_start = None
+    for i in range(int(math.floor((end_time - start_time) / seconds_interval)) + 1):
+        timestamp = start_time + i * seconds_interval
+        if is_present(timestamp):
+            missing_start = None
+            continue
+        if missing_start is None:
+            missing_start = timestamp
+        if timestamp - missing_start >= tolerance_seconds:
+            return missing_start
+    return None
+
+
+def bisect_search(
+    is_present,
+    start_time,
+    end_time,
+    tolerance_seconds,
+    seconds_interval=1.0,
+    coarse_seconds=LOSS_SEARCH_OPTIONS.COARSE_SECONDS,
+    precision_seconds=LOSS_SEARCH_OPTIONS.PRECISION_SECONDS,
+):
+    """
+    由粗到细查找物体丢失的时间点
+
+    先每隔 coarse_seconds 检测一次，找到第一个物体不存在的时间点；再在它与前一个
+    物体存在的时间点之间二分，精确到 precision_seconds；最后按 seconds_interval
+    检测容错时间内的每个时间点，物体重新出现则从出现处继续粗扫描. 消失且在下一个
+    粗采样点之前又出现的情况不会被发现，粗采样间隔应结合场景选择.
+
+    参数: 见 linear_search
+
+    返回:
+    float: 物体丢失的时间点（秒），如果物体未丢失则返回None
+    """
+    coarse_seconds = max(coarse_seconds, seconds_interval)
+    present_time = None  # 最近一次确认物体存在的时间
+    timestamp = start_time
+    while True:
+        if is_present(timestamp):
+            present_time = timestamp
+            if timestamp >= end_time:
+                return None
+            timestamp = min(timestamp + coarse_seconds, end_time)
+            continue
+
+        # 在 (present_time, timestamp] 内二分查找物体消失的时刻
+        missing_start = timestamp
+        if present_time is not None:
+            low = present_time
+            while missing_start - low > precision_seconds:
+                middle = (low + missing_start) / 2
+                if is_present(middle):
+                    low = middle
+                else:
+                    missing_start = middle
+
+        # 确认容错时间内物体一直不存在
+        reappeared = None
+        steps = int(math.ceil(tolerance_seconds / seconds_interval))
+        for i in range(1, steps + 1):
+            check_time = min(missing_start + i * seconds_interval, missing_start + tolerance_seconds)
+            if check_time > end_time:
+                # 视频结束时消失的时间还不够长
+                return None
+            if is_present(check_time):
+                reappeared = check_time
+                break
+        if reappeared is None:
+            return missing_start
+
+        present_time = reappeared
+        if reappeared >= end_time:
+            return None
+        timestamp = min(reappeared + coarse_seconds, end_time)
+
+
+def benchmark_loss_search(
+    duration=4 * 3600,
+    tolerance_seconds=10.0,
+    seconds_interval=1.0,
+    coarse_seconds=LOSS_SEARCH_OPTIONS.COARSE_SECONDS,
+    precision_seconds=LOSS_SEARCH_OPTIONS.PRECISION_SECONDS,
+):
+    """
+    用合成的真值比较线性扫描与二分查找的检测次数和结果
+
+    每个场景由物体不存在的时间区间 [开始, 结束) 描述，期望结果是第一个持续时间
+    不短于容错时间的区间的开始时间.
+
+    返回:
+    list: 每个场景的 name, expected, linear/bisect 的 lost_time 与检测次数
+    """
+    scenarios = {
+        "3小时处丢失": [(3 * 3600 + 17.4, duration + 1)],
+        "短暂遮挡后丢失": [(3600 + 2.3, 3600 + 7.8), (2 * 3600 + 41.6, duration + 1)],
+        "开头就不存在": [(0, duration + 1)],
+        "末尾消失不足容错时间": [(duration - tolerance_seconds / 2, duration + 1)],
+        "没有丢失": [],
+    }
+
+    report = []
+    for name, absences in scenarios.items():
+        expected = next(
+            (start for start, end in absences if end - start >= tolerance_seconds), None
+        )
+        row = {"name": name, "expected": expected}
+        for method, search, kwargs in (
+            ("linear", linear_search, {}),
+            (
+                "bisect",
+                bisect_search,
+                {"coarse_seconds": coarse_seconds, "precision_seconds": precision_seconds},
+            ),
+        ):
+            calls = [0]
+
+            def is_present(timestamp):
+                calls[0] += 1
+                return not any(start <= timestamp < end for start, end in absences)
+
+            lost_time = search(
+                is_present, 0.0, duration, tolerance_seconds, seconds_interval, **kwargs
+            )
+            row[method] = {"lost_time": lost_time, "inferences": calls[0]}
+        report.append(row)
+        print(
+            f"{name}: 真值 {expected}, "
+            f"线性 {row['linear']['lost_time']} ({row['linear']['inferences']} 次), "
+            f"二分 {row['bisect']['lost_time']} ({row['bisect']['inferences']} 次)"
+        )
+    return report
+
+
+if __name__ == "__main__":
+    benchmark_loss_search()
@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+from common.settings import MODEL_NAMES, MODEL_POOL_OPTIONS, INFERENCE_BACKENDS
+from ai.common.backends import load_backend_model, tune_onnx_session, intra_op_threads
+
+
+def load_model(weights, device, backend=None, threads=None):
+    """
+    加载模型并用一张空白图像预热，避免第一次请求承担初始化的开销
+
+    参数:
+    backend (str): 推理后端，None 表示按设备选择，见 backends.resolve_backend
+    threads (int): 该副本可使用的线程数，用于设置 ONNX Runtime 的 intra-op 线程
+
+    返回:
+    tuple: (模型, 实际使用的后端, 加载耗时(秒), 预热耗时(秒))
+    """
+    start = time.perf_counter()
+    model, backend = load_backend_model(weights, device, backend)
+    loaded = time.perf_counter()
+    size = MODEL_POOL_OPTIONS.WARMUP_IMGSZ
+    blank = np.zeros((size, size, 3), dtype=np.uint8)
+    model.predict(blank, device=device, verbose=False)
+    if backend == INFERENCE_BACKENDS.ONNX:
+        # 会话在第一次 predict 时创建，替换成设置了线程数的会话后再预热一次
+        tune_onnx_session(model, intra_op_threads(threads))
+        model.predict(blank, device=device, verbose=False)
+    warmed = time.perf_counter()
+    return model, backend, loaded - start, warmed - loaded
+
+
+def _pool_size():
+    if MODEL_POOL_OPTIONS.MAX_REPLICAS > 0:
+        return MODEL_POOL_OPTIONS.MAX_REPLICAS
+    cpus = os.cpu_count() or 1
+    return max(1, cpus // MODEL_POOL_OPTIONS.CORES_PER_REPLICA)
+
+
+class ModelPool:
+    """
+    同一个权重文件的模型副本池
+
+    副本在第一次需要时加载，数量不超过 size；副本都被占用时等待归还.
+    每个副本同一时间只被一个调用者使用，ultralytics 的 predictor 不是线程安全的.
+    """
+
+    def __init__(self, weights, size=None, device=None):
+        self.weights = weights
+        self.size = size or _pool_size()
+        self.device = device
+        # 空闲副本，后归还的先借出
+        self._idle = []
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        # 当前线程借出的副本，用于同一线程内的嵌套借用
+        self._local = threading.local()
+        self._replicas = 0
+        self._stats = {
+            "backend": None,
+            "replicas": 0,
+            "load_seconds": [],
+            "warmup_seconds": [],
+            "acquired": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def _device(self):
+        if self.device is None:
+            from common.utils import get_available_device
+
+            self.device = get_available_device()
+        return self.device
+
+    def _load_replica(self):
+        threads = max(1, (os.cpu_count() or 1) // self.size)
+        model, backend, load_seconds, warmup_seconds = load_model(
+            self.weights, self._device(), threads=threads
+        )
+        with self._lock:
+            self._stats["backend"] = backend
+            self._stats["replicas"] += 1
+            self._stats["load_seconds"].append(load_seconds)
+            self._stats["warmup_seconds"].append(warmup_seconds)
+        print(
+            f"加载模型 {self.weights} ({backend}): {load_seconds:.2f} 秒, 预热 {warmup_seconds:.2f} 秒"
+        )
+        return model
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """
+        借出一个模型副本，with 结束时归还
+
+        副本都被占用且数量已达到 size 时等待归还；正在加载的副本失败后，等待者被唤醒并自行重试加载.
+        timeout 秒内没有借到时抛出 TimeoutError，None 表示一直等待.
+
+        同一线程已借出本池的副本时(如两级检测的小模型与大模型是同一个权重文件)直接复用该副本，
+        否则只有一个副本时内层的借用会一直等待外层归还. 同一线程内的调用是顺序的，共用副本是安全的.
+        """
+        held = getattr(self._local, "held", None)
+        if held is not None:
+            yield held
+            return
+
+        start = time.perf_counter()
+        deadline = None if timeout is None else start + timeout
+        model = None
+        with self._available:
+            while True:
+                if self._idle:
+                    model = self._idle.pop()
+                    break
+                if self._replicas < self.size:
+                    self._replicas += 1
+                    break
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"等待模型副本超时({timeout} 秒): {self.weights}")
+                self._available.wait(remaining)
+        if model is None:
+            try:
+                model = self._load_replica()
+            except BaseException:
+                with self._available:
+                    self._replicas -= 1
+                    self._available.notify()
+                raise
+
+        wait_seconds = time.perf_counter() - start
+        with self._lock:
+            self._stats["acquired"] += 1
+            self._stats["wait_seconds"] += wait_seconds
+            self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], wait_seconds)
+        self._local.held = model
+        try:
+            yield model
+        finally:
+            self._local.held = None
+            with self._available:
+                self._idle.append(model)
+                self._available.notify()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = self.size
+            stats["idle"] = len(self._idle)
+            stats["load_seconds"] = list(stats["load_seconds"])
+            stats["warmup_seconds"] = list(stats["warmup_seconds"])
+        return stats
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(weights=MODEL_NAMES.YOLO_11X):
+    """返回进程内共享的模型副本池，每个权重文件一个"""
+    with _pools_lock:
+        pool = _pools.get(weights)
+        if pool is None:
+            pool = ModelPool(weights)
+            _pools[weights] = pool
+        return pool
+
+
+@contextmanager
+def use_model(weights=MODEL_NAMES.YOLO_11X, timeout=MODEL_POOL_OPTIONS.ACQUIRE_TIMEOUT):
+    """
+    从共享池中借用模型，timeout 秒内没有空闲副本时抛出 TimeoutError
+
+    用法:
+    with use_model() as model:
+        model.predict(...)
+    """
+    with get_pool(weights).acquire(timeout) as model:
+        yield model
+
+
+def model_stats():
+    """各个权重文件的副本数、加载/预热耗时与等待耗时"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.weights: pool.stats() for pool in pools}
@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+from common.settings import MOTION_OPTIONS
+
+
+class MotionGate:
+    """
+    运动门控，固定机位的监控画面没有变化时跳过检测
+
+    在缩略灰度图上判断当前帧相对上一次推理的帧是否有变化(diff)，
+    或使用 MOG2 背景模型统计前景像素(mog2). 没有变化的帧复用上一次的检测结果.
+    """
+
+    def __init__(
+        self,
+        changed_ratio=MOTION_OPTIONS.CHANGED_RATIO,
+        pixel_delta=MOTION_OPTIONS.PIXEL_DELTA,
+        method=MOTION_OPTIONS.METHOD,
+        thumbnail_width=MOTION_OPTIONS.THUMBNAIL_WIDTH,
+        max_skips=MOTION_OPTIONS.MAX_SKIPS,
+    ):
+        if method not in ("diff", "mog2"):
+            raise ValueError(f"Unknown motion method: {method}")
+        self.changed_ratio = changed_ratio
+        self.pixel_delta = pixel_delta
+        self.method = method
+        self.thumbnail_width = thumbnail_width
+        self.max_skips = max_skips
+        self.inferred = 0
+        self.skipped = 0
+        self._reference = None
+        self._consecutive_skips = 0
+        self._subtractor = None
+        if method == "mog2":
+            self._subtractor = cv2.createBackgroundSubtractorMOG2(
+                varThreshold=pixel_delta, detectShadows=False
+            )
+
+    def _thumbnail(self, frame):
+        height, width = frame.shape[:2]
+        scale = self.thumbnail_width / width
+        small = cv2.resize(
+            frame,
+            (self.thumbnail_width, max(1, int(height * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def _changed_ratio(self, thumbnail):
+        if self.method == "mog2":
+            mask = self._subtractor.apply(thumbnail)
+            return np.count_nonzero(mask) / mask.size
+        diff = cv2.absdiff(thumbnail, self._reference)
+        return np.count_nonzero(diff > self.pixel_delta) / diff.size
+
+    def should_infer(self, frame):
+        """
+        判断该帧是否需要推理
+
+        返回:
+        bool: True 表示画面有变化(或已连续跳过太多次)，需要重新检测
+        """
+        thumbnail = self._thumbnail(frame)
+        changed = (
+            self._reference is None
+            or self._consecutive_skips >= self.max_skips
+            or self._changed_ratio(thumbnail) > self.changed_ratio
+        )
+        if self.method == "mog2" and self._reference is None:
+            # 用第一帧初始化背景模型
+            self._subtractor.apply(thumbnail)
+
+        if changed:
+            self._reference = thumbnail
+            self._consecutive_skips = 0
+            self.inferred += 1
+        else:
+            self._consecutive_skips += 1
+            self.skipped += 1
+        return changed
+
+    def stats(self):
+        total = self.inferred + self.skipped
+        return {
+            "inferred": self.inferred,
+            "skipped": self.skipped,
+            "skip_ratio": self.skipped / total if total else 0,
+        }
@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+
+# 预取队列的默认长度，一个 1080p BGR 帧约 6MB，16 帧约 100MB
+DEFAULT_PREFETCH_SIZE = 16
+
+_END = object()
+
+
+class _Raised:
+    def __init__(self, error):
+        self.error = error
+
+
+class Prefetcher:
+    """
+    在后台线程中迭代 source，把结果放入有界队列，让解码与推理并行执行
+
+    - 队列满时生产线程阻塞(背压)，内存占用受 maxsize 限制
+    - 消费者提前退出时调用 close()(或使用 with 语句)，生产线程会停止并关闭 source
+    - 生产线程中抛出的异常会在消费者线程中重新抛出
+
+    用法:
+        with Prefetcher(sample_frames(file_name)) as frames:
+            for frame_index, timestamp, frame in frames:
+                ...
+    """
+
+    def __init__(self, source, maxsize=DEFAULT_PREFETCH_SIZE):
+        self._source = source
+        self._queue = queue.Queue(maxsize=max(1, maxsize))
+        self._stop = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(
+            target=self._produce, name="frame-prefetcher", daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            for item in self._source:
+                if not self._put(item):
+                    break
+            else:
+                self._put(_END)
+        except BaseException as e:
+            self._put(_Raised(e))
+        finally:
+            # 在生产线程内关闭 source，确保提前退出时 VideoCapture 也会被释放
+            close = getattr(self._source, "close", None)
+            if close:
+                close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._finished:
+            raise StopIteration
+        item = self._queue.get()
+        if item is _END:
+            self._finished = True
+            self._thread.join()
+            raise StopIteration
+        if isinstance(item, _Raised):
+            self.close()
+            raise item.error
+        return item
+
+    def close(self):
+        """停止生产线程并丢弃队列中尚未消费的数据"""
+        self._finished = True
+        self._stop.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class Throttle:
+    """
+    限制回调的频率，距离上一次调用不足 interval 秒的调用被丢弃
+
+    最后一次调用(如处理完最后一张图片)传入 force=True，保证界面显示最终进度.
+    """
+
+    def __init__(self, callback, interval):
+        self._callback = callback
+        self._interval = interval
+        self._last = None
+
+    def __call__(self, *args, force=False):
+        if self._callback is None:
+            return
+        now = time.monotonic()
+        if force or self._last is None or now - self._last >= self._interval:
+            self._last = now
+            self._callback(*args)
@@ -0,0 +1,282 @@
+"""
+INT8 静态量化
+
+在 CPU 上，各任务可以通过 QUANTIZATION_OPTIONS 选择使用 INT8 模型. INT8 模型由 FP32 ONNX
+模型经 ONNX Runtime 静态量化得到，校准帧从本地上传的视频中采样，保存在权重文件旁边
+(<名称>.int8.onnx). 量化模型与原模型一样通过 models.use_model(路径) 使用，
+检测缓存按权重文件区分，两种精度的结果互不影响.
+
+python -m ai.common.quantization calibrate [权重]   生成 INT8 模型
+python -m ai.common.quantization evaluate [权重]    在本地验证集上比较 FP32 与 INT8:
+                                                    mAP、宠物命中帧数与物品丢失时间
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+from common.settings import (
+    MODEL_NAMES,
+    MODEL_PRECISIONS,
+    QUANTIZATION_OPTIONS,
+    BACKEND_OPTIONS,
+    INFERENCE_BACKENDS,
+)
+from common.utils import list_video_files, get_available_device
+from ai.common.backends import export_model
+
+PET_LABELS = ["dog", "cat"]
+
+
+def quantized_path(weights):
+    return f"{os.path.splitext(weights)[0]}.int8.onnx"
+
+
+def task_weights(weights, precision):
+    """
+    返回任务实际使用的模型文件
+
+    precision 为 INT8 时，只有设备是 CPU 且量化模型不早于权重文件时才使用量化模型
+    """
+    if precision != MODEL_PRECISIONS.INT8 or get_available_device() != "cpu":
+        return weights
+    target = quantized_path(weights)
+    try:
+        if os.path.getmtime(target) >= os.path.getmtime(weights):
+            return target
+    except OSError:
+        pass
+    print(f"INT8 模型不存在或已过期，使用 FP32: {weights}")
+    return weights
+
+
+def _is_within(path, directories):
+    return any(path == directory or path.startswith(directory + os.sep) for directory in directories)
+
+
+def calibration_videos(
+    root=QUANTIZATION_OPTIONS.CALIBRATION_DIR,
+    exclude=QUANTIZATION_OPTIONS.CALIBRATION_EXCLUDE_DIRS,
+):
+    """
+    root 下的视频，跳过 exclude 中的目录；会话目录中指向同一个文件的符号链接只保留一个
+
+    验证集中的视频(包括指向它们的符号链接)不参与校准，否则 evaluate 报告的精度下降会偏低
+    """
+    excluded = [os.path.realpath(directory) for directory in exclude]
+    validation = [os.path.realpath(QUANTIZATION_OPTIONS.VALIDATION_DIR)]
+    videos = {}
+    for directory, subdirectories, _ in os.walk(root):
+        subdirectories[:] = [
+            name
+            for name in subdirectories
+            if not _is_within(os.path.realpath(os.path.join(directory, name)), excluded)
+        ]
+        for file in list_video_files(directory):
+            file_name = os.path.join(directory, file)
+            real_path = os.path.realpath(file_name)
+            if not _is_within(real_path, validation):
+                videos.setdefault(real_path, file_name)
+    return sorted(videos)
+
+
+def calibration_frames(
+    videos,
+    count=QUANTIZATION_OPTIONS.CALIBRATION_FRAMES,
+    seconds_interval=QUANTIZATION_OPTIONS.CALIBRATION_SECONDS,
+):
+    """从各个视频中均匀地取校准帧，每个视频最多 count / 视频数 帧"""
+    from ai.common.frames import sample_frames
+
+    if not videos:
+        return []
+    per_video = max(1, -(-count // len(videos)))
+    frames = []
+    for file_name in videos:
+        taken = 0
+        for _, _, frame in sample_frames(file_name, seconds_interval):
+            frames.append(frame)
+            taken += 1
+            if taken >= per_video:
+                break
+        if len(frames) >= count:
+            break
+    return frames[:count]
+
+
+def _preprocess(frame, imgsz):
+    """与 ultralytics 一致的预处理: 等比缩放并以 114 填充，BGR 转 RGB，NCHW，归一化到 0~1"""
+    height, width = frame.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_width, new_height = round(width * scale), round(height * scale)
+    resized = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    image = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_height) // 2, (imgsz - new_width) // 2
+    image[top : top + new_height, left : left + new_width] = resized
+    return (image[:, :, ::-1].transpose(2, 0, 1)[None] / 255.0).astype(np.float32)
+
+
+def quantize_model(weights=MODEL_NAMES.YOLO_11X, frames=None):
+    """
+    用校准帧对 FP32 ONNX 模型做静态量化(QDQ, 权重按通道 INT8, 激活 UINT8)
+
+    返回:
+    str: 量化模型的路径
+    """
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    if frames is None:
+        frames = calibration_frames(calibration_videos())
+    if not frames:
+        raise ValueError(f"没有可用的校准帧: {QUANTIZATION_OPTIONS.CALIBRATION_DIR}")
+
+    fp32 = export_model(weights, INFERENCE_BACKENDS.ONNX)
+    input_name = onnx.load(fp32, load_external_data=False).graph.input[0].name
+    imgsz = BACKEND_OPTIONS.EXPORT_IMGSZ
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self._frames = iter(frames)
+
+        def get_next(self):
+            frame = next(self._frames, None)
+            return None if frame is None else {input_name: _preprocess(frame, imgsz)}
+
+    target = quantized_path(weights)
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        prepared = os.path.join(temp_dir, "prepared.onnx")
+        quantized = os.path.join(temp_dir, "quantized.onnx")
+        quant_pre_process(fp32, prepared)
+        quantize_static(
+            prepared,
+            quantized,
+            FrameReader(),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+        )
+        # ultralytics 从 metadata 中读取类别名称、步长与输入尺寸
+        model = onnx.load(quantized)
+        del model.metadata_props[:]
+        model.metadata_props.extend(onnx.load(fp32, load_external_data=False).metadata_props)
+        onnx.save(model, quantized)
+        os.replace(quantized, target)
+    print(
+        f"量化模型 {weights} -> {target}: {len(frames)} 帧校准, "
+        f"{time.perf_counter() - start:.2f} 秒"
+    )
+    return target
+
+
+def _count_pet_hits(weights, videos, min_confidence=0.5, seconds_interval=1.0):
+    """各视频中包含猫或狗的采样帧数，以及总推理耗时"""
+    from ai.common.frames import iter_samples
+    from ai.common.inference import detect_frames
+    from ai.common.models import use_model
+
+    device = get_available_device()
+    hits = {}
+    start = time.perf_counter()
+    with use_model(weights) as model:
+        for file_name in videos:
+            hits[file_name] = sum(
+                1
+                for _, _, _, detections in detect_frames(
+                    model, iter_samples(file_name, seconds_interval), device
+                )
+                if detections.select(PET_LABELS, min_confidence).any()
+            )
+    return hits, time.perf_counter() - start
+
+
+def _validate(weights):
+    from ultralytics import YOLO
+
+    metrics = YOLO(weights, task="detect", verbose=False).val(
+        data=QUANTIZATION_OPTIONS.VALIDATION_DATA,
+        imgsz=BACKEND_OPTIONS.EXPORT_IMGSZ,
+        device="cpu",
+        plots=False,
+        verbose=False,
+    )
+    return {"map50": float(metrics.box.map50), "map": float(metrics.box.map)}
+
+
+def evaluate(weights=MODEL_NAMES.YOLO_11X):
+    """
+    在本地验证集上比较 FP32 与 INT8 模型，验证集不存在的项目跳过；设备不是 CPU 时抛出 RuntimeError
+
+    返回:
+    dict: {"map": {精度: {"map50", "map"}},
+           "pet_hits": {精度: {"hits": {视频: 帧数}, "seconds": 耗时}},
+           "lost_time": [{"case", 精度: lost_time}]}
+    """
+    from ai.common.yolo import detect_object_loss_time
+
+    device = get_available_device()
+    if device != "cpu":
+        # task_weights 在非 CPU 设备上使用 FP32，物品丢失用例会把 FP32 的结果当作 INT8 报告
+        raise RuntimeError(f"INT8 模型只在 CPU 上使用，当前设备为 {device}，无法比较两种精度")
+    models = {
+        MODEL_PRECISIONS.FP32: export_model(weights, INFERENCE_BACKENDS.ONNX),
+        MODEL_PRECISIONS.INT8: quantized_path(weights),
+    }
+    if not os.path.exists(models[MODEL_PRECISIONS.INT8]):
+        raise FileNotFoundError(f"INT8 模型不存在，请先运行 calibrate: {models[MODEL_PRECISIONS.INT8]}")
+    report = {"map": {}, "pet_hits": {}, "lost_time": []}
+
+    if os.path.exists(QUANTIZATION_OPTIONS.VALIDATION_DATA):
+        for precision, path in models.items():
+            report["map"][precision] = _validate(path)
+            print(f"{precision}: mAP50 {report['map'][precision]['map50']:.4f}, "
+                  f"mAP50-95 {report['map'][precision]['map']:.4f}")
+
+    if os.path.isdir(QUANTIZATION_OPTIONS.VALIDATION_PET_VIDEOS):
+        directory = QUANTIZATION_OPTIONS.VALIDATION_PET_VIDEOS
+        videos = [os.path.join(directory, file) for file in list_video_files(directory)]
+        for precision, path in models.items():
+            hits, seconds = _count_pet_hits(path, videos)
+            report["pet_hits"][precision] = {"hits": hits, "seconds": seconds}
+            print(f"{precision}: 宠物命中 {sum(hits.values())} 帧, 耗时 {seconds:.2f} 秒")
+
+    if os.path.exists(QUANTIZATION_OPTIONS.VALIDATION_LOSS_CASES):
+        # 每个用例: {"video_path": 目录, "target_label": 标签, "target_box": [x1, y1, x2, y2]}
+        with open(QUANTIZATION_OPTIONS.VALIDATION_LOSS_CASES, "r", encoding="utf-8") as f:
+            cases = json.load(f)
+        for case in cases:
+            row = {"case": case}
+            for precision in models:
+                result = detect_object_loss_time(
+                    case["video_path"],
+                    case["target_label"],
+                    case["target_box"],
+                    weights=weights,
+                    precision=precision,
+                )
+                row[precision] = result["lost_time"] if result else None
+            report["lost_time"].append(row)
+            print(f"{case['video_path']} {case['target_label']}: "
+                  f"FP32 {row[MODEL_PRECISIONS.FP32]}, INT8 {row[MODEL_PRECISIONS.INT8]}")
+    return report
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "calibrate"
+    weights = sys.argv[2] if len(sys.argv) > 2 else MODEL_NAMES.YOLO_11X
+    if command == "calibrate":
+        quantize_model(weights)
+    elif command == "evaluate":
+        evaluate(weights)
+    else:
+        print(f"未知命令: {command}, 可用: calibrate, evaluate")
@@ -0,0 +1,266 @@
+import atexit
+import os
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from common.settings import INFERENCE_OPTIONS, MODEL_NAMES
+from ai.common.frames import read_video_properties
+from common.capabilities import get_capabilities
+
+# 每个工作进程独立持有的模型与取消标记
+_worker = {}
+
+# 常驻进程池中可同时进行的调度数
+CANCEL_SLOTS = 64
+
+# 自动选择进程数时的上限，每个 yolo11x 进程常驻内存约 1GB
+MAX_AUTO_WORKERS = 4
+
+
+def resolve_workers(workers=INFERENCE_OPTIONS.SCAN_WORKERS):
+    """返回实际使用的进程数，workers <= 0 时按 CPU 核数自动选择"""
+    if workers and workers > 0:
+        return workers
+    cpus = os.cpu_count() or 1
+    return max(1, min(MAX_AUTO_WORKERS, cpus // INFERENCE_OPTIONS.TORCH_THREADS_PER_WORKER))
+
+
+def plan_segments(video_files, segment_seconds=None, seconds_interval=1.0):
+    """
+    把视频文件切分成 (文件, 时间段) 片段
+
+    参数:
+    video_files (list): 视频文件路径，顺序即时间线顺序
+    segment_seconds (float): 片段长度(秒)，None 表示每个文件一个片段
+    seconds_interval (float): 采样间隔，片段起点按它对齐，保证采样点与顺序扫描一致
+
+    返回:
+    list: 按时间线排序的片段，每个片段包含 ordinal, file_index, file_name,
+          start_time, end_time(不含), last(是否为文件的最后一段)
+    """
+    segments = []
+    for file_index, file_name in enumerate(video_files, start=1):
+        properties = read_video_properties(file_name)
+        if properties is None:
+            print(f"无法打开视频文件: {file_name}")
+            continue
+
+        duration = properties["duration"]
+        if not segment_seconds or duration <= segment_seconds:
+            step = max(duration, seconds_interval)
+        else:
+            step = max(1, round(segment_seconds / seconds_interval)) * seconds_interval
+
+        start_time = 0.0
+        while True:
+            end_time = start_time + step
+            last = end_time >= duration
+            segments.append(
+                {
+                    "ordinal": len(segments),
+                    "file_index": file_index,
+                    "file_name": file_name,
+                    "start_time": start_time,
+                    "end_time": min(end_time, duration),
+                    "last": last,
+                }
+            )
+            if last:
+                break
+            start_time = end_time
+    return segments
+
+
+def _init_worker(weights, device, torch_threads, cancel_slots):
+    import torch
+    from ai.common.models import load_model
+
+    torch.set_num_threads(torch_threads)
+    # 设备由父进程探测后传入，工作进程不再重复探测
+    _worker["device"] = device
+    _worker["model"], _, _, _ = load_model(weights, device, threads=torch_threads)
+    _worker["cancel_slots"] = cancel_slots
+
+
+def _run_in_worker(task, segment, slot, task_kwargs):
+    cancel_slots = _worker["cancel_slots"]
+    ordinal = segment["ordinal"]
+
+    def should_stop():
+        # 更早的片段已经确认了结果(或本次调度已出错)，后面的片段不需要继续
+        return cancel_slots[slot] < ordinal
+
+    return task(
+        _worker["model"], _worker["device"], segment, should_stop=should_stop, **task_kwargs
+    )
+
+
+class WorkerPool:
+    """
+    常驻的扫描进程池
+
+    工作进程在第一次提交时启动并加载模型，之后的扫描复用这些进程与模型，
+    不再为每次扫描重新启动进程、加载和预热模型.
+    同一个池可以同时执行多次调度；first_match 的取消标记保存在共享数组的槽位中，每次调度占用一个槽位.
+    """
+
+    def __init__(self, weights, device, workers):
+        self.weights = weights
+        self.device = device
+        self.workers = workers
+        context = multiprocessing.get_context("spawn")
+        self._cancel_slots = context.Array("i", CANCEL_SLOTS, lock=False)
+        self._free_slots = queue.Queue()
+        for slot in range(CANCEL_SLOTS):
+            self._free_slots.put(slot)
+        torch_threads = INFERENCE_OPTIONS.TORCH_THREADS_PER_WORKER
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(weights, device, torch_threads, self._cancel_slots),
+        )
+
+    def acquire_slot(self, value):
+        slot = self._free_slots.get()
+        self._cancel_slots[slot] = value
+        return slot
+
+    def release_slot(self, slot):
+        self._free_slots.put(slot)
+
+    def cancel(self, slot, ordinal):
+        self._cancel_slots[slot] = ordinal
+
+    def submit(self, task, segment, slot, task_kwargs):
+        return self._executor.submit(_run_in_worker, task, segment, slot, task_kwargs)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_worker_pool(weights, device, workers):
+    """返回常驻的扫描进程池，按 (权重, 设备, 进程数) 区分"""
+    key = (weights, device, workers)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = WorkerPool(weights, device, workers)
+            _pools[key] = pool
+        return pool
+
+
+def _discard_worker_pool(pool):
+    # 工作进程异常退出后进程池不可再用，丢弃它，下次调度重新创建
+    with _pools_lock:
+        key = (pool.weights, pool.device, pool.workers)
+        if _pools.get(key) is pool:
+            del _pools[key]
+    pool.shutdown(wait=False)
+
+
+@atexit.register
+def shutdown_worker_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False)
+
+
+def run_segments(
+    task,
+    segments,
+    workers,
+    weights=MODEL_NAMES.YOLO_11X,
+    first_match=False,
+    on_result=None,
+    **task_kwargs,
+):
+    """
+    在常驻进程池中并行执行片段任务，并按时间线顺序合并结果
+
+    参数:
+    task: 模块级函数 task(model, device, segment, should_stop=None, **task_kwargs)
+    segments (list): plan_segments 的返回值
+    workers (int): 进程数
+    weights (str): 每个工作进程加载的模型权重
+    first_match (bool): 为 True 时，一旦某个片段返回的结果不为 None，且它之前的片段都没有结果，
+                        就取消其后的所有片段，保持"最早结果"的语义
+    on_result: 按时间线顺序对每个片段结果调用的回调 on_result(segment, result)
+
+    返回:
+    list: 按时间线顺序排列的 (segment, result)，first_match 时只包含到第一个不为 None 的结果为止
+
+    出错时取消尚未开始的片段并通知正在运行的片段停止，不等待它们结束.
+    """
+    pool = get_worker_pool(weights, get_capabilities()["device"], workers)
+    # 出错时即使不是 first_match 也让正在运行的片段尽快停止，因此总是占用一个槽位
+    slot = pool.acquire_slot(len(segments))
+
+    merged = []
+    futures = {}
+    pending = set()
+    try:
+        for segment in segments:
+            future = pool.submit(task, segment, slot, task_kwargs)
+            futures[future] = segment["ordinal"]
+            pending.add(future)
+        finished = {}
+        next_ordinal = 0
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished[futures[future]] = future.result()
+
+            while next_ordinal in finished:
+                segment = segments[next_ordinal]
+                result = finished.pop(next_ordinal)
+                merged.append((segment, result))
+                if on_result:
+                    on_result(segment, result)
+                if first_match and result is not None:
+                    pool.cancel(slot, next_ordinal)
+                    return merged
+                next_ordinal += 1
+    except BrokenProcessPool:
+        _discard_worker_pool(pool)
+        raise
+    except BaseException:
+        # 让正在运行的片段尽快停止
+        pool.cancel(slot, -1)
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+        if not pending:
+            pool.release_slot(slot)
+        else:
+            # 仍在运行的片段可能还在读取槽位，等它们结束后再归还
+            remaining = [future for future in pending if not future.cancelled()]
+            if remaining:
+                _release_when_done(pool, slot, remaining)
+            else:
+                pool.release_slot(slot)
+    return merged
+
+
+def _release_when_done(pool, slot, futures):
+    left = [len(futures)]
+    lock = threading.Lock()
+
+    def on_done(_):
+        with lock:
+            left[0] -= 1
+            last = left[0] == 0
+        if last:
+            pool.release_slot(slot)
+
+    for future in futures:
+        future.add_done_callback(on_done)
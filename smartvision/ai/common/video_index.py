@@ -0,0 +1,219 @@
+import bisect
+import hashlib
+import json
+import os
+import threading
+from common.blob_store import blob_content_hash
+from common.single_flight import SingleFlight
+
+# 索引文件与视频放在同一目录下，文件名为 <视频文件名>.index.json
+INDEX_SUFFIX = ".index.json"
+# 索引格式版本，格式变化时递增，旧索引会被重建
+INDEX_VERSION = 2
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# 进程内缓存，避免每次调用都读取和解析 json
+_cache = {}
+_cache_lock = threading.Lock()
+# 多个会话同时打开同一个视频时只建立一次索引
+_builds = SingleFlight()
+
+
+def index_file_name(file_name):
+    return f"{file_name}{INDEX_SUFFIX}"
+
+
+def hash_file(file_name):
+    """计算文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(file_name, "rb") as f:
+        while True:
+            chunk = f.read(_HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_video_index(file_name, content_hash=None):
+    """
+    解复用视频文件(只解码第一帧以读取旋转信息)，生成元数据与关键帧索引
+
+    参数:
+    file_name (str): 视频文件路径
+    content_hash (str): 已知的文件内容哈希，None 表示重新计算
+
+    返回:
+    dict: fps, total_frames, duration, width, height, codec, rotation,
+          keyframes([timestamp, pts, byte_offset] 列表), content_hash 等；无法解析时返回None
+          width/height 是编码尺寸，不含旋转；rotation 为显示时需要顺时针旋转的角度(0/90/180/270)，
+          显示尺寸(各采样方式输出的帧的尺寸)用 frames.ffmpeg_output_size(properties, None)
+    """
+    import av
+
+    try:
+        container = av.open(file_name)
+    except (av.error.FFmpegError, OSError) as e:
+        print(f"无法打开视频文件: {file_name}, {e}")
+        return None
+
+    try:
+        if not container.streams.video:
+            print(f"视频文件中没有视频流: {file_name}")
+            return None
+        stream = container.streams.video[0]
+        time_base = stream.time_base
+        fps = float(stream.average_rate or stream.guessed_rate or 0)
+
+        keyframes = []
+        packet_count = 0
+        first_pts = stream.start_time
+        last_pts = None
+        for packet in container.demux(stream):
+            if packet.pts is None:
+                continue
+            packet_count += 1
+            if first_pts is None:
+                first_pts = packet.pts
+            if last_pts is None or packet.pts > last_pts:
+                last_pts = packet.pts
+            if packet.is_keyframe:
+                keyframes.append([packet.pts, packet.pos])
+        first_pts = first_pts or 0
+
+        keyframes = [
+            [float((pts - first_pts) * time_base), pts, pos]
+            for pts, pos in sorted(keyframes)
+        ]
+
+        if stream.duration is not None:
+            duration = float(stream.duration * time_base)
+        elif container.duration:
+            duration = container.duration / av.time_base
+        elif last_pts is not None:
+            duration = float((last_pts - first_pts) * time_base)
+        else:
+            duration = 0
+
+        total_frames = stream.frames or packet_count
+        rotation = _display_rotation(container, stream)
+        stat = os.stat(file_name)
+        return {
+            "version": INDEX_VERSION,
+            "file_size": stat.st_size,
+            "file_mtime": stat.st_mtime,
+            "content_hash": content_hash or hash_file(file_name),
+            "fps": fps,
+            "total_frames": total_frames,
+            "duration": duration,
+            "width": stream.codec_context.width,
+            "height": stream.codec_context.height,
+            "codec": stream.codec_context.name,
+            "rotation": rotation,
+            "start_pts": first_pts,
+            "time_base": [time_base.numerator, time_base.denominator],
+            "keyframes": keyframes,
+        }
+    finally:
+        container.close()
+
+
+def _display_rotation(container, stream):
+    """
+    显示时需要顺时针旋转的角度
+
+    FFmpeg 5 起旋转信息保存在 display matrix side data 中，不再出现在 rotate 元数据里.
+    解码第一帧读取 frame.rotation(display matrix 的逆时针角度)；旧文件仍可能带 rotate 元数据(顺时针).
+    """
+    import av
+
+    rotate = stream.metadata.get("rotate")
+    if rotate:
+        return int(float(rotate)) % 360
+    try:
+        container.seek(0)
+        frame = next(container.decode(stream), None)
+    except av.error.FFmpegError:
+        return 0
+    counterclockwise = getattr(frame, "rotation", 0) or 0
+    return (-int(round(counterclockwise / 90)) * 90) % 360
+
+
+def _is_fresh(index, file_name):
+    if not index or index.get("version") != INDEX_VERSION:
+        return False
+    stat = os.stat(file_name)
+    return index["file_size"] == stat.st_size and index["file_mtime"] == stat.st_mtime
+
+
+def load_video_index(file_name, content_hash=None):
+    """
+    读取视频的索引，索引不存在或已过期时重新生成并写入 <视频文件名>.index.json
+
+    file_name 是符号链接时，索引放在链接指向的文件旁，内容相同的上传共用一份索引.
+
+    返回:
+    dict: 见 build_video_index；视频无法解析时返回None
+    """
+    if not os.path.isfile(file_name):
+        return None
+    file_name = os.path.realpath(file_name)
+
+    with _cache_lock:
+        index = _cache.get(file_name)
+    if _is_fresh(index, file_name):
+        return index
+
+    sidecar = index_file_name(file_name)
+    index = None
+    if os.path.isfile(sidecar):
+        try:
+            with open(sidecar, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取视频索引失败: {sidecar}, {e}")
+            index = None
+
+    if not _is_fresh(index, file_name):
+        index = _builds.do(file_name, _build_and_write, file_name, sidecar, content_hash)
+        if index is None:
+            return None
+
+    with _cache_lock:
+        _cache[file_name] = index
+    return index
+
+
+def _build_and_write(file_name, sidecar, content_hash=None):
+    index = build_video_index(file_name, content_hash or blob_content_hash(file_name))
+    if index is None:
+        return None
+    temp_file = f"{sidecar}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(temp_file, sidecar)
+    except OSError as e:
+        print(f"写入视频索引失败: {sidecar}, {e}")
+    return index
+
+
+def keyframe_before(index, timestamp):
+    """
+    返回不晚于 timestamp 的最近关键帧 [timestamp, pts, byte_offset]，没有关键帧时返回None
+    """
+    keyframes = index["keyframes"]
+    if not keyframes:
+        return None
+    i = bisect.bisect_right([k[0] for k in keyframes], timestamp) - 1
+    return keyframes[max(0, i)]
+
+
+def max_gop_frames(index):
+    """根据关键帧间隔估算最长的 GOP 帧数"""
+    keyframes = index["keyframes"]
+    if len(keyframes) < 2 or index["fps"] <= 0:
+        return None
+    longest = max(b[0] - a[0] for a, b in zip(keyframes, keyframes[1:]))
+    return int(longest * index["fps"]) + 1
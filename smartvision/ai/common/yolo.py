@@ -1,14 +1,65 @@
 import cv2
+import numpy as np
 import time
 import os
-from ultralytics import YOLO
+from functools import partial
 from common.utils import get_str_time, get_available_device
-
-model = YOLO("/opt/models/yolo/yolo11x.pt", verbose=False)  #
+from ai.common.frames import (
+    iter_samples,
+    read_video_properties,
+    seek_frame,
+    ffmpeg_output_size,
+    read_full_frame,
+)
+from ai.common.pipeline import Prefetcher, Throttle
+from ai.common.images import iter_images
+from ai.common.image_sink import get_image_sink, wait_written
+from ai.common.inference import detect_frames, predict_batch, adaptive_batches, BatchSizer
+from ai.common.scheduler import plan_segments, resolve_workers, run_segments
+from ai.common.motion import MotionGate
+from ai.common.loss_search import bisect_search
+from ai.common.detections import DetectionRecords
+from ai.common.models import use_model
+from ai.common.quantization import task_weights
+from ai.common.best_shot import BestShotSelector
+from ai.common.cascade import cascade_detector
+from ai.common.postprocess import select_boxes, round_confidence, best_target_iou
+from ai.common import detection_cache
+from common.single_flight import SingleFlight
+from common.settings import (
+    INFERENCE_OPTIONS,
+    MODEL_NAMES,
+    SAMPLING_MODES,
+    ROI_OPTIONS,
+    FFMPEG_OPTIONS,
+    DECODE_OPTIONS,
+    DETECTION_CACHE_OPTIONS,
+    LOSS_SEARCH_MODES,
+    LOSS_SEARCH_OPTIONS,
+    QUANTIZATION_OPTIONS,
+    CASCADE_OPTIONS,
+    IMAGE_DIR_OPTIONS,
+)
+
+# 设定IoU阈值，用于判断检测到的物体是否为目标物体
+IOU_THRESHOLD = 0.3
+
+# 多个会话同时检测同一个视频(相同的缓存键)时只检测一次
+_scans = SingleFlight()
+# 多个会话同时对相同的视频与参数做物品丢失分析时只分析一次
+_analyses = SingleFlight()
 
 
 def detect_object_loss_time(
-    video_path, target_label, target_box, tolerance_seconds=10.0
+    video_path, target_label, target_box, tolerance_seconds=10.0,
+    batch_size=INFERENCE_OPTIONS.BATCH_SIZE,
+    workers=INFERENCE_OPTIONS.SCAN_WORKERS,
+    sampling_mode=DECODE_OPTIONS.SAMPLING_MODE,
+    use_roi=ROI_OPTIONS.ENABLED,
+    search_mode=LOSS_SEARCH_OPTIONS.MODE,
+    weights=MODEL_NAMES.YOLO_11X,
+    precision=QUANTIZATION_OPTIONS.LOSS_DETECTION,
+    cascade=CASCADE_OPTIONS.ENABLED,
 ):
     """
     检测视频中指定物体丢失的时间点
@@ -18,22 +69,145 @@ def detect_object_loss_time(
     target_label (str): 目标物体的标签名称（如"cell phone", "handbag"等）
     target_box (list): 目标物体的初始边界框 [x1, y1, x2, y2]
     tolerance_seconds (float): 容错时间，物体必须连续消失超过这个时间才被视为丢失
+    batch_size (int): 每批送入模型的帧数
+    workers (int): 并行扫描的进程数，0 表示自动选择
+    sampling_mode (str): 采样模式，见 SAMPLING_MODES
+    use_roi (bool): 只在目标框周围的区域内检测，见 ROI_OPTIONS
+    search_mode (str): 查找方式，见 LOSS_SEARCH_MODES
+    weights (str): 模型权重文件
+    precision (str): 模型精度，见 MODEL_PRECISIONS
+    cascade (bool): 线性扫描时先由小模型筛选，只有疑似消失的帧由大模型确认，见 CASCADE_OPTIONS
 
     返回:
     float: 物体丢失的时间点（秒），如果物体未丢失则返回None
     """
 
     files = list_video_files(video_path)
-    ans = {"file_name": "", "lost_time": 0}
-    for file in files:
-        file_name = os.path.join(video_path, file)
-        lost_time = _detect_object_loss_time(
-            file_name, target_label, target_box, tolerance_seconds
+    file_names = [os.path.join(video_path, file) for file in files]
+    seconds_interval = 1.0
+    weights = task_weights(weights, precision)
+    params = {
+        "target_label": target_label,
+        "target_box": [float(value) for value in target_box],
+        "tolerance_seconds": tolerance_seconds,
+        "seconds_interval": seconds_interval,
+        "sampling_mode": sampling_mode,
+        "use_roi": use_roi,
+        "search_mode": search_mode,
+        "cascade": cascade,
+    }
+
+    # 多个会话同时分析同一组视频(按内容哈希)、同样的目标与参数时只分析一次；
+    # 共享的结果只包含文件序号，文件路径按各自会话的目录给出
+    keys = [
+        detection_cache.cache_key(file_name, weights, seconds_interval, task="loss", **params)
+        for file_name in file_names
+    ]
+    analyze = partial(
+        _find_object_loss,
+        file_names,
+        target_label,
+        target_box,
+        tolerance_seconds,
+        seconds_interval,
+        batch_size,
+        workers,
+        sampling_mode,
+        use_roi,
+        search_mode,
+        weights,
+        cascade,
+    )
+    if keys and None not in keys:
+        found = _analyses.do(("loss", *keys), analyze)
+    else:
+        found = analyze()
+    if found is None:
+        return None
+    file_index, lost_time = found
+    return {"file_name": file_names[file_index], "lost_time": lost_time}
+
+
+def _find_object_loss(
+    file_names,
+    target_label,
+    target_box,
+    tolerance_seconds,
+    seconds_interval,
+    batch_size,
+    workers,
+    sampling_mode,
+    use_roi,
+    search_mode,
+    weights,
+    cascade,
+):
+    """
+    依次在各个视频中查找目标丢失的时间
+
+    返回:
+    tuple: (文件序号, 丢失时间)，未丢失时返回None
+    """
+    if search_mode == LOSS_SEARCH_MODES.BISECT:
+        device = get_available_device()
+        with use_model(weights) as model:
+            for file_index, file_name in enumerate(file_names):
+                lost_time = _bisect_object_loss_time(
+                    file_name,
+                    target_label,
+                    target_box,
+                    tolerance_seconds,
+                    seconds_interval=seconds_interval,
+                    use_roi=use_roi,
+                    model=model,
+                    device=device,
+                )
+                if lost_time is not None:
+                    return file_index, lost_time
+        return None
+    if search_mode != LOSS_SEARCH_MODES.LINEAR:
+        raise ValueError(f"Unknown loss search mode: {search_mode}")
+
+    workers = resolve_workers(workers)
+    segments = plan_segments(
+        file_names,
+        INFERENCE_OPTIONS.SEGMENT_SECONDS if workers > 1 else None,
+        seconds_interval,
+    )
+    task_kwargs = {
+        "target_label": target_label,
+        "target_box": target_box,
+        "tolerance_seconds": tolerance_seconds,
+        "seconds_interval": seconds_interval,
+        "batch_size": batch_size,
+        "sampling_mode": sampling_mode,
+        "use_roi": use_roi,
+        "cascade": cascade,
+    }
+
+    if workers > 1 and len(segments) > 1:
+        merged = run_segments(
+            _detect_loss_in_segment,
+            segments,
+            workers,
+            weights=weights,
+            first_match=True,
+            **task_kwargs,
         )
-        ans["file_name"] = file_name
-        ans["lost_time"] = lost_time
-        if lost_time > 0:
-            return ans
+    else:
+        merged = []
+        device = get_available_device()
+        with use_model(weights) as model:
+            for segment in segments:
+                lost_time = _detect_loss_in_segment(model, device, segment, **task_kwargs)
+                merged.append((segment, lost_time))
+                if lost_time is not None:
+                    break
+
+    # 0.0 秒也是有效的丢失时间，与二分查找一样按 None 判断
+    for segment, lost_time in merged:
+        if lost_time is not None:
+            return segment["file_index"] - 1, lost_time
     return None
 
 
@@ -45,6 +219,12 @@ def yolo_find_objects_by_video(
     draw_box: bool = False,
     callback = None,
     placeholder = None,
+    batch_size = INFERENCE_OPTIONS.BATCH_SIZE,
+    workers = INFERENCE_OPTIONS.SCAN_WORKERS,
+    sampling_mode = DECODE_OPTIONS.SAMPLING_MODE,
+    motion_threshold = None,
+    precision = QUANTIZATION_OPTIONS.PET_SEARCH,
+    cascade = CASCADE_OPTIONS.ENABLED,
 ):
     """
     在视频中查找指定对象，并保存带有标记的帧图像
@@ -56,10 +236,16 @@ def yolo_find_objects_by_video(
     - object_name: 要查找的对象名称
     - min_confidence: 最小置信度
     - draw_box: 是否在图像上绘制边界框
+    - batch_size: 每批送入模型的帧数
+    - workers: 并行扫描的进程数，0 表示自动选择
+    - sampling_mode: 采样模式，SAMPLING_MODES.KEYFRAME 只解码关键帧，适合粗粒度查找
+    - motion_threshold: 运动门控的灵敏度(变化像素占比，如 MOTION_OPTIONS.CHANGED_RATIO)，
+      画面无变化时复用上一次检测结果；默认 None 表示关闭，每个采样帧都检测
+    - precision: 模型精度，见 MODEL_PRECISIONS
+    - cascade: 先由小模型筛选，只有疑似命中的帧由大模型确认，见 CASCADE_OPTIONS
     返回: 检测到的内容
     """
 
-    device = get_available_device()
     identified_objects = []
     files = list_video_files(video_dir)
     if len(files) == 0:
@@ -69,42 +255,250 @@ def yolo_find_objects_by_video(
     if not os.path.exists(image_dir):
         os.makedirs(image_dir)
 
-    file_index = 0
-    for file in files:
-        file_index += 1
-        file_name = os.path.join(video_dir, file)
-        cap = cv2.VideoCapture(file_name)
-        if not cap.isOpened():
-            print(f"无法打开视频文件: {file_name}")
+    seconds_interval = 1.0  # 采样间隔(秒)
+    print(f"配置为大约每 {seconds_interval} 秒尝试读取一帧...")
+    file_names = [os.path.join(video_dir, file) for file in files]
+    weights = task_weights(MODEL_NAMES.YOLO_11X, precision)
+    sampling = {"sampling_mode": sampling_mode, "motion_threshold": motion_threshold}
+    if cascade:
+        # 两级检测时未确认的帧只有小模型的结果，缓存只对同一个目标有效
+        sampling.update(cascade=CASCADE_OPTIONS.SCREEN_WEIGHTS, cascade_label=object_name)
+
+    # 已缓存原始检测结果的视频直接按标签和置信度筛选，不再检测
+    scans = {}  # 由本次调用检测的视频 -> 缓存键
+    waits = {}  # 其他会话正在检测的视频 -> (序号, 缓存键, flight)
+    try:
+        for file_index, file_name in enumerate(file_names, start=1):
+            if not DETECTION_CACHE_OPTIONS.ENABLED:
+                scans[file_name] = None
+                continue
+            key = detection_cache.cache_key(
+                file_name,
+                weights,
+                seconds_interval,
+                **sampling,
+            )
+            records = detection_cache.load(key)
+            if records is None and key is not None:
+                flight, leader = _scans.claim(key)
+                if not leader:
+                    waits[file_name] = (file_index, key, flight)
+                    continue
+                # 申请期间其他会话可能刚好完成了检测
+                records = detection_cache.load(key)
+                if records is not None:
+                    _scans.release(key)
+            if records is None:
+                scans[file_name] = key
+                continue
+            print(f"使用缓存的检测结果: {file_name}")
+            identified_objects.extend(
+                _find_objects_in_records(
+                    records,
+                    file_name,
+                    file_index,
+                    image_dir,
+                    object_name,
+                    min_confidence,
+                    seconds_interval,
+                    callback,
+                    placeholder,
+                )
+            )
+
+        workers = resolve_workers(workers)
+        segments = plan_segments(
+            file_names,
+            INFERENCE_OPTIONS.SEGMENT_SECONDS if workers > 1 else None,
+            seconds_interval,
+        )
+        task_kwargs = {
+            "image_dir": image_dir,
+            "object_name": object_name,
+            "min_confidence": min_confidence,
+            "seconds_interval": seconds_interval,
+            "batch_size": batch_size,
+            "sampling_mode": sampling_mode,
+            "motion_threshold": motion_threshold,
+            "cascade": cascade,
+        }
+
+        def scan(cache_keys):
+            scan_segments = [
+                dict(segment) for segment in segments if segment["file_name"] in cache_keys
+            ]
+            for ordinal, segment in enumerate(scan_segments):
+                segment["ordinal"] = ordinal
+            frame_items, records_by_file = _scan_segments(
+                scan_segments, workers, weights, object_name, callback, placeholder, task_kwargs
+            )
+            identified_objects.extend(frame_items)
+            for file_name, key in cache_keys.items():
+                if key is not None and file_name in records_by_file:
+                    detection_cache.store(key, DetectionRecords.concat(records_by_file[file_name]))
+
+        scan(scans)
+    finally:
+        for key in scans.values():
+            if key is not None:
+                _scans.release(key)
+
+    # 等待其他会话检测完同一个视频后，从缓存中读取结果
+    rescans = {}
+    for file_name, (file_index, key, flight) in waits.items():
+        print(f"等待其他会话完成检测: {file_name}")
+        flight.wait()
+        records = detection_cache.load(key)
+        if records is None:
+            # 其他会话的检测失败了，由本次调用重新检测
+            rescans[file_name] = key
             continue
-        # --- 配置 ---
-        seconds_interval = 1.0  # 设置为您想要的间隔，例如每 2 秒读取一帧
-        msec_interval = seconds_interval * 1000 # 转换为毫秒
-        current_target_msec = 0 # 从视频开始处
-        processed_frame_count = 0
-        print(f"配置为大约每 {seconds_interval} 秒尝试读取一帧...")
-
-        # 获取视频属性
-        fps = cap.get(cv2.CAP_PROP_FPS)
-
-        while cap.isOpened():
-            cap.set(cv2.CAP_PROP_POS_MSEC, current_target_msec)
-            ret, frame = cap.read()
-            if not ret:
-                break
+        identified_objects.extend(
+            _find_objects_in_records(
+                records,
+                file_name,
+                file_index,
+                image_dir,
+                object_name,
+                min_confidence,
+                seconds_interval,
+                callback,
+                placeholder,
+            )
+        )
+    if rescans:
+        scan(rescans)
 
-            # 如果读取成功，我们得到了目标时间点附近的帧
-            processed_frame_count += 1
-            # 更新下一次目标时间点
-            current_target_msec += msec_interval
-            # (可选) 添加非常小的延时防止CPU空转过快，或者根据处理时间动态调整
-            # time.sleep(0.01)
-            current_frame_index = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
-
-            results = model.predict(frame, device=device, verbose=False)
-            frame_time = frame_index_to_time(current_frame_index, fps)
-            file_name = os.path.join(
-                image_dir, f"{int(file_index):02}-{frame_time}.jpg"
+    if len(identified_objects) == 0:
+        print("没有识别到对象")
+    return sorted(identified_objects, key=lambda x: x["file_name"], reverse=False)
+
+
+def _scan_segments(segments, workers, weights, object_name, callback, placeholder, task_kwargs):
+    """
+    检测视频片段，片段较多且 workers > 1 时并行
+
+    并行时各片段只返回原始检测结果，合并后对每个视频运行一次最佳画面选择，
+    跨越片段边界的连续画面不会被拆成两段，结果与使用缓存时一致.
+
+    返回:
+    tuple: (包含目标的帧信息, 视频文件 -> 按时间线排列的各片段 DetectionRecords)
+    """
+    identified_objects = []
+    records_by_file = {}
+    if workers > 1 and len(segments) > 1:
+        def on_segment_finished(segment, segment_result):
+            _, records = segment_result
+            records_by_file.setdefault(segment["file_name"], []).append(records)
+
+        run_segments(
+            _find_objects_in_segment,
+            segments,
+            workers,
+            weights=weights,
+            on_result=on_segment_finished,
+            select_best=False,
+            **task_kwargs,
+        )
+        file_indexes = {segment["file_name"]: segment["file_index"] for segment in segments}
+        for file_name, records_list in records_by_file.items():
+            identified_objects.extend(
+                _find_objects_in_records(
+                    DetectionRecords.concat(records_list),
+                    file_name,
+                    file_indexes[file_name],
+                    task_kwargs["image_dir"],
+                    object_name,
+                    task_kwargs["min_confidence"],
+                    task_kwargs["seconds_interval"],
+                    callback,
+                    placeholder,
+                )
+            )
+    elif segments:
+        device = get_available_device()
+        with use_model(weights) as model:
+            for segment in segments:
+                frame_items, records = _find_objects_in_segment(
+                    model,
+                    device,
+                    segment,
+                    callback=callback,
+                    placeholder=placeholder,
+                    **task_kwargs,
+                )
+                identified_objects.extend(frame_items)
+                records_by_file.setdefault(segment["file_name"], []).append(records)
+    return identified_objects, records_by_file
+
+
+def _find_objects_in_segment(
+    model,
+    device,
+    segment,
+    image_dir,
+    object_name,
+    min_confidence,
+    seconds_interval=1.0,
+    batch_size=INFERENCE_OPTIONS.BATCH_SIZE,
+    sampling_mode=DECODE_OPTIONS.SAMPLING_MODE,
+    motion_threshold=None,
+    cascade=False,
+    callback=None,
+    placeholder=None,
+    select_best=True,
+    should_stop=None,
+):
+    """
+    扫描一个视频片段，返回包含目标的帧
+
+    参数:
+    segment (dict): plan_segments 生成的片段
+    motion_threshold (float): 运动门控的变化像素占比阈值，None 表示每帧都检测
+    cascade (bool): 两级检测，小模型发现目标的帧由 model 确认
+    select_best (bool): 为 False 时只收集原始检测结果，不选择与保存最佳画面(由调用方合并各片段后选择)
+    should_stop: 返回 True 时提前结束扫描
+
+    返回:
+    tuple: (每段连续画面中最佳的一帧(已保存为图片)，select_best 为 False 时为空列表,
+            片段内所有采样帧的原始检测结果 DetectionRecords)
+    """
+    writes = []
+    selector = BestShotSelector(
+        partial(_save_identified_object_image, writes=writes), _episode_gap(seconds_interval)
+    )
+    records = DetectionRecords()
+    gate = MotionGate(motion_threshold) if motion_threshold is not None else None
+    # 片段的结束时间不含在内，避免相邻片段重复采样同一时间点
+    end_time = None if segment["last"] else segment["end_time"] - seconds_interval / 2
+    with Prefetcher(
+        iter_samples(
+            segment["file_name"],
+            seconds_interval,
+            segment["start_time"],
+            end_time,
+            sampling_mode,
+        )
+    ) as frames, cascade_detector(
+        cascade,
+        model,
+        device,
+        lambda result: result.select(object_name, CASCADE_OPTIONS.SCREEN_CONFIDENCE).any(),
+    ) as detector:
+        if detector:
+            detections = detector.detect(frames, batch_size, gate)
+        else:
+            detections = detect_frames(model, frames, device, batch_size, gate)
+        for frame_index, timestamp, frame, result in detections:
+            if should_stop and should_stop():
+                break
+            records.append(frame_index, timestamp, result)
+            if not select_best:
+                continue
+            results = [result]
+            frame_time = seconds_to_time(timestamp)
+            image_file_name = os.path.join(
+                image_dir, f"{int(segment['file_index']):02}-{frame_time}.jpg"
             )
 
             frame_info = _handle_predicted_results(
@@ -116,14 +510,130 @@ def yolo_find_objects_by_video(
                 placeholder,
             )
             if frame_info:
-                frame_items = {"file_name": file_name,
-                               "frame": frame, 
+                frame_items = {"file_name": image_file_name,
+                               "frame_time": frame_time,
+                               "timestamp": timestamp,
+                               # ffmpeg 输出的帧是共享缓冲区的视图，保存时需要复制
+                               "frame": frame if frame.base is None else frame.copy(),
                                "max_confidence": frame_info["max_confidence"], 
                                "max_box_id": frame_info["max_box_id"],
                                "results": frame_info["results"]}
-                identified_objects.append(frame_items)
-        cap.release()
-    return _save_identified_object_images(sorted(identified_objects, key=lambda x: x["file_name"], reverse=False))
+                if sampling_mode == SAMPLING_MODES.FFMPEG:
+                    # 检测用的是缩小后的帧，保存时再读取原始分辨率
+                    frame_items["source"] = (segment["file_name"], frame_index)
+                selector.add(frame_items, segment["file_name"], timestamp)
+    if gate:
+        stats = gate.stats()
+        print(
+            f"运动门控: 推理 {stats['inferred']} 帧, 跳过 {stats['skipped']} 帧"
+            f"({stats['skip_ratio']:.0%}), 文件: {segment['file_name']}"
+        )
+    if detector:
+        detector.report(segment["file_name"])
+    frame_items = selector.flush()
+    # 返回前等待图片写完，界面拿到结果时文件已经存在
+    wait_written(writes)
+    return frame_items, records.compact()
+
+
+def _find_objects_in_records(
+    records,
+    file_name,
+    file_index,
+    image_dir,
+    object_name,
+    min_confidence,
+    seconds_interval=1.0,
+    callback=None,
+    placeholder=None,
+):
+    """
+    从缓存的检测结果中筛选包含目标的帧，每段连续画面保存最佳的一帧
+
+    缓存中没有图像，保存时再从视频中读取.
+    """
+    writes = []
+    selector = BestShotSelector(
+        partial(_save_identified_object_image, writes=writes), _episode_gap(seconds_interval)
+    )
+    for frame_index, timestamp, confidences, boxes in records.matches(object_name, min_confidence):
+        frame_time = seconds_to_time(timestamp)
+        identified_boxes = []
+        for box_id, (confidence, xyxy) in enumerate(
+            zip(round_confidence(confidences).tolist(), boxes), start=1
+        ):
+            identified_boxes.append(
+                {
+                    "box_id": box_id,
+                    "label": object_name,
+                    "confidence": confidence,
+                    "xyxy": xyxy,
+                }
+            )
+            if callback and placeholder:
+                callback(placeholder, _found_message(frame_time, object_name, confidence))
+        selector.add(
+            {
+                "file_name": os.path.join(image_dir, f"{int(file_index):02}-{frame_time}.jpg"),
+                "frame_time": frame_time,
+                "timestamp": timestamp,
+                "frame": None,
+                "frame_width": records.frame_width,
+                "source": (file_name, frame_index),
+                "max_confidence": max(box["confidence"] for box in identified_boxes),
+                "max_box_id": int(np.argmax(confidences)),
+                "results": identified_boxes,
+            },
+            file_name,
+            timestamp,
+        )
+    frame_items = selector.flush()
+    wait_written(writes)
+    return frame_items
+
+
+def _detect_loss_in_segment(
+    model,
+    device,
+    segment,
+    target_label,
+    target_box,
+    tolerance_seconds=10.0,
+    seconds_interval=1.0,
+    batch_size=INFERENCE_OPTIONS.BATCH_SIZE,
+    sampling_mode=DECODE_OPTIONS.SAMPLING_MODE,
+    use_roi=ROI_OPTIONS.ENABLED,
+    cascade=False,
+    should_stop=None,
+):
+    """
+    检测一个视频片段内物体丢失的时间点
+
+    片段向后多扫描 tolerance_seconds，使得在片段末尾开始的消失也能被确认.
+    丢失起点落在下一个片段内时返回None，由下一个片段负责报告.
+    """
+    end_time = None
+    if not segment["last"]:
+        end_time = segment["end_time"] + tolerance_seconds + seconds_interval
+    lost_time = _detect_object_loss_time(
+        segment["file_name"],
+        target_label,
+        target_box,
+        tolerance_seconds,
+        batch_size,
+        start_time=segment["start_time"],
+        end_time=end_time,
+        seconds_interval=seconds_interval,
+        sampling_mode=sampling_mode,
+        use_roi=use_roi,
+        model=model,
+        device=device,
+        cascade=cascade,
+        should_stop=should_stop,
+    )
+    if lost_time is not None and not segment["last"] and lost_time >= segment["end_time"]:
+        return None
+    return lost_time
 
 
 def yolo_find_objects_by_images(
@@ -133,80 +643,169 @@ def yolo_find_objects_by_images(
     object_name,  # 对象名称
     min_confidence,  # 置信率
     draw_box: bool = False,  # 是否在图片作标记
+    batch_size=INFERENCE_OPTIONS.BATCH_SIZE,  # 每批送入模型的图片数
+    reduce=IMAGE_DIR_OPTIONS.JPEG_REDUCE,  # 按 1/reduce 缩小解码, 画框时不缩小
+    workers=IMAGE_DIR_OPTIONS.DECODE_WORKERS,  # 解码线程数, 0 表示自动选择
 ):
+    """
+    批量检测目录中的图片
+
+    图片由线程池并行解码，解码结果直接送入模型并在画框时复用，不再重复读取.
+    进度回调按 IMAGE_DIR_OPTIONS.PROGRESS_INTERVAL 限频，最后一张图片总会回调.
+    缩小解码时返回的坐标已换算回原图.
+    """
     identified_objects = []
-    image_index = 0
-    files = [
+    files = sorted(
         f
         for f in os.listdir(image_dir)
         if os.path.isfile(os.path.join(image_dir, f))
         and f.endswith((".jpg", ".jpeg", ".png"))  # Check for video files
-    ]
+    )
     total = len(files)
     suspectors = 0
-    for file in files:
-        box_index = 0
-        file_name = os.path.join(image_dir, file)
-        results = model.predict(file_name, device="mps")
-        if draw_box:  # if don't need to draw picture, we don't need image.
-            image = cv2.imread(file_name)
-
-        file_yolo_info = {
-            "image_index": image_index,
-            "file_name": file_name,
-            "boxes": [],
-        }
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                box_index += 1
-                cls_id = int(box.cls[0])
-                label = model.names[cls_id]
-                confidence = float("{:02f}".format(float(box.conf[0])))
-                if (
-                    label == object_name or object_name is None
-                ) and confidence >= min_confidence:
-                    box_info = {
-                        "box_index": box_index,
-                        # "video_index": dir,
-                        "label": label,
-                        "confidence": confidence,
-                        "cls_id": cls_id,
-                        "box": box,
-                    }
-                    file_yolo_info["boxes"].append(box_info)
-                    suspectors += 1
-                    identified_objects.append(file_yolo_info)
-                    if not draw_box:
-                        callback(
-                            placeholder, image_index, total, suspectors, confidence
-                        )
-                if draw_box:
-                    xyxy = box.xyxy[0].cpu().numpy()  # Bo
-                    x1, y1, x2, y2 = map(int, xyxy)
-                    cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    text = f"{box_index}-{label} {confidence:.2f}"
-                    cv2.putText(
-                        image,
-                        text,
-                        (x1, y1 - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        1.5,
-                        (0, 255, 0),
-                        2,
+    if draw_box:
+        reduce = 1
+    on_found = Throttle(callback, IMAGE_DIR_OPTIONS.PROGRESS_INTERVAL)
+    on_image = Throttle(callback, IMAGE_DIR_OPTIONS.PROGRESS_INTERVAL)
+    device = get_available_device()
+    sizer = BatchSizer(batch_size)
+    images = iter_images(
+        [os.path.join(image_dir, f) for f in files],
+        reduce,
+        workers,
+        lookahead=batch_size * IMAGE_DIR_OPTIONS.PREFETCH_BATCHES,
+    )
+    writes = []
+    with use_model() as model:
+        for batch in adaptive_batches(enumerate(images), sizer):
+            decoded = []
+            for index, (file_name, image) in batch:
+                if image is None:
+                    print(f"无法读取图片: {file_name}")
+                    on_image(placeholder, file_name, force=index == total - 1)
+                    continue
+                decoded.append((index, file_name, image))
+            batch_results = predict_batch(model, [item[2] for item in decoded], device, sizer)
+            for (index, file_name, image), result in zip(decoded, batch_results):
+                boxes = _identify_boxes(
+                    result, object_name, min_confidence, image if draw_box else None
+                )
+                if reduce > 1:
+                    for box_info in boxes:
+                        box_info["xyxy"] = [value * reduce for value in box_info["xyxy"]]
+                if boxes:
+                    identified_objects.append(
+                        {"image_index": index, "file_name": file_name, "boxes": boxes}
                     )
-        if draw_box:
-            cv2.imwrite(file_name, image)
+                if not draw_box:
+                    for box_info in boxes:
+                        suspectors += 1
+                        on_found(placeholder, index, total, suspectors, box_info["confidence"])
+                if draw_box:
+                    # 画框用的就是送入模型的那份解码结果
+                    writes.append(get_image_sink().submit(file_name, image))
+                on_image(placeholder, file_name, force=index == total - 1)
+    wait_written(writes)
+    return identified_objects
 
-        if callback:
-            callback(placeholder, file_name)
 
-        image_index += 1
+def yolo_find_objects_in_frames(
+    frames,
+    object_name,
+    min_confidence,
+    draw_box: bool = False,
+    save_limit=1,
+    batch_size=INFERENCE_OPTIONS.BATCH_SIZE,
+):
+    """
+    在内存中的帧里查找对象，帧不经过 JPEG 编码与磁盘
+
+    参数:
+    frames (list): (图片文件名, 帧) 列表，文件名用于结果以及保存标记后的图片
+    object_name (str): 对象名称，None 表示所有类别
+    min_confidence (float): 最小置信度
+    draw_box (bool): 保存的图片上是否画出检测框
+    save_limit (int): 只保存前 save_limit 个包含对象的帧(通常只有一帧需要给用户查看)
+
+    返回:
+    list: 与 yolo_find_objects_by_images 相同，每个包含对象的帧一项 {"image_index", "file_name", "boxes"}
+    """
+    identified_objects = []
+    writes = []
+    device = get_available_device()
+    with use_model() as model:
+        results = predict_batch(
+            model, [frame for _, frame in frames], device, BatchSizer(batch_size)
+        )
+    for image_index, ((file_name, frame), result) in enumerate(zip(frames, results)):
+        save = len(identified_objects) < save_limit
+        image = frame.copy() if save and draw_box else None
+        boxes = _identify_boxes(result, object_name, min_confidence, image)
+        if not boxes:
+            continue
+        if save:
+            writes.append(get_image_sink().submit(file_name, frame if image is None else image))
+        identified_objects.append(
+            {"image_index": image_index, "file_name": file_name, "boxes": boxes}
+        )
+    wait_written(writes)
     return identified_objects
 
 
+def _identify_boxes(detections, object_name, min_confidence, image=None):
+    """
+    检测框列表，image 不为 None 时在上面画出所有检测框
+
+    返回:
+    list: 类别与置信度符合条件的检测框 {"box_index", "label", "confidence", "cls_id", "xyxy"}，
+          box_index 是框在该帧所有检测框中的序号(从 1 开始)，与图上标注的序号一致
+    """
+    boxes = []
+    # 一次算出所有框的类别、置信度与是否命中，循环中只构造输出
+    matched = detections.select(object_name, min_confidence)
+    confidences = round_confidence(detections.conf).tolist()
+    class_ids = detections.cls.tolist()
+    for box_index, xyxy in enumerate(detections.xyxy.tolist(), start=1):
+        label = detections.names[class_ids[box_index - 1]]
+        confidence = confidences[box_index - 1]
+        if matched[box_index - 1]:
+            boxes.append(
+                {
+                    "box_index": box_index,
+                    "label": label,
+                    "confidence": confidence,
+                    "cls_id": class_ids[box_index - 1],
+                    "xyxy": xyxy,
+                }
+            )
+        if image is not None:
+            x1, y1, x2, y2 = xyxy
+            cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            text = f"{box_index}-{label} {confidence:.2f}"
+            cv2.putText(
+                image,
+                text,
+                (x1, y1 - 10),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                1.5,
+                (0, 255, 0),
+                2,
+            )
+    return boxes
+
+
 def _detect_object_loss_time(
-    video_path, target_label, target_box, tolerance_seconds=10.0
+    video_path, target_label, target_box, tolerance_seconds=10.0,
+    batch_size=INFERENCE_OPTIONS.BATCH_SIZE,
+    start_time=0.0,
+    end_time=None,
+    seconds_interval=1.0,
+    sampling_mode=DECODE_OPTIONS.SAMPLING_MODE,
+    use_roi=ROI_OPTIONS.ENABLED,
+    model=None,
+    device=None,
+    cascade=False,
+    should_stop=None,
 ):
     """
     检测视频中指定物体丢失的时间点
@@ -216,214 +815,342 @@ def _detect_object_loss_time(
     target_label (str): 目标物体的标签名称（如"cell phone", "handbag"等）
     target_box (list): 目标物体的初始边界框 [x1, y1, x2, y2]
     tolerance_seconds (float): 容错时间，物体必须连续消失超过这个时间才被视为丢失
+    batch_size (int): 每批送入模型的帧数
+    start_time (float): 开始检测的时间(秒)
+    end_time (float): 结束检测的时间(秒)，None 表示到视频结尾
+    seconds_interval (float): 采样间隔(秒)
+    sampling_mode (str): 采样模式，见 SAMPLING_MODES
+    use_roi (bool): 只在目标框周围的区域内以小尺寸检测，结果不确定时再做整帧检测
+    model: 使用的模型，由调用方从 models.use_model() 借出；None 表示借用默认模型(yolo11x)
+    device (str): 推理设备，None 表示自动选择
+    cascade (bool): 两级检测，小模型没有在原处确认到目标的帧(疑似消失)由 model 确认
+    should_stop: 返回 True 时提前结束检测
 
     返回:
     float: 物体丢失的时间点（秒），如果物体未丢失则返回None
     """
-    device = get_available_device()
+    if model is None:
+        with use_model() as model:
+            return _detect_object_loss_time(
+                video_path,
+                target_label,
+                target_box,
+                tolerance_seconds,
+                batch_size,
+                start_time=start_time,
+                end_time=end_time,
+                seconds_interval=seconds_interval,
+                sampling_mode=sampling_mode,
+                use_roi=use_roi,
+                model=model,
+                device=device,
+                cascade=cascade,
+                should_stop=should_stop,
+            )
+    if device is None:
+        device = get_available_device()
 
-    # 打开视频文件
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
+    properties = read_video_properties(video_path)
+    if properties is None:
         print(f"无法打开视频文件: {video_path}")
         return None
 
     # 获取视频属性
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-
-    # print(f"视频FPS: {fps}")
-    # print(f"总帧数: {total_frames}")
+    fps = properties["fps"]
 
     # 计算容错帧数
     tolerance_frames = int(tolerance_seconds * fps)
 
-    # 定义函数计算IoU (交并比)
-    def calculate_iou(box1, box2):
-        # 计算交集区域的坐标
-        x1 = max(box1[0], box2[0])
-        y1 = max(box1[1], box2[1])
-        x2 = min(box1[2], box2[2])
-        y2 = min(box1[3], box2[3])
-
-        # 计算交集面积
-        intersection = max(0, x2 - x1) * max(0, y2 - y1)
-
-        # 计算两个框的面积
-        box1_area = (box1[2] - box1[0]) * (box1[3] - box1[1])
-        box2_area = (box2[2] - box2[0]) * (box2[3] - box2[1])
-
-        # 计算并集面积
-        union = box1_area + box2_area - intersection
-
-        # 计算IoU
-        if union == 0:
-            return 0
-        return intersection / union
-
     # 初始化变量
     object_detected = True
     missing_start_frame = None
     missing_count = 0
     lost_time = None
 
-    # 设定IoU阈值，用于判断检测到的物体是否为目标物体
-    iou_threshold = 0.3
+    frame_width, frame_height = ffmpeg_output_size(properties, None)
+    if sampling_mode == SAMPLING_MODES.FFMPEG:
+        # ffmpeg 输出的是缩小后的帧，目标框按同样的比例缩小
+        display_width = frame_width
+        frame_width, frame_height = ffmpeg_output_size(properties)
+        scale = frame_width / display_width
+        target_box = [value * scale for value in target_box]
+
+    # 只检测目标周围的区域
+    window = None
+    predict_kwargs = {}
+    if use_roi:
+        window = _roi_window(target_box, frame_width, frame_height)
+        predict_kwargs["imgsz"] = ROI_OPTIONS.IMGSZ
+    full_frame_checks = 0
 
     # 开始处理视频
-      # --- 配置 ---
-    seconds_interval = 1.0  # 设置为您想要的间隔，例如每 2 秒读取一帧
-    msec_interval = seconds_interval * 1000 # 转换为毫秒
-    current_target_msec = 0 # 从视频开始处
-    processed_frame_count = 0
     print(f"配置为大约每 {seconds_interval} 秒尝试读取一帧...")
 
-    while cap.isOpened():
-        cap.set(cv2.CAP_PROP_POS_MSEC, current_target_msec)
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-
-        # 如果读取成功，我们得到了目标时间点附近的帧
-        processed_frame_count += 1
-        # 更新下一次目标时间点
-        current_target_msec += msec_interval
-        # (可选) 添加非常小的延时防止CPU空转过快，或者根据处理时间动态调整
-        # time.sleep(0.01)
-        current_frame_index = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
-        results = model.predict(frame, device=device, verbose=False)
-
-        # 查找匹配的物体
-        object_found = False
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                # 获取预测的类别
-                cls = int(box.cls[0])
-                label = model.names[cls]
-
-                # 如果标签匹配
-                if label == target_label:
-                    # 获取预测的边界框
-                    detected_box = (
-                        box.xyxy[0].cpu().numpy()
-                    )  # 转换为 [x1, y1, x2, y2] 格式
-
-                    # 计算IoU
-                    iou = calculate_iou(target_box, detected_box)
-
-                    # 如果IoU大于阈值，认为是目标物体
-                    if iou > iou_threshold:
-                        object_found = True
-                        break
-
-            if object_found:
+    def is_present(result):
+        # 小模型在原处找到目标且没有被检测区域截断时，不需要大模型确认
+        iou, truncated = _best_target_iou([result], target_label, target_box, window)
+        return iou > IOU_THRESHOLD and not truncated
+
+    with Prefetcher(
+        iter_samples(video_path, seconds_interval, start_time, end_time, sampling_mode)
+    ) as frames, cascade_detector(
+        cascade, model, device, is_present, escalate_on=False
+    ) as detector:
+        if window:
+            x1, y1, x2, y2 = window
+            frames = (
+                (frame_index, timestamp, frame, frame[y1:y2, x1:x2])
+                for frame_index, timestamp, frame in frames
+            )
+        if detector:
+            detections = detector.detect(frames, batch_size, **predict_kwargs)
+        else:
+            detections = detect_frames(model, frames, device, batch_size, **predict_kwargs)
+        for item in detections:
+            if should_stop and should_stop():
                 break
+            current_frame_index, frame, result = item[0], item[2], item[-1]
 
-        # 检查物体是否消失
-        if not object_found:
-            if object_detected:  # 物体刚开始消失
-                missing_start_frame = current_frame_index
-                object_detected = False
+            # 查找匹配的物体
+            object_found, full_frame_checked = _is_target_present(
+                model, device, frame, result, target_label, target_box, window
+            )
+            full_frame_checks += full_frame_checked
+
+            # 检查物体是否消失
+            if not object_found:
+                if object_detected:  # 物体刚开始消失
+                    missing_start_frame = current_frame_index
+                    object_detected = False
+
+                missing_count = current_frame_index - missing_start_frame
+
+                # 检查是否超过容错时间
+                if missing_count >= tolerance_frames:
+                    lost_time = missing_start_frame / fps
+                    print(f"物体在视频 {lost_time:.2f} 秒处丢失")
+                    # 可以选择在这里退出循环或继续检测
+                    break
+            else:
+                # 物体重新出现
+                if not object_detected:
+                    object_detected = True
+                    missing_count = 0
+                    # 如果在容错时间内物体重新出现，重置丢失时间
+                    if (
+                        lost_time is not None
+                        and (current_frame_index / fps - lost_time) <= tolerance_seconds
+                    ):
+                        print(
+                            f"物体在视频 {current_frame_index/ fps:.2f} 秒处重新出现，不视为丢失"
+                        )
+                        lost_time = None
+    if window:
+        print(f"局部检测区域 {window}, 整帧确认 {full_frame_checks} 次")
+    if detector:
+        detector.report(video_path)
+    return lost_time
 
-            missing_count = current_frame_index - missing_start_frame
 
-            # 检查是否超过容错时间
-            if missing_count >= tolerance_frames:
-                lost_time = missing_start_frame / fps
-                print(f"物体在视频 {lost_time:.2f} 秒处丢失")
-                # 可以选择在这里退出循环或继续检测
-                break
-        else:
-            # 物体重新出现
-            if not object_detected:
-                object_detected = True
-                missing_count = 0
-                # 如果在容错时间内物体重新出现，重置丢失时间
-                if (
-                    lost_time is not None
-                    and (current_frame_index / fps - lost_time) <= tolerance_seconds
-                ):
-                    print(
-                        f"物体在视频 {current_frame_index/ fps:.2f} 秒处重新出现，不视为丢失"
-                    )
-                    lost_time = None
-    # 释放视频资源
-    cap.release()
+def _bisect_object_loss_time(
+    video_path,
+    target_label,
+    target_box,
+    tolerance_seconds=10.0,
+    seconds_interval=1.0,
+    use_roi=ROI_OPTIONS.ENABLED,
+    model=None,
+    device=None,
+):
+    """
+    由粗到细查找单个视频中物体丢失的时间点，见 loss_search.bisect_search
+
+    model 为 None 时借用默认模型(yolo11x)
+
+    返回:
+    float: 物体丢失的时间点（秒），如果物体未丢失则返回None
+    """
+    if model is None:
+        with use_model() as model:
+            return _bisect_object_loss_time(
+                video_path,
+                target_label,
+                target_box,
+                tolerance_seconds,
+                seconds_interval=seconds_interval,
+                use_roi=use_roi,
+                model=model,
+                device=device,
+            )
+    if device is None:
+        device = get_available_device()
+
+    properties = read_video_properties(video_path)
+    if properties is None:
+        print(f"无法打开视频文件: {video_path}")
+        return None
+    fps = properties["fps"]
+    total_frames = properties["total_frames"]
+    if fps <= 0 or total_frames <= 0:
+        print(f"无法获取视频帧率: {video_path}")
+        return None
+
+    window = None
+    predict_kwargs = {}
+    if use_roi:
+        window = _roi_window(target_box, *ffmpeg_output_size(properties, None))
+        predict_kwargs["imgsz"] = ROI_OPTIONS.IMGSZ
+    counters = {"inferences": 0, "full_frame_checks": 0}
+
+    cap = cv2.VideoCapture(video_path)
+
+    def is_present(timestamp):
+        frame_index = min(int(round(timestamp * fps)), total_frames - 1)
+        seek_frame(cap, frame_index, properties)
+        ret, frame = cap.read()
+        if not ret:
+            # 读不到的帧不作为丢失的依据
+            return True
+        x1, y1, x2, y2 = window or (0, 0, frame.shape[1], frame.shape[0])
+        result = predict_batch(model, [frame[y1:y2, x1:x2]], device, **predict_kwargs)[0]
+        found, full_frame_checked = _is_target_present(
+            model, device, frame, result, target_label, target_box, window
+        )
+        counters["inferences"] += 1
+        counters["full_frame_checks"] += full_frame_checked
+        return found
+
+    try:
+        lost_time = bisect_search(
+            is_present,
+            0.0,
+            (total_frames - 1) / fps,
+            tolerance_seconds,
+            seconds_interval,
+        )
+    finally:
+        cap.release()
+
+    print(
+        f"二分查找检测 {counters['inferences']} 帧, 整帧确认 {counters['full_frame_checks']} 次"
+    )
+    if lost_time is not None:
+        print(f"物体在视频 {lost_time:.2f} 秒处丢失")
     return lost_time
 
-def _get_max_confidence_image(identified_objects):
-    filted_images = []
-
-    max_confidence_image = None
-    prev_second = 0
-    prev_confidence = 0
-    for identified_object in identified_objects:
-        file_name = identified_object["file_name"]
-        confidence = identified_object["max_confidence"]
-        second = int(file_name.split(".")[0].split("-")[-1])
-        next_second = prev_second + 1
-        if next_second == 60:
-            next_second = 0
-
-        if next_second == second:
-            if prev_confidence < confidence:
-                prev_confidence = confidence
-                max_confidence_image = identified_object
-            prev_second += 1
-        else:
-            prev_second = second
-            prev_confidence = confidence
-            if max_confidence_image is not None:
-                filted_images.append(max_confidence_image)
-            max_confidence_image = identified_object
-    filted_images.append(max_confidence_image)
-    return filted_images
 
-def _save_identified_object_images(identified_objects : list):
+def _is_target_present(model, device, frame, result, target_label, target_box, window=None):
     """
-    保存识别的对象到图像
+    根据检测结果判断目标物体是否还在原处
+
+    result 是在 window 区域内检测得到时，若结果不确定(匹配框IoU偏低或贴着区域边缘)，
+    再对整帧检测确认.
+
+    返回:
+    tuple: (物体是否存在, 是否做了整帧确认)
+    """
+    iou, truncated = _best_target_iou([result], target_label, target_box, window)
+    if window and (truncated or 0 < iou <= IOU_THRESHOLD):
+        full_result = predict_batch(model, [frame], device)[0]
+        iou, _ = _best_target_iou([full_result], target_label, target_box)
+        return iou > IOU_THRESHOLD, True
+    # 如果IoU大于阈值，认为是目标物体
+    return iou > IOU_THRESHOLD, False
+
+
+def _roi_window(target_box, frame_width, frame_height):
+    """
+    以目标框为中心，按 ROI_OPTIONS 扩展出检测区域
+
+    返回:
+    tuple: (x1, y1, x2, y2)，已裁剪到画面范围内
+    """
+    x1, y1, x2, y2 = target_box
+    center_x = (x1 + x2) / 2
+    center_y = (y1 + y2) / 2
+    half_width = max((x2 - x1) * (0.5 + ROI_OPTIONS.MARGIN), ROI_OPTIONS.MIN_SIZE / 2)
+    half_height = max((y2 - y1) * (0.5 + ROI_OPTIONS.MARGIN), ROI_OPTIONS.MIN_SIZE / 2)
+    return (
+        max(0, int(center_x - half_width)),
+        max(0, int(center_y - half_height)),
+        min(frame_width, int(center_x + half_width)),
+        min(frame_height, int(center_y + half_height)),
+    )
+
+
+def _best_target_iou(results, target_label, target_box, window=None):
+    """
+    计算标签匹配的检测框与目标框的最大IoU
+
     参数:
-    - image: 图像
-    - file_name: 文件名
-    - identified_objects: 识别的对象列表
+    window (tuple): 检测区域，results 是在该区域内检测得到时传入，用于把坐标映射回整帧
+
+    返回:
+    tuple: (最大IoU, 是否有匹配的框贴着检测区域的边缘，可能被截断)
     """
+    best_iou = 0
+    truncated = False
+    for detections in results:
+        iou, edge = best_target_iou(detections, target_label, target_box, window)
+        best_iou = max(best_iou, iou)
+        truncated = truncated or edge
+    return best_iou, truncated
 
-    max_confidence_images = _get_max_confidence_image(identified_objects)
-    if len(max_confidence_images) == 0:
-        print("没有识别到对象")
-        return None
 
-    for identified_object in max_confidence_images:
-        image = identified_object["frame"]
-        if image is None:
-            continue
+def _episode_gap(seconds_interval):
+    """相邻两个采样点都命中才算同一段连续画面"""
+    return seconds_interval * 1.5
 
-        file_name = identified_object["file_name"]
-        results = identified_object["results"]
-        for result in results:
-            box_id = result["box_id"]
-            label = result["label"]
-            confidence = result["confidence"]
-            box = result['box']
-            # print(f"> {label}: {confidence:.2f}")
-            xyxy = box.xyxy[0].cpu().numpy()
-        
-            x1, y1, x2, y2 = map(int, xyxy)
-            cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            text = f"{box_id}-{label} {confidence:.2f}"
-            cv2.putText(
-                image,
-                text,
-                (x1, y1 - 10),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                1.5,
-                (0, 255, 0),
-                2,
-            )
-        cv2.imwrite(file_name, image)
-    return max_confidence_images
+
+def _save_identified_object_image(identified_object, writes=None):
+    """
+    在画面上标记识别的对象并交给 ImageSink 保存为 identified_object["file_name"]
+
+    提交后释放帧图像，只保留帧信息. writes 不为 None 时把写入的 Future 加入其中，
+    调用方用 wait_written 等待文件写完.
+
+    返回:
+    dict: identified_object；既没有帧图像也读不到原始帧时返回None，图片不会生成，这一帧不应出现在结果中
+    """
+    image = identified_object["frame"]
+    scale = 1
+    source = identified_object.get("source")
+    if source and (image is None or FFMPEG_OPTIONS.SAVE_FULL_RESOLUTION):
+        full_image = read_full_frame(*source)
+        if full_image is not None:
+            frame_width = image.shape[1] if image is not None else identified_object["frame_width"]
+            scale = full_image.shape[1] / frame_width
+            image = full_image
+    if image is None:
+        print(f"无法读取画面，跳过: {identified_object['file_name']}")
+        return None
+
+    file_name = identified_object["file_name"]
+    results = identified_object["results"]
+    for result in results:
+        box_id = result["box_id"]
+        label = result["label"]
+        confidence = result["confidence"]
+        # print(f"> {label}: {confidence:.2f}")
+        xyxy = result["xyxy"] * scale
+
+        x1, y1, x2, y2 = map(int, xyxy)
+        cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        text = f"{box_id}-{label} {confidence:.2f}"
+        cv2.putText(
+            image,
+            text,
+            (x1, y1 - 10),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            1.5,
+            (0, 255, 0),
+            2,
+        )
+    written = get_image_sink().submit(file_name, image)
+    if writes is not None:
+        writes.append(written)
+    identified_object["frame"] = None
+    return identified_object
 
 
 def _handle_predicted_results(
@@ -438,38 +1165,44 @@ def _handle_predicted_results(
     box_id = 0
     max_confidence = 0
     max_box_id = 0
-    for result in results:
-        boxes = result.boxes
-        for box in boxes:
-            cls_id = int(box.cls[0])
-            label = model.names[cls_id]
-            confidence = float("{:02f}".format(float(box.conf[0])))
-            # print(f"> {label}: {confidence:.2f}")
-            if label == object_name and confidence >= min_confidence:
-                if confidence > max_confidence:
-                    max_confidence = confidence
-                    max_box_id = box_id
-                box_id += 1
-                box_info = {
+    for detections in results:
+        _, confidences, class_ids, boxes = select_boxes(detections, object_name, min_confidence)
+        if not len(confidences):
+            continue
+        best = int(np.argmax(confidences))
+        if confidences[best] > max_confidence:
+            max_confidence = float(confidences[best])
+            max_box_id = box_id + best
+        for confidence, cls_id, xyxy in zip(confidences.tolist(), class_ids.tolist(), boxes):
+            box_id += 1
+            identified_boxes.append(
+                {
                     "box_id": box_id,
-                    "label": label,
+                    "label": object_name,
                     "confidence": confidence,
                     "cls_id": cls_id,
-                    "box": box,
+                    "xyxy": xyxy,
                 }
-                identified_boxes.append(box_info)
-                if callback and placeholder:
-                        callback(placeholder, f"在{get_str_time(time)}找到了{object_name},置信度为:{confidence}")
+            )
+            if callback and placeholder:
+                callback(placeholder, _found_message(time, object_name, confidence))
     if max_confidence > 0:
-        return {"max_confidence": max_confidence, "lable": label, "max_box_id": max_box_id, "results": identified_boxes}
+        return {"max_confidence": max_confidence, "lable": object_name, "max_box_id": max_box_id, "results": identified_boxes}
     
     return None
 
 
     
 
+def _found_message(frame_time, object_name, confidence):
+    return f"在{get_str_time(frame_time)}找到了{object_name},置信度为:{confidence}"
+
+
 def frame_index_to_time(frame_index, fps):
-    seconds = frame_index / fps
+    return seconds_to_time(frame_index / fps)
+
+
+def seconds_to_time(seconds):
     minutes = seconds // 60
     seconds = seconds % 60
     hours = minutes // 60
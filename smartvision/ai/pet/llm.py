@@ -1,11 +1,25 @@
 import os
 import json
-from llama_index.core.llms import ChatMessage
-from llama_index.llms.deepseek import DeepSeek
+import threading
 from common.settings import SESSION_KEYS, KEY_NAMES, MODEL_NAMES, STAGE
 
-DP_API_KEY = os.getenv(KEY_NAMES.DEEPSEEK)
-llm = DeepSeek(model=MODEL_NAMES.DP_CHAT, request_timeout=120.0, api_key=DP_API_KEY)
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    """第一次对话时才创建 DeepSeek 客户端，缺少密钥不影响页面启动"""
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            from llama_index.llms.deepseek import DeepSeek
+
+            _llm = DeepSeek(
+                model=MODEL_NAMES.DP_CHAT,
+                request_timeout=120.0,
+                api_key=os.getenv(KEY_NAMES.DEEPSEEK),
+            )
+        return _llm
 
 
 def initialize_chat(st, welcome_message):
@@ -57,10 +71,12 @@ def get_next_question(st):
     """
 
     try:
+        from llama_index.core.llms import ChatMessage
+
         messages = [
             ChatMessage(role="user", content=system_message),
         ]
-        return llm.chat(messages).message.content
+        return get_llm().chat(messages).message.content
     except Exception as e:
         st.error(f"API请求错误: {str(e)}")
         return "请问还有什么关于您丢失宠物的信息可以提供吗？"
@@ -110,10 +126,12 @@ def extract_pet_info(st, text):
     """
 
     try:
+        from llama_index.core.llms import ChatMessage
+
         messages = [
             ChatMessage(role="user", content=prompt),
         ]
-        result = llm.chat(messages).message.content
+        result = get_llm().chat(messages).message.content
         print(f"提取的宠物信息: {result}")
         # 尝试解析JSON
         try:
@@ -10,20 +10,25 @@
 # except Exception as e:
 #     print(f"⚠️ 调试器连接失败: {str(e)}")
 
-import torch
 import streamlit as st
-import os
+from common import startup
 
 # Set page config
-torch.classes.__path__ = [os.path.join(torch.__path__[0], torch.classes.__file__)]
+# torch.classes 的路径修正在后台预热导入 torch 之后进行(见 common/startup.py)
 st.set_page_config(page_title="SmartVision", layout="wide")
 
 # Import components
-from ui.components.sidebar import render_sidebar
-from ui.components.content import render_content
+# torch、ultralytics、cv2 与模型不在导入链中，由后台线程预热
+with startup.timed("ui.components.sidebar"):
+    from ui.components.sidebar import render_sidebar
+with startup.timed("ui.components.content"):
+    from ui.components.content import render_content
 from common.session import init_session
 from common.loader import load_css
-from streamlit_player import st_player
+with startup.timed("streamlit_player"):
+    from streamlit_player import st_player
+
+startup.start_warm_up()
 
 # app.py
 import streamlit as st
@@ -51,3 +56,5 @@ render_sidebar()
 
 # # Render main content
 render_content()
+
+startup.report_once()
@@ -1,24 +1,35 @@
-import oss2
-from oss2.credentials import EnvironmentVariableCredentialsProvider
 from dotenv import load_dotenv
 import os
 import subprocess
+import threading
 
 load_dotenv()
 
 BUCKET_NAME = "smart-vision"
 
-end_point = os.getenv("ALIYUN_OSS_END_POINT")
-oss_access_key = os.getenv("ALIYUN_OSS_ASSESS_KEY")
-oss_access_key_secret = os.getenv("ALIYUN_OSS_SECRET_KEY")
-
-auth = oss2.Auth(oss_access_key, oss_access_key_secret)
-bucket = oss2.Bucket(auth, end_point, BUCKET_NAME)
 headers = {"Content-Type": "image/jpeg", "Content-Disposition": "inline"}  # 对于JPG图片
 
+_bucket = None
+_bucket_lock = threading.Lock()
+
+
+def get_bucket():
+    """第一次上传时才创建 OSS bucket，缺少配置不影响页面启动"""
+    global _bucket
+    with _bucket_lock:
+        if _bucket is None:
+            import oss2
+
+            end_point = os.getenv("ALIYUN_OSS_END_POINT")
+            oss_access_key = os.getenv("ALIYUN_OSS_ASSESS_KEY")
+            oss_access_key_secret = os.getenv("ALIYUN_OSS_SECRET_KEY")
+            auth = oss2.Auth(oss_access_key, oss_access_key_secret)
+            _bucket = oss2.Bucket(auth, end_point, BUCKET_NAME)
+        return _bucket
+
 def aliyu_oss_put_object(local_file, object_name):
     with open(local_file, "rb") as f:
-        bucket.put_object(object_name, f, headers=headers)
+        get_bucket().put_object(object_name, f, headers=headers)
 
 def put_identified_objects(transaction_id: str, images: list):
     if not images:
@@ -0,0 +1,57 @@
+import hashlib
+import os
+from common.settings import LOCAL_DIRS
+
+_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def store_blob(source, suffix=""):
+    """
+    把 source 的内容写入按 sha256 命名的文件，内容相同的文件只保存一份
+
+    写入的同时计算哈希，不需要再读一遍文件.
+
+    参数:
+    source: 支持 read(size) 的文件对象，如 Streamlit 的 UploadedFile
+    suffix (str): 文件扩展名，如 ".mp4"
+
+    返回:
+    tuple: (blob 文件路径, 内容哈希)
+    """
+    os.makedirs(LOCAL_DIRS.BLOB_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    temp_file = os.path.join(LOCAL_DIRS.BLOB_DIR, f".upload-{os.getpid()}-{id(source)}.tmp")
+    try:
+        with open(temp_file, "wb") as f:
+            while True:
+                chunk = source.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+        content_hash = digest.hexdigest()
+        blob_path = os.path.join(LOCAL_DIRS.BLOB_DIR, f"{content_hash}{suffix.lower()}")
+        if os.path.exists(blob_path):
+            os.remove(temp_file)
+        else:
+            os.replace(temp_file, blob_path)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return blob_path, content_hash
+
+
+def link_blob(blob_path, link_path):
+    """在会话目录中创建指向 blob 的符号链接，已存在的同名文件会被替换"""
+    if os.path.lexists(link_path):
+        os.remove(link_path)
+    os.symlink(blob_path, link_path)
+
+
+def blob_content_hash(file_name):
+    """file_name(或它指向的文件)位于 blob 目录时返回内容哈希，否则返回None"""
+    real_path = os.path.realpath(file_name)
+    if os.path.dirname(real_path) != os.path.realpath(LOCAL_DIRS.BLOB_DIR):
+        return None
+    return os.path.splitext(os.path.basename(real_path))[0]
@@ -0,0 +1,182 @@
+"""
+硬件与编解码能力探测
+
+每个进程只探测一次并缓存结果: 计算设备、torch 线程数、CPU 指令集、OpenCV 与 ffmpeg
+可用的编解码器以及硬件加速选项. 扫描、剪辑和编码都从 get_capabilities() 读取，
+请求处理过程中不再创建测试张量或启动子进程. 页面启动时由后台预热线程完成探测.
+
+python -m common.capabilities 输出当前环境的探测结果.
+"""
+import os
+import platform
+import subprocess
+import tempfile
+import threading
+from common.settings import CAPABILITY_OPTIONS, FFMPEG_OPTIONS
+
+_capabilities = None
+_lock = threading.Lock()
+
+
+def get_capabilities():
+    """返回当前进程的能力探测结果，第一次调用时探测"""
+    global _capabilities
+    with _lock:
+        if _capabilities is None:
+            _capabilities = _probe()
+        return _capabilities
+
+
+def preferred_fourcc():
+    """OpenCV VideoWriter 第一个可用的编码，都不可用时返回列表中的最后一个"""
+    fourccs = get_capabilities()["opencv_fourccs"]
+    return fourccs[0] if fourccs else CAPABILITY_OPTIONS.FOURCCS[-1]
+
+
+def ffmpeg_hwaccel():
+    """FFMPEG_OPTIONS.HWACCEL 可用时返回它，否则返回 None"""
+    hwaccel = FFMPEG_OPTIONS.HWACCEL
+    if hwaccel and hwaccel in get_capabilities()["ffmpeg_hwaccels"]:
+        return hwaccel
+    return None
+
+
+def _probe():
+    import torch
+
+    gpu, gpu_hwaccel = _probe_gpu()
+    encoders, decoders, hwaccels = _probe_ffmpeg()
+    return {
+        "device": _probe_device(torch),
+        "torch_threads": torch.get_num_threads(),
+        "cpu_count": os.cpu_count() or 1,
+        "machine": platform.machine(),
+        "cpu_features": _probe_cpu_features(),
+        "gpu": gpu,
+        "gpu_hwaccel": gpu_hwaccel,
+        "opencv_fourccs": _probe_opencv_fourccs(),
+        "ffmpeg_encoders": encoders,
+        "ffmpeg_decoders": decoders,
+        "ffmpeg_hwaccels": hwaccels,
+    }
+
+
+def _probe_device(torch):
+    """
+    检测可用的最佳计算设备 (MPS, CUDA, 或 CPU).
+    优先顺序: MPS (在 macOS上), CUDA, CPU.
+    """
+    # 检查 Apple Silicon (MPS)
+    if platform.system() == "Darwin":
+        if torch.backends.mps.is_available():
+            # 某些旧 macOS 版本或 PyTorch 版本上 MPS 可用但不能工作，创建一个张量验证
+            try:
+                _ = torch.tensor([1.0, 2.0]).to("mps")
+                print("MPS 功能正常。将使用 'mps' 设备。")
+                return "mps"
+            except Exception as e:
+                print(f"MPS 可用但测试失败: {e}。将回退到 CPU。")
+        else:
+            print("MPS 不可用。")
+
+    # 检查 NVIDIA CUDA
+    if torch.cuda.is_available() and torch.cuda.device_count() > 0:
+        print(f"将使用 CUDA 设备 0: {torch.cuda.get_device_name(0)}")
+        return "cuda"
+
+    print("MPS 和 CUDA 均不可用。将使用 'cpu' 设备。")
+    return "cpu"
+
+
+def _run(command):
+    try:
+        return subprocess.check_output(command, stderr=subprocess.STDOUT, timeout=10)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
+        return None
+
+
+def _probe_gpu():
+    """检查系统是否有可用的GPU，并返回适合的FFmpeg硬件加速选项"""
+    system = platform.system()
+    if _run(["nvidia-smi"]) is not None:
+        return True, "cuda"
+
+    if system == "Linux":
+        lspci_output = _run(["lspci"]) or b""
+        display = b"VGA" in lspci_output or b"Display" in lspci_output
+        if display and b"AMD" in lspci_output:
+            return True, "amf"
+        if display and b"Intel" in lspci_output:
+            return True, "qsv"
+    elif system == "Windows":
+        dxdiag_output = _run(["dxdiag", "/t"]) or b""
+        if b"Intel" in dxdiag_output and (
+            b"Graphics" in dxdiag_output or b"Display" in dxdiag_output
+        ):
+            return True, "qsv"
+    elif system == "Darwin":
+        if b"Apple" in (_run(["sysctl", "-n", "machdep.cpu.brand_string"]) or b""):
+            return True, "videotoolbox"
+
+    return False, None
+
+
+def _probe_cpu_features():
+    """CPU_FEATURES 中当前 CPU 支持的指令集"""
+    flags = set()
+    if platform.system() == "Linux":
+        try:
+            with open("/proc/cpuinfo") as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    if key.strip() in ("flags", "Features"):
+                        flags.update(value.split())
+        except OSError:
+            pass
+    elif platform.system() == "Darwin":
+        output = _run(["sysctl", "-n", "machdep.cpu.features", "machdep.cpu.leaf7_features"])
+        if output:
+            flags.update(output.decode(errors="ignore").lower().replace(".", "_").split())
+        if platform.machine() == "arm64":
+            flags.add("asimd")
+    return [feature for feature in CAPABILITY_OPTIONS.CPU_FEATURES if feature in flags]
+
+
+def _probe_opencv_fourccs():
+    """按 CAPABILITY_OPTIONS.FOURCCS 的顺序返回 VideoWriter 能打开的编码"""
+    import cv2
+
+    available = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for fourcc in CAPABILITY_OPTIONS.FOURCCS:
+            file_name = os.path.join(temp_dir, f"probe_{fourcc}.mp4")
+            writer = cv2.VideoWriter(file_name, cv2.VideoWriter_fourcc(*fourcc), 25, (64, 64))
+            if writer.isOpened():
+                available.append(fourcc)
+            writer.release()
+    return available
+
+
+def _ffmpeg_names(option, wanted):
+    output = _run([FFMPEG_OPTIONS.BINARY, "-hide_banner", option])
+    if output is None:
+        return []
+    # 每行为 " V..... libx264   描述"，第二列是名称
+    names = {line.split()[1] for line in output.decode(errors="ignore").splitlines() if len(line.split()) > 1}
+    return [name for name in wanted if name in names]
+
+
+def _probe_ffmpeg():
+    encoders = _ffmpeg_names("-encoders", CAPABILITY_OPTIONS.FFMPEG_ENCODERS)
+    decoders = _ffmpeg_names("-decoders", CAPABILITY_OPTIONS.FFMPEG_DECODERS)
+    output = _run([FFMPEG_OPTIONS.BINARY, "-hide_banner", "-hwaccels"])
+    hwaccels = []
+    if output is not None:
+        # 第一行是标题 "Hardware acceleration methods:"
+        hwaccels = [line.strip() for line in output.decode(errors="ignore").splitlines()[1:] if line.strip()]
+    return encoders, decoders, hwaccels
+
+
+if __name__ == "__main__":
+    for name, value in get_capabilities().items():
+        print(f"{name}: {value}")
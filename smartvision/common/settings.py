@@ -105,4 +105,220 @@ class MODEL_NAMES:
 
 class LOCAL_DIRS:
     TMP_DIR = "/var/tmp/smart-vision"
+    # 按内容哈希存放上传的视频，会话目录中的文件是指向这里的符号链接
+    BLOB_DIR = "/var/tmp/smart-vision/blobs"
 
+
+class INFERENCE_OPTIONS:
+    # 每次送入模型的帧数，内存不足时会自动减半，之后逐步恢复
+    BATCH_SIZE = 8
+    # 批大小减半后连续成功推理该次数则加倍，最多恢复到 BATCH_SIZE；0 表示不恢复
+    BATCH_GROW_AFTER = 16
+    # 并行扫描的进程数，1 表示在当前进程中顺序扫描(使用共享的模型池)，0 表示按 CPU 核数自动选择.
+    # 并行扫描的工作进程常驻并各自加载一份模型(yolo11x 约 1GB)，在模型池之外额外占用内存，按需开启
+    SCAN_WORKERS = 1
+    # 并行扫描时每个进程的 torch 线程数，自动选择进程数时按它划分 CPU 核
+    TORCH_THREADS_PER_WORKER = 2
+    # 并行扫描时长视频切分的片段长度(秒)
+    SEGMENT_SECONDS = 600
+
+
+class SAMPLING_MODES:
+    # 顺序 grab，按时间点精确采样
+    GRAB = "grab"
+    # 只解码关键帧，GOP 大于采样间隔时补充解码所需的非关键帧
+    KEYFRAME = "keyframe"
+    # 由 ffmpeg 解码并按采样间隔输出缩小后的帧
+    FFMPEG = "ffmpeg"
+    # 由 PyAV 多线程解码，时间戳取自帧的 PTS
+    PYAV = "pyav"
+
+
+class MOTION_OPTIONS:
+    # 运动检测使用的方法: "diff" 与上次推理帧做差分, "mog2" 背景建模
+    METHOD = "diff"
+    # 缩略图宽度(像素)，差分在缩略图上进行
+    THUMBNAIL_WIDTH = 320
+    # 灰度差超过该值的像素视为变化
+    PIXEL_DELTA = 25
+    # 变化像素占比超过该值才认为画面有变化，越小越灵敏
+    CHANGED_RATIO = 0.0005
+    # 连续跳过的最大次数，超过后强制推理一次
+    MAX_SKIPS = 30
+
+
+class ROI_OPTIONS:
+    # 物品丢失检测是否只检测目标周围的区域
+    ENABLED = True
+    # 目标框四周各扩展的边距，按目标框宽高的倍数计算
+    MARGIN = 1.0
+    # 检测区域的最小边长(像素)
+    MIN_SIZE = 320
+    # 检测区域送入模型时的输入尺寸
+    IMGSZ = 320
+
+
+class LOSS_SEARCH_MODES:
+    # 按采样间隔逐帧扫描
+    LINEAR = "linear"
+    # 先稀疏采样找到消失的区间，再在区间内二分
+    BISECT = "bisect"
+
+
+class LOSS_SEARCH_OPTIONS:
+    MODE = LOSS_SEARCH_MODES.LINEAR
+    # 粗扫描的采样间隔(秒)
+    COARSE_SECONDS = 30
+    # 二分查找的精度(秒)
+    PRECISION_SECONDS = 0.25
+
+
+class FFMPEG_OPTIONS:
+    BINARY = "ffmpeg"
+    # 解码时把长边缩小到该尺寸，与模型的输入尺寸一致；None 表示保持原始分辨率
+    MAX_SIDE = 640
+    # 每次预分配的帧缓冲数量
+    BUFFER_FRAMES = 32
+    # 保存或标注图片时重新读取原始分辨率的帧
+    SAVE_FULL_RESOLUTION = True
+    # 解码使用的硬件加速(如 "cuda", "videotoolbox", "qsv")，只有探测到可用时才生效；None 表示不使用
+    HWACCEL = None
+
+
+class DECODE_OPTIONS:
+    # 默认的采样模式(解码后端)，可按部署环境的测试结果选择，见 frames.benchmark_sampling
+    SAMPLING_MODE = SAMPLING_MODES.GRAB
+    # PyAV 解码线程: "AUTO" 同时使用帧级与 slice 级线程, "FRAME", "SLICE" 或 "NONE"
+    PYAV_THREAD_TYPE = "AUTO"
+    # PyAV 解码线程数，0 表示由 ffmpeg 自动选择
+    PYAV_THREAD_COUNT = 0
+    # PyAV 解码时跳过非参考帧，采样间隔远大于帧间隔时可减少解码量
+    PYAV_SKIP_NONREF = False
+
+
+class IMAGE_DIR_OPTIONS:
+    # 并行解码图片的线程数，0 表示按 CPU 核数自动选择
+    DECODE_WORKERS = 0
+    # JPEG 在 DCT 域按 1/2、1/4、1/8 缩小解码，1 表示原始尺寸；需要在图片上画框时始终按原始尺寸解码
+    JPEG_REDUCE = 1
+    # 同时在解码中(或已解码等待推理)的批数
+    PREFETCH_BATCHES = 2
+    # 进度回调的最小间隔(秒)
+    PROGRESS_INTERVAL = 0.5
+
+
+class IMAGE_SINK_OPTIONS:
+    # 编码并写入图片的线程数，0 表示按 CPU 核数自动选择
+    WORKERS = 0
+    # 等待编码的图片数上限，队列满时提交方阻塞
+    QUEUE_SIZE = 32
+    JPEG_QUALITY = 95
+    WEBP_QUALITY = 90
+    # JPEG 编码器: "opencv" 或 "turbojpeg"(需要安装 PyTurboJPEG，不可用时使用 opencv)
+    JPEG_ENCODER = "opencv"
+    # 每写入多少个文件对这些文件及其目录执行一次 fsync，0 表示不主动落盘
+    FSYNC_BATCH = 0
+
+
+class DETECTION_CACHE_OPTIONS:
+    # 是否缓存视频的原始检测结果
+    ENABLED = True
+    # 缓存目录，位于 LOCAL_DIRS.TMP_DIR 下
+    DIR_NAME = "detections"
+    # 缓存总大小上限，超过后按最近使用时间淘汰
+    MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+class INFERENCE_BACKENDS:
+    # ultralytics 直接加载 .pt 权重
+    TORCH = "torch"
+    # 导出为 ONNX，由 ONNX Runtime 推理
+    ONNX = "onnx"
+    # 导出为 OpenVINO IR，由 OpenVINO 推理
+    OPENVINO = "openvino"
+
+
+class BACKEND_OPTIONS:
+    # 设备为 CPU 时使用的推理后端；GPU/MPS 始终使用 PyTorch.
+    # 选择 ONNX/OpenVINO 前先运行 python -m ai.common.backends export 导出，没有导出结果时使用 PyTorch
+    CPU_BACKEND = INFERENCE_BACKENDS.TORCH
+    # 导出时的输入尺寸，导出的模型支持动态批大小与输入尺寸
+    EXPORT_IMGSZ = 640
+    # ONNX Runtime 的 intra-op 线程数，0 表示与当前进程分配给每个模型副本的线程数一致
+    INTRA_OP_THREADS = 0
+
+
+class CASCADE_OPTIONS:
+    # 两级检测: 小模型筛选每个采样帧，只有被标记的帧与状态变化附近的帧由大模型确认
+    ENABLED = False
+    SCREEN_WEIGHTS = MODEL_NAMES.YOLO_11N
+    # 小模型的置信度阈值，低于各任务的阈值以减少漏检
+    SCREEN_CONFIDENCE = 0.15
+    # 状态变化(出现/消失)前后由大模型确认的采样点数
+    CONTEXT_SAMPLES = 1
+    # 车辆距离检测: 中心距离小于目标框对角线的该倍数时由大模型确认
+    PROXIMITY_RATIO = 3.0
+
+
+class MODEL_PRECISIONS:
+    FP32 = "fp32"
+    # 由本地视频帧静态校准得到的 INT8 ONNX 模型，只在 CPU 上使用
+    INT8 = "int8"
+
+
+class QUANTIZATION_OPTIONS:
+    # 各任务使用的精度，INT8 模型不存在时回退到 FP32，见 python -m ai.common.quantization
+    PET_SEARCH = MODEL_PRECISIONS.FP32
+    LOSS_DETECTION = MODEL_PRECISIONS.FP32
+    COLLISION = MODEL_PRECISIONS.FP32
+    # 本地验证集: ultralytics 数据集配置(计算 mAP)、宠物视频目录、物品丢失用例(JSON)
+    VALIDATION_DIR = "/var/tmp/smart-vision/validation"
+    VALIDATION_DATA = f"{VALIDATION_DIR}/data.yaml"
+    VALIDATION_PET_VIDEOS = f"{VALIDATION_DIR}/pets"
+    VALIDATION_LOSS_CASES = f"{VALIDATION_DIR}/loss_cases.json"
+    # 从该目录下的视频中采样校准帧
+    CALIBRATION_DIR = LOCAL_DIRS.TMP_DIR
+    # 校准时跳过的目录: 验证集(避免用评估数据校准)、blob 目录(会话目录中已有指向它的符号链接)、检测缓存
+    CALIBRATION_EXCLUDE_DIRS = [
+        VALIDATION_DIR,
+        LOCAL_DIRS.BLOB_DIR,
+        f"{LOCAL_DIRS.TMP_DIR}/{DETECTION_CACHE_OPTIONS.DIR_NAME}",
+    ]
+    CALIBRATION_FRAMES = 300
+    # 校准帧的采样间隔(秒)
+    CALIBRATION_SECONDS = 5.0
+
+
+class MODEL_POOL_OPTIONS:
+    # 每个权重文件最多加载的模型副本数，0 表示按 CPU 核数自动选择
+    MAX_REPLICAS = 0
+    # 自动选择时每个副本对应的 CPU 核数
+    CORES_PER_REPLICA = 4
+    # 加载后用空白图像预热的输入尺寸
+    WARMUP_IMGSZ = 640
+    # use_model 等待空闲副本的最长时间(秒)，超时抛出 TimeoutError
+    ACQUIRE_TIMEOUT = 1800
+
+
+class STARTUP_OPTIONS:
+    # 页面启动后在后台线程中预先导入耗时的模块并加载模型
+    WARM_UP = True
+    WARM_UP_MODULES = [
+        "torch",
+        "cv2",
+        "ultralytics",
+        "ai.common.yolo",
+        "ai.common.cv",
+        "ai.common.collision",
+    ]
+    WARM_UP_MODEL = True
+
+
+class CAPABILITY_OPTIONS:
+    # 按顺序探测 OpenCV VideoWriter 可用的编码，使用第一个可用的
+    FOURCCS = ["avc1", "mp4v"]
+    # 需要探测的 ffmpeg 编码器与解码器
+    FFMPEG_ENCODERS = ["libx264", "h264_nvenc", "h264_videotoolbox", "h264_qsv", "h264_amf"]
+    FFMPEG_DECODERS = ["h264", "hevc", "h264_cuvid", "hevc_cuvid"]
+    # 需要记录的 CPU 指令集
+    CPU_FEATURES = ["sse4_2", "avx", "avx2", "fma", "avx512f", "avx512_vnni", "amx_tile", "asimd"]
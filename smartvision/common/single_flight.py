@@ -0,0 +1,66 @@
+import threading
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self, timeout=None):
+        """等待计算完成，返回结果；计算失败时抛出同样的异常"""
+        self.done.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    合并相同 key 的并发计算
+
+    第一个调用者执行计算，同时到达的其他调用者等待并共享它的结果.
+    只在进程内生效，Streamlit 的各个会话是同一进程中的线程.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def claim(self, key):
+        """
+        申请执行 key 对应的计算
+
+        返回:
+        tuple: (flight, leader)，leader 为 True 时由调用者执行计算并在结束后调用 release，
+               否则调用 flight.wait() 等待
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = _Flight()
+            self._flights[key] = flight
+            return flight, True
+
+    def release(self, key, result=None, error=None):
+        """结束 key 对应的计算，唤醒所有等待者"""
+        with self._lock:
+            flight = self._flights.pop(key, None)
+        if flight is not None:
+            flight.result = result
+            flight.error = error
+            flight.done.set()
+
+    def do(self, key, fn, *args, **kwargs):
+        """执行 fn(*args, **kwargs)，相同 key 正在计算时等待并返回它的结果"""
+        flight, leader = self.claim(key)
+        if not leader:
+            return flight.wait()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.release(key, error=e)
+            raise
+        self.release(key, result)
+        return result
@@ -0,0 +1,128 @@
+"""
+启动耗时统计与后台预热
+
+页面的导入链只包含 streamlit 与界面模块，torch、ultralytics、cv2 以及模型都在
+第一次使用时才加载. 页面启动后由 start_warm_up() 在后台线程中提前完成这些工作，
+各模块的导入耗时记录在 startup_timings() 中，便于发现启动变慢.
+
+python -m common.startup 在新进程中逐个导入界面模块并输出耗时.
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from common.settings import STARTUP_OPTIONS
+
+# 界面启动时导入的模块，按 app.py 中的顺序
+UI_MODULES = [
+    "streamlit",
+    "ui.components.sidebar",
+    "ui.components.content",
+    "common.session",
+    "common.loader",
+    "streamlit_player",
+]
+
+_timings = {}
+_lock = threading.Lock()
+_warm_up_thread = None
+_reported = False
+
+
+@contextmanager
+def timed(name):
+    """记录 with 块的耗时，同名只记录第一次(Streamlit 每次重新运行脚本时导入已被缓存)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            _timings.setdefault(name, elapsed)
+
+
+def timed_import(name):
+    with timed(name):
+        return importlib.import_module(name)
+
+
+def startup_timings():
+    """返回各项耗时(秒)，按耗时从大到小排列"""
+    with _lock:
+        return dict(sorted(_timings.items(), key=lambda item: item[1], reverse=True))
+
+
+def report_once():
+    """在进程第一次渲染完成后打印启动耗时"""
+    global _reported
+    with _lock:
+        if _reported:
+            return
+        _reported = True
+    for name, seconds in startup_timings().items():
+        print(f"[startup] {name}: {seconds * 1000:.0f} ms")
+
+
+def _patch_torch_classes(torch):
+    # Streamlit 的文件监视会访问 torch.classes.__path__ 并报错，这里替换成普通路径
+    torch.classes.__path__ = [os.path.join(torch.__path__[0], torch.classes.__file__)]
+
+
+def _warm_up():
+    for name in STARTUP_OPTIONS.WARM_UP_MODULES:
+        try:
+            module = timed_import(name)
+        except ImportError as e:
+            print(f"[startup] 预热导入 {name} 失败: {e}")
+            continue
+        if name == "torch":
+            _patch_torch_classes(module)
+
+    try:
+        from common.capabilities import get_capabilities
+
+        with timed("capabilities"):
+            get_capabilities()
+    except Exception as e:
+        print(f"[startup] 能力探测失败: {e}")
+
+    if STARTUP_OPTIONS.WARM_UP_MODEL:
+        try:
+            from ai.common.models import get_pool
+
+            with timed("model"):
+                with get_pool().acquire():
+                    pass
+        except Exception as e:
+            print(f"[startup] 预热模型失败: {e}")
+    _report_warm_up()
+
+
+def _report_warm_up():
+    for name in [*STARTUP_OPTIONS.WARM_UP_MODULES, "capabilities", "model"]:
+        seconds = _timings.get(name)
+        if seconds is not None:
+            print(f"[warm-up] {name}: {seconds * 1000:.0f} ms")
+
+
+def start_warm_up():
+    """启动后台预热，每个进程只执行一次"""
+    global _warm_up_thread
+    if not STARTUP_OPTIONS.WARM_UP:
+        return
+    with _lock:
+        if _warm_up_thread is not None:
+            return
+        _warm_up_thread = threading.Thread(target=_warm_up, name="warm-up", daemon=True)
+    _warm_up_thread.start()
+
+
+if __name__ == "__main__":
+    for module_name in sys.argv[1:] or UI_MODULES:
+        timed_import(module_name)
+    report_once()
+    heavy = [name for name in ("torch", "ultralytics", "cv2", "llama_index", "oss2") if name in sys.modules]
+    if heavy:
+        print(f"[startup] 界面导入链中包含耗时的模块: {', '.join(heavy)}")
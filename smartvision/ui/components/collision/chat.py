@@ -7,8 +7,6 @@ from common.settings import SESSION_KEYS, PROMPT_TEXT, STAGE, KEY_NAMES
 from common.loader import show_md_content
 from common.utils import list_image_files, get_resource_dir, scroll_to_bottom_markdown, list_video_files
 
-from ai.common.cv import cv_extract_frames, cv_clip_video
-from ai.common.collision import VehicleDetectionSystem
 
 
 from ui.components.staff.info import render_staff_info_col_info
@@ -62,6 +60,8 @@ def on_searching_callback():
 
 
 def searching():
+    from ai.common.collision import VehicleDetectionSystem
+
     show_assistant_animation_message("正在查找距离您的车辆最近的目标, 请稍后...")
     video_path, result_dir = get_resource_dir(st)
     files = list_video_files(video_path)
@@ -80,6 +80,8 @@ def searching():
 
 
 def prepare_images():
+    from ai.common.collision import VehicleDetectionSystem
+
     show_assistant_animation_message("正在抽取视频中的图片，供您标定目标车辆")
     video_path, result_dir = get_resource_dir(st)
     start_time = st.session_state[SESSION_KEYS.START_TIME]
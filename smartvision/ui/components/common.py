@@ -1,8 +1,8 @@
 import streamlit as st
 from common.settings import SESSION_KEYS, PROMPT_TEXT, LOCAL_DIRS, STAGE, KEY_NAMES
 from common.utils import get_resource_dir
+from common.blob_store import store_blob, link_blob
 from common.loader import show_md_content
-from ai.common.cv import cv_video_info
 import os
 
 
@@ -35,14 +35,19 @@ def show_assistant_messages(chat_container):
 
 def on_file_uploaded(uploaded_files, next_stage):
     """处理视频上传"""
+    # 用到时才导入，页面首次渲染不需要加载 cv2/av
+    from ai.common.cv import cv_video_info
+
     if uploaded_files:
         video_dir, image_dir = get_resource_dir(st)
         os.makedirs(video_dir, exist_ok=True)  # 确保目录存在
         index = 1
         for uploaded_file in uploaded_files:
             file_path = os.path.join(video_dir, f"{index}-{uploaded_file.name}")
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+            # 相同内容的视频只保存一份，会话目录中只放指向它的链接
+            uploaded_file.seek(0)
+            blob_path, _ = store_blob(uploaded_file, os.path.splitext(uploaded_file.name)[1])
+            link_blob(blob_path, file_path)
             st.success(f"文件 '{uploaded_file.name}' 已保存至 {video_dir}")
             index += 1
         # 存储文件
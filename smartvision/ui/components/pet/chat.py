@@ -13,7 +13,6 @@ from ai.pet.llm import (
     get_next_question,
     initialize_chat,
 )
-from ai.common.yolo import yolo_find_objects_by_video
 
 def render_pet_col_chat(chat_col, info_col):
     logger.debug("render chat info.")
@@ -112,6 +111,8 @@ def handle_user_input():
         st.rerun()
 
 def searching(placeholder):
+    from ai.common.yolo import yolo_find_objects_by_video
+
     pet_type = st.session_state[SESSION_KEYS.PET_INFO]["pet_type"]
     object_name = ""
     if "狗" in pet_type:
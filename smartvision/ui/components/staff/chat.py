@@ -1,14 +1,11 @@
-import os
 import logging
 import sys
 import streamlit as st
 from streamlit_carousel import carousel
 from common.settings import SESSION_KEYS, PROMPT_TEXT, STAGE, KEY_NAMES
 from common.loader import show_md_content
-from common.utils import list_image_files, get_resource_dir, scroll_to_bottom_markdown
+from common.utils import get_resource_dir, scroll_to_bottom_markdown
 
-from ai.common.yolo import yolo_find_objects_by_images, detect_object_loss_time
-from ai.common.cv import cv_extract_frames, cv_clip_video
 
 from ui.components.staff.info import render_staff_info_col_info
 from ui.components.common import show_assistant_animation_message, show_assistant_messages, append_asistant_message
@@ -66,6 +63,8 @@ def render_staff_col_chat(chat_col, info_col):
 
 
 def clip_video():
+    from ai.common.cv import cv_clip_video
+
     video_dir, result_dir = get_resource_dir(st)
     clip_time = st.session_state[SESSION_KEYS.USER_OBJECT_CLIP_TIME]
     lost_time = clip_time["lost_time"]
@@ -94,6 +93,8 @@ def on_searching_callback():
 
 
 def search():
+    from ai.common.yolo import detect_object_loss_time
+
     video_path, result_dir = get_resource_dir(st)
     with st.chat_message("assistant"):
         show_md_content(
@@ -117,9 +118,14 @@ def search():
 
 
 def prepare_images():
+    from ai.common.cv import cv_extract_frames
+    from ai.common.yolo import yolo_find_objects_in_frames
+
     show_assistant_animation_message("正在准备图片")
     video_path, result_dir = get_resource_dir(st)
     start_time = st.session_state[SESSION_KEYS.START_TIME]
+    # 提取的帧直接交给检测，只把需要用户确认的那一帧(画好检测框)写入磁盘
+    frames = []
     results = cv_extract_frames(
         # 从指定时间开始取一帧图片，供客户确认物品的位置
         on_extracting,
@@ -130,15 +136,13 @@ def prepare_images():
         1,
         1,
         1,
+        on_frame=lambda image_path, current_time, frame: frames.append((image_path, frame)),
     )
     if results and len(results) > 0:
-        files = list_image_files(result_dir)
-        if len(files) == 0:
+        if len(frames) == 0:
             st.session_state[SESSION_KEYS.STAGE] = STAGE.NO_RESULTS
             st.rerun()
-        identified_objects = yolo_find_objects_by_images(
-            yolo_identifying_callback, None, result_dir, None, 0.2, True
-        )
+        identified_objects = yolo_find_objects_in_frames(frames, None, 0.2, draw_box=True)
         st.session_state[SESSION_KEYS.INDENTIFIED_OBJECTS] = identified_objects
         st.session_state[SESSION_KEYS.STAGE] = STAGE.IDENTIFYING_OBJECTS
     else:
@@ -152,13 +156,11 @@ def identifying_objects():
     if len(identify_objects) == 0:
         st.session_state[SESSION_KEYS.STAGE] = STAGE.NO_RESULTS
         st.rerun()
-    video_dir, result_dir = get_resource_dir(st)
-    files = list_image_files(result_dir)
     with st.chat_message("assistant"):
         image_cols = st.columns(2)
         with image_cols[0]:
             st.image(
-                    os.path.join(result_dir, files[0]),
+                    identify_objects[0]["file_name"],
                     caption="请在图中确认你的物品",
                     use_container_width=True,
                 )
@@ -177,23 +179,19 @@ def identifying_objects():
                 identify_objects = st.session_state[SESSION_KEYS.INDENTIFIED_OBJECTS]
                 identify_object = identify_objects[0]
                 object_names = st.session_state[SESSION_KEYS.USER_OBJECT_BOX_INDEX].split("-")
-                index = int(object_names[0]) - 1
+                box_index = int(object_names[0])
 
-                customer_indentified_box = identify_object['boxes'][index]
+                customer_indentified_box = next(
+                    box for box in identify_object['boxes'] if box['box_index'] == box_index
+                )
                 label = customer_indentified_box['label']
-                box = customer_indentified_box['box']
-                xyxy = box.xyxy.tolist()
-                # xyxy = box.xyxy[0].cpu().numpy()  # Bo
-                json = {"label": label, "location": xyxy[0]}
+                xyxy = customer_indentified_box['xyxy']
+                json = {"label": label, "location": xyxy}
                 st.session_state[SESSION_KEYS.USER_OBJECT_BOX] = json
                 st.session_state[SESSION_KEYS.STAGE] = STAGE.OBJECT_IDENTIFIED
                 st.rerun()
 
 
-def yolo_identifying_callback(placeholder, file_name):
-    pass
-
-
 def on_extracting(placeholder, index, total):
     pass
 
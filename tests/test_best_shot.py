@@ -0,0 +1,91 @@
+import numpy as np
+
+from ai.common import yolo
+from ai.common.best_shot import BestShotSelector
+from ai.common.detections import DetectionRecords, FrameDetections
+
+NAMES = {0: "person", 1: "cup"}
+
+
+def _item(confidence):
+    return {"max_confidence": confidence}
+
+
+def test_best_frame_is_selected_per_episode():
+    selector = BestShotSelector(lambda item: item, max_gap=1.5)
+    for timestamp, confidence in [(0, 0.5), (1, 0.9), (2, 0.7), (10, 0.6), (11, 0.8)]:
+        selector.add(_item(confidence), "a.mp4", timestamp)
+    shots = selector.flush()
+    assert [shot["max_confidence"] for shot in shots] == [0.9, 0.8]
+
+
+def test_new_source_starts_a_new_episode():
+    selector = BestShotSelector(lambda item: item, max_gap=1.5)
+    selector.add(_item(0.5), "a.mp4", 5)
+    selector.add(_item(0.6), "b.mp4", 5)
+    assert len(selector.flush()) == 2
+
+
+def test_episode_without_saved_image_is_dropped():
+    emitted = []
+
+    def on_episode(item):
+        emitted.append(item)
+        return None if item["max_confidence"] < 0.6 else item
+
+    selector = BestShotSelector(on_episode, max_gap=1.5)
+    selector.add(_item(0.5), "a.mp4", 0)
+    selector.add(_item(0.7), "a.mp4", 10)
+    assert [shot["max_confidence"] for shot in selector.flush()] == [0.7]
+    assert len(emitted) == 2
+
+
+def _segment_records(hits):
+    records = DetectionRecords()
+    for timestamp, confidence in hits:
+        records.append(
+            int(timestamp * 30),
+            float(timestamp),
+            FrameDetections(
+                np.array([1], dtype=np.uint8),
+                np.array([confidence], dtype=np.float16),
+                np.array([[0, 0, 10, 10]], dtype=np.int16),
+                NAMES,
+                (480, 640),
+            ),
+        )
+    return records.compact()
+
+
+def test_parallel_scan_keeps_episode_across_segment_boundary(monkeypatch, tmp_path):
+    # 同一段连续画面跨越两个片段的边界
+    hits = {0.0: [(8.0, 0.6), (9.0, 0.7)], 10.0: [(10.0, 0.9), (11.0, 0.5)]}
+    segments = [
+        {"file_name": "a.mp4", "file_index": 1, "start_time": start, "end_time": start + 10}
+        for start in hits
+    ]
+
+    def run_segments(task, segments, workers, weights=None, on_result=None, select_best=True, **kwargs):
+        # 并行时由调用方合并后选择最佳画面，片段内不能提前选择
+        assert select_best is False
+        for segment in segments:
+            on_result(segment, ([], _segment_records(hits[segment["start_time"]])))
+
+    monkeypatch.setattr(yolo, "run_segments", run_segments)
+    monkeypatch.setattr(yolo, "_save_identified_object_image", lambda item, writes=None: item)
+
+    task_kwargs = {"image_dir": str(tmp_path), "min_confidence": 0.25, "seconds_interval": 1.0}
+    shots, records_by_file = yolo._scan_segments(segments, 2, None, "cup", None, None, task_kwargs)
+
+    assert len(shots) == 1
+    assert shots[0]["timestamp"] == 10.0
+    expected = yolo._find_objects_in_records(
+        DetectionRecords.concat(records_by_file["a.mp4"]),
+        "a.mp4",
+        1,
+        str(tmp_path),
+        "cup",
+        0.25,
+        1.0,
+    )
+    assert [shot["file_name"] for shot in shots] == [shot["file_name"] for shot in expected]
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from ai.common.detections import DetectionRecords, FrameDetections
+
+NAMES = {0: "person", 1: "cup", 2: "dog"}
+
+
+def _frame(cls, conf, width=640):
+    xyxy = [[10 * i, 10 * i, 10 * i + 5, 10 * i + 5] for i in range(len(cls))]
+    return FrameDetections(
+        np.array(cls, dtype=np.uint8),
+        np.array(conf, dtype=np.float16),
+        np.array(xyxy, dtype=np.int16).reshape(-1, 4),
+        NAMES,
+        (480, width),
+    )
+
+
+def _records():
+    records = DetectionRecords()
+    records.append(0, 0.0, _frame([0, 1], [0.9, 0.4]))
+    records.append(30, 1.0, _frame([], []))
+    records.append(60, 2.0, _frame([1, 1, 2], [0.8, 0.6, 0.7]))
+    return records
+
+
+def test_frame_select_filters_labels_and_confidence():
+    frame = _frame([0, 1, 1], [0.9, 0.3, 0.7])
+    assert frame.select().tolist() == [True, True, True]
+    assert frame.select("cup", 0.5).tolist() == [False, False, True]
+    assert frame.select(["person", "cup"], 0.8).tolist() == [True, False, False]
+    assert frame.label(1) == "cup"
+
+
+def test_append_compacts_into_columns():
+    records = _records()
+    assert len(records) == 3
+    assert records.offsets.tolist() == [0, 2, 2, 5]
+    assert records.cls.tolist() == [0, 1, 1, 1, 2]
+    assert records.box_timestamps().tolist() == [0.0, 0.0, 2.0, 2.0, 2.0]
+    assert records.frame_width == 640
+
+
+def test_matches_yields_only_matching_boxes_per_frame():
+    matches = list(_records().matches("cup", 0.5))
+    assert [(frame_index, timestamp) for frame_index, timestamp, _, _ in matches] == [(60, 2.0)]
+    _, _, conf, xyxy = matches[0]
+    assert conf.tolist() == pytest.approx([0.8, 0.6], abs=1e-3)
+    assert xyxy.shape == (2, 4)
+
+    assert list(_records().matches("cup", 0.0, start_time=0.5, end_time=1.5)) == []
+
+
+def test_concat_rebases_offsets():
+    first = _records()
+    second = DetectionRecords()
+    second.append(90, 3.0, _frame([2], [0.5]))
+    records = DetectionRecords.concat([first, second])
+
+    assert records.frame_index.tolist() == [0, 30, 60, 90]
+    assert records.offsets.tolist() == [0, 2, 2, 5, 6]
+    assert [row[0] for row in records.matches("dog", 0.0)] == [60, 90]
+    assert len(DetectionRecords.concat([])) == 0
+
+
+def test_save_and_load_round_trip(tmp_path):
+    file_name = tmp_path / "detections.npz"
+    records = _records()
+    records.save(file_name)
+    loaded = DetectionRecords.load(file_name)
+
+    assert loaded.names == NAMES
+    assert loaded.frame_width == 640
+    for column in ("frame_index", "timestamp", "offsets", "cls", "conf", "xyxy"):
+        expected = getattr(records, column)
+        actual = getattr(loaded, column)
+        assert actual.dtype == expected.dtype
+        assert np.array_equal(actual, expected)
+    assert list(loaded.matches("cup", 0.5))[0][0] == 60
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from ai.common.inference import BatchSizer, adaptive_batches, detect_frames, predict_batch
+
+
+class _Tensor:
+    def __init__(self, array):
+        self._array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._array
+
+
+class _Boxes:
+    def __init__(self, array):
+        self.data = _Tensor(array)
+
+
+class _Result:
+    def __init__(self, value):
+        # 一个检测框，置信度记录输入帧的值，便于核对顺序
+        self.boxes = _Boxes(np.array([[0, 0, 10, 10, value / 100, 0]], dtype=np.float32))
+        self.names = {0: "person"}
+        self.orig_shape = (10, 10)
+
+
+class _Model:
+    """批大小超过 max_batch 时抛出内存不足"""
+
+    def __init__(self, max_batch=None):
+        self.max_batch = max_batch
+        self.calls = []
+
+    def predict(self, frames, device, verbose, **kwargs):
+        self.calls.append(len(frames))
+        if self.max_batch is not None and len(frames) > self.max_batch:
+            raise RuntimeError("CUDA out of memory")
+        return [_Result(frame) for frame in frames]
+
+
+def test_batch_sizer_shrinks_to_one():
+    sizer = BatchSizer(8, grow_after=0)
+    assert [sizer.shrink() for _ in range(4)] == [True, True, True, False]
+    assert sizer.size == 1
+
+
+def test_batch_sizer_grows_back_to_configured_size():
+    sizer = BatchSizer(8, grow_after=2)
+    sizer.shrink()
+    sizer.shrink()
+    assert sizer.size == 2
+    sizer.succeeded()
+    assert sizer.size == 2
+    sizer.succeeded()
+    assert sizer.size == 4
+    for _ in range(10):
+        sizer.succeeded()
+    assert sizer.size == 8
+
+
+def test_batch_sizer_shrink_resets_growth_count():
+    sizer = BatchSizer(8, grow_after=2)
+    sizer.shrink()
+    sizer.succeeded()
+    sizer.shrink()
+    sizer.succeeded()
+    assert sizer.size == 2
+
+
+def test_adaptive_batches_follows_current_size():
+    sizer = BatchSizer(4, grow_after=0)
+    batches = []
+    for batch in adaptive_batches(range(10), sizer):
+        batches.append(batch)
+        if len(batches) == 1:
+            sizer.shrink()
+    assert batches == [[0, 1, 2, 3], [4, 5], [6, 7], [8, 9]]
+
+
+def test_predict_batch_halves_on_out_of_memory_and_keeps_order():
+    model = _Model(max_batch=2)
+    sizer = BatchSizer(8, grow_after=0)
+    results = predict_batch(model, list(range(7)), "cpu", sizer)
+    assert sizer.size == 2
+    assert [round(float(r.conf[0]) * 100) for r in results] == list(range(7))
+
+
+def test_predict_batch_raises_other_errors():
+    class _Broken(_Model):
+        def predict(self, frames, device, verbose, **kwargs):
+            raise RuntimeError("bad input")
+
+    with pytest.raises(RuntimeError, match="bad input"):
+        predict_batch(_Broken(), [1], "cpu", BatchSizer(4))
+
+
+def test_detect_frames_builds_later_batches_at_shrunk_size():
+    model = _Model(max_batch=2)
+    frames = [(i, float(i), i) for i in range(8)]
+    detected = list(detect_frames(model, frames, "cpu", batch_size=4))
+    assert [item[:3] for item in detected] == frames
+    # 第一组 4 帧失败后减半，之后的组直接按 2 帧分组，不再先送 4 帧
+    assert model.calls == [4, 2, 2, 2, 2]
@@ -0,0 +1,71 @@
+from contextlib import contextmanager
+
+import pytest
+
+from ai.common import yolo
+from ai.common.loss_search import bisect_search, linear_search
+
+
+def _presence(absences):
+    """absences: 物体不存在的时间区间 [开始, 结束)"""
+    calls = []
+
+    def is_present(timestamp):
+        calls.append(timestamp)
+        return not any(start <= timestamp < end for start, end in absences)
+
+    return is_present, calls
+
+
+@pytest.mark.parametrize(
+    "absences, expected",
+    [
+        ([(3517.4, 10000)], 3517.4),
+        ([(1202.3, 1207.8), (2441.6, 10000)], 2441.6),
+        ([(0, 10000)], 0.0),
+        ([(3595, 10000)], None),
+        ([], None),
+    ],
+)
+def test_bisect_matches_ground_truth(absences, expected):
+    is_present, _ = _presence(absences)
+    lost_time = bisect_search(is_present, 0.0, 3600.0, 10.0, 1.0, 30, 0.25)
+    if expected is None:
+        assert lost_time is None
+    else:
+        assert lost_time == pytest.approx(expected, abs=0.25)
+
+
+def test_bisect_uses_far_fewer_inferences_than_linear():
+    is_present, bisect_calls = _presence([(3000.5, 10000)])
+    bisect_search(is_present, 0.0, 3600.0, 10.0, 1.0, 30, 0.25)
+    is_present, linear_calls = _presence([(3000.5, 10000)])
+    linear_search(is_present, 0.0, 3600.0, 10.0, 1.0)
+    assert len(bisect_calls) * 10 < len(linear_calls)
+
+
+def test_loss_at_start_is_reported_by_both_searches():
+    for search in (linear_search, bisect_search):
+        is_present, _ = _presence([(0, 10000)])
+        assert search(is_present, 0.0, 100.0, 10.0, 1.0) == 0.0
+
+
+def test_short_occlusion_is_not_a_loss():
+    is_present, _ = _presence([(50.2, 55.0)])
+    assert bisect_search(is_present, 0.0, 100.0, 10.0, 1.0, 30, 0.25) is None
+
+
+def test_loss_helpers_borrow_a_model_when_none_is_given(monkeypatch):
+    borrowed = []
+
+    @contextmanager
+    def use_model(weights=None):
+        borrowed.append(weights)
+        yield object()
+
+    monkeypatch.setattr(yolo, "use_model", use_model)
+    # 视频无法打开时在借到模型之后返回，不会把 None 当作模型使用
+    monkeypatch.setattr(yolo, "read_video_properties", lambda file_name: None)
+    assert yolo._bisect_object_loss_time("missing.mp4", "cup", [0, 0, 10, 10], device="cpu") is None
+    assert yolo._detect_object_loss_time("missing.mp4", "cup", [0, 0, 10, 10], device="cpu") is None
+    assert len(borrowed) == 2
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from ai.common.models import ModelPool
+
+
+def _pool(monkeypatch, size=1, fail=0):
+    pool = ModelPool("yolo11n.pt", size=size, device="cpu")
+    loads = []
+
+    def load_replica():
+        loads.append(1)
+        if len(loads) <= fail:
+            raise RuntimeError("load failed")
+        return object()
+
+    monkeypatch.setattr(pool, "_load_replica", load_replica)
+    return pool, loads
+
+
+def test_replica_is_reused_after_release(monkeypatch):
+    pool, loads = _pool(monkeypatch)
+    with pool.acquire() as first:
+        pass
+    with pool.acquire() as second:
+        assert second is first
+    assert len(loads) == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_nested_acquire_in_same_thread_reuses_replica(monkeypatch):
+    pool, _ = _pool(monkeypatch)
+    with pool.acquire(timeout=1) as outer:
+        with pool.acquire(timeout=1) as inner:
+            assert inner is outer
+        # 内层结束时不归还，外层仍然持有副本
+        assert pool.stats()["idle"] == 0
+    assert pool.stats()["idle"] == 1
+
+
+def test_acquire_times_out_when_all_replicas_are_busy(monkeypatch):
+    pool, _ = _pool(monkeypatch)
+    errors = []
+
+    def borrow():
+        try:
+            with pool.acquire(timeout=0.05):
+                pass
+        except TimeoutError as e:
+            errors.append(e)
+
+    with pool.acquire():
+        thread = threading.Thread(target=borrow)
+        thread.start()
+        thread.join(5)
+    assert len(errors) == 1
+
+
+def test_failed_load_frees_the_slot(monkeypatch):
+    pool, loads = _pool(monkeypatch, fail=1)
+    with pytest.raises(RuntimeError):
+        with pool.acquire(timeout=1):
+            pass
+    with pool.acquire(timeout=1) as model:
+        assert model is not None
+    assert len(loads) == 2
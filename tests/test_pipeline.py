@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from ai.common.pipeline import Prefetcher
+
+
+def _source(items, state, error=None):
+    """生成器在 finally 中记录被关闭，Prefetcher 提前结束时会调用它的 close()"""
+    try:
+        for item in items:
+            state["produced"] += 1
+            yield item
+        if error is not None:
+            raise error
+    finally:
+        state["closed"].set()
+
+
+def _state():
+    return {"produced": 0, "closed": threading.Event()}
+
+
+def test_yields_items_in_order():
+    state = _state()
+    with Prefetcher(_source(range(10), state), maxsize=2) as frames:
+        assert list(frames) == list(range(10))
+    assert state["closed"].wait(1)
+
+
+def test_producer_error_is_raised_in_consumer():
+    state = _state()
+    with Prefetcher(_source([1, 2], state, ValueError("decode failed")), maxsize=2) as frames:
+        assert next(frames) == 1
+        assert next(frames) == 2
+        with pytest.raises(ValueError, match="decode failed"):
+            next(frames)
+    assert state["closed"].wait(1)
+
+
+def test_early_close_stops_producer_and_closes_source():
+    state = _state()
+    frames = Prefetcher(_source(range(1000), state), maxsize=2)
+    assert next(frames) == 0
+    frames.close()
+    assert state["closed"].wait(1)
+    produced = state["produced"]
+    time.sleep(0.2)
+    # 队列有界，生产线程停止后不再读取
+    assert state["produced"] == produced < 1000
+    with pytest.raises(StopIteration):
+        next(frames)
+
+
+def test_close_after_exhaustion_is_safe():
+    frames = Prefetcher(_source([1], _state()))
+    assert list(frames) == [1]
+    frames.close()
+    frames.close()
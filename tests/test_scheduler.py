@@ -0,0 +1,56 @@
+import pytest
+
+from ai.common import scheduler
+
+
+@pytest.fixture
+def durations(monkeypatch):
+    videos = {}
+
+    def read_video_properties(file_name):
+        if file_name not in videos:
+            return None
+        return {"duration": videos[file_name]}
+
+    monkeypatch.setattr(scheduler, "read_video_properties", read_video_properties)
+    return videos
+
+
+def _spans(segments):
+    return [(s["file_index"], s["start_time"], s["end_time"], s["last"]) for s in segments]
+
+
+def test_one_segment_per_file_without_segment_length(durations):
+    durations.update({"a.mp4": 30.0, "b.mp4": 5.0})
+    segments = scheduler.plan_segments(["a.mp4", "b.mp4"])
+    assert _spans(segments) == [(1, 0.0, 30.0, True), (2, 0.0, 5.0, True)]
+    assert [s["ordinal"] for s in segments] == [0, 1]
+
+
+def test_long_file_is_split_at_sample_aligned_boundaries(durations):
+    durations["a.mp4"] = 25.0
+    segments = scheduler.plan_segments(["a.mp4"], segment_seconds=10, seconds_interval=3.0)
+    # 片段长度取采样间隔的整数倍(9 秒)，采样点与顺序扫描一致
+    assert _spans(segments) == [
+        (1, 0.0, 9.0, False),
+        (1, 9.0, 18.0, False),
+        (1, 18.0, 25.0, True),
+    ]
+
+
+def test_short_file_is_not_split(durations):
+    durations["a.mp4"] = 8.0
+    segments = scheduler.plan_segments(["a.mp4"], segment_seconds=10)
+    assert _spans(segments) == [(1, 0.0, 8.0, True)]
+
+
+def test_unreadable_file_is_skipped_and_keeps_file_index(durations):
+    durations["b.mp4"] = 4.0
+    segments = scheduler.plan_segments(["missing.mp4", "b.mp4"], segment_seconds=10)
+    assert _spans(segments) == [(2, 0.0, 4.0, True)]
+    assert segments[0]["ordinal"] == 0
+
+
+def test_resolve_workers():
+    assert scheduler.resolve_workers(3) == 3
+    assert 1 <= scheduler.resolve_workers(0) <= scheduler.MAX_AUTO_WORKERS
@@ -0,0 +1,65 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from common.single_flight import SingleFlight
+
+
+def test_concurrent_calls_with_same_key_run_once():
+    flights = SingleFlight()
+    started = threading.Event()
+    finish = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        finish.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(4) as executor:
+        leader = executor.submit(flights.do, "video.mp4", compute)
+        assert started.wait(5)
+        waiters = [executor.submit(flights.do, "video.mp4", compute) for _ in range(3)]
+        finish.set()
+        results = [leader.result(5)] + [waiter.result(5) for waiter in waiters]
+
+    assert results == ["result"] * 4
+    assert len(calls) == 1
+
+
+def test_error_is_raised_in_every_waiter():
+    flights = SingleFlight()
+    flight, leader = flights.claim("key")
+    assert leader
+    waiter, waiter_leader = flights.claim("key")
+    assert waiter is flight and not waiter_leader
+
+    flights.release("key", error=ValueError("boom"))
+    with pytest.raises(ValueError, match="boom"):
+        waiter.wait(1)
+
+
+def test_do_propagates_error_and_releases_key():
+    flights = SingleFlight()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flights.do("key", fail)
+    # 失败后不保留结果，下一次调用重新计算
+    assert flights.do("key", lambda: 1) == 1
+
+
+def test_release_starts_a_new_flight_for_later_callers():
+    flights = SingleFlight()
+    flight, _ = flights.claim("key")
+    flights.release("key", result=3)
+    assert flight.wait(1) == 3
+
+    _, leader = flights.claim("key")
+    assert leader
+    _, leader = flights.claim("other")
+    assert leader